@@ -1,9 +1,17 @@
 import os
+import sys
 import json
 from dotenv import load_dotenv
 from openai import OpenAI
 from supabase import create_client, Client
 
+# Shared ingestion helpers live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from embedding_batcher import EmbeddingBatcher
+from embedding_cache import EmbeddingCache
+from supabase_writer import SupabaseBulkWriter
+from chunk_ids import id_for_chunk
+
 # Load environment variables
 load_dotenv()
 
@@ -19,36 +27,37 @@ if not all([OPENAI_API_KEY, SUPABASE_URL, SUPABASE_SERVICE_KEY]):
 # Initialize clients
 openai_client = OpenAI(api_key=OPENAI_API_KEY)
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+embedder = EmbeddingBatcher(openai_client, cache=EmbeddingCache())
 
 def get_embedding(text):
-    response = openai_client.embeddings.create(
-        input=text,
-        model="text-embedding-3-small"
-    )
-    return response.data[0].embedding
+    return embedder.embed([text])[0]
 
 def main():
     with open("chunks_for_n8n.jsonl", "r", encoding="utf-8") as f:
-        for line in f:
-            chunk = json.loads(line)
-            content = chunk["content"]
-            source = chunk.get("source")
-            title = chunk.get("title")
-            embedding = get_embedding(content)
-            metadata = {"title": title} if title else None
-
-            # Prepare data for insert (omit metadata if None)
-            data = {
-                "content": content,
-                "embedding": embedding,
-                "source": source
-            }
-            if metadata:
-                data["metadata"] = metadata
-
-            # Insert into Supabase and print response for debugging
-            response = supabase.table("documents").insert(data).execute()
-            print(f"Insert response: {response}")
+        chunks = [json.loads(line) for line in f if line.strip()]
+
+    embeddings = embedder.embed([chunk["content"] for chunk in chunks])
+
+    rows = []
+    for chunk, embedding in zip(chunks, embeddings):
+        if embedding is None:
+            print(f"Skipping chunk from {chunk.get('source')}: embedding failed")
+            continue
+        title = chunk.get("title")
+        metadata = {"title": title} if title else None
+
+        # Prepare data for upsert (bulk writes need the same keys on every row)
+        rows.append({
+            "id": id_for_chunk(chunk),
+            "content": chunk["content"],
+            "embedding": embedding,
+            "source": chunk.get("source"),
+            "metadata": metadata
+        })
+
+    # Upsert into Supabase in batches and print statistics for debugging
+    stats = SupabaseBulkWriter(supabase).write(rows)
+    print(f"Insert stats: {stats}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,8 +1,15 @@
 import os
-import json
+import sys
 from dotenv import load_dotenv
 from supabase import create_client, Client
 
+# Shared ingestion helpers live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from supabase_writer import SupabaseBulkWriter
+from chunk_ids import id_for_chunk
+from embedding_store import iter_chunks
+from embedding_batcher import EMBEDDING_DIMENSIONS
+
 # Load environment variables
 load_dotenv()
 
@@ -15,26 +22,28 @@ if not all([SUPABASE_URL, SUPABASE_SERVICE_KEY]):
     raise ValueError("Missing required environment variables. Please check your .env file.")
 
 def main():
-    # Load embedded chunks
-    with open("embedded_chunks.json", "r", encoding="utf-8") as f:
-        chunks = json.load(f)
+    # Load embedded chunks (embedded_chunks.npy + .jsonl, or a legacy embedded_chunks.json),
+    # shortened to EMBEDDING_DIMENSIONS to fit the documents table's column
+    path = sys.argv[1] if len(sys.argv) > 1 else "embedded_chunks"
+    chunks = list(iter_chunks(path, dimensions=EMBEDDING_DIMENSIONS))
 
     # Connect to Supabase
     supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
 
-    # Insert each chunk into the documents table
-    for i, chunk in enumerate(chunks, 1):
-        data = {
+    # Upsert the chunks into the documents table in batches; ids are stable across runs
+    rows = [
+        {
+            "id": id_for_chunk(chunk),
             "content": chunk["content"],
             "embedding": chunk["embedding"],
             "source": chunk.get("source"),
             "metadata": None
         }
-        res = supabase.table("documents").insert(data).execute()
-        if getattr(res, "error", None):
-            print(f"Chunk {i}: ERROR - {res.error}")
-        else:
-            print(f"Chunk {i}: Inserted successfully. Response: {res.data}")
+        for chunk in chunks
+    ]
+    stats = SupabaseBulkWriter(supabase).write(rows)
+    print(f"Upserted {stats['successful_uploads']}/{stats['total_rows']} chunks "
+          f"in {stats['requests']} requests (failed: {stats['failed_uploads']})")
 
     print("Ingestion complete. Please check the Supabase table again.")
 
@@ -0,0 +1,139 @@
+import os
+import sys
+import argparse
+from dotenv import load_dotenv
+import psycopg2
+
+# Shared ingestion helpers live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from embedding_batcher import EMBEDDING_DIMENSIONS
+from vector_index import (INDEX_KINDS, INDEX_NAME, VECTOR_INDEX_KIND, VECTOR_METRIC, distance_operator,
+                          index_build_sql, index_info_sql, operator_class, search_functions_sql,
+                          search_settings_sql, should_build_index, supports_iterative_scan)
+
+# Load environment variables
+load_dotenv()
+
+SUPABASE_DB_HOST = os.getenv("SUPABASE_DB_HOST")
+SUPABASE_DB_PORT = int(os.getenv("SUPABASE_DB_PORT", 5432))
+SUPABASE_DB_NAME = os.getenv("SUPABASE_DB_NAME")
+SUPABASE_DB_USER = os.getenv("SUPABASE_DB_USER")
+SUPABASE_DB_PASSWORD = os.getenv("SUPABASE_DB_PASSWORD")
+
+def connect():
+    if not all([SUPABASE_DB_HOST, SUPABASE_DB_NAME, SUPABASE_DB_USER, SUPABASE_DB_PASSWORD]):
+        raise ValueError("Missing required environment variables. Please check your .env file.")
+    return psycopg2.connect(
+        host=SUPABASE_DB_HOST,
+        port=SUPABASE_DB_PORT,
+        dbname=SUPABASE_DB_NAME,
+        user=SUPABASE_DB_USER,
+        password=SUPABASE_DB_PASSWORD
+    )
+
+def count_rows(cur):
+    cur.execute("SELECT count(*) FROM documents")
+    return cur.fetchone()[0]
+
+def index_info(cur):
+    """(access method, reloptions, definition) of the embedding index, or Nones if it is missing"""
+    cur.execute(index_info_sql())
+    return cur.fetchone() or (None, None, None)
+
+def build(cur, kind, force=False):
+    """Drop and recreate the index sized for the rows now in the table"""
+    rows = count_rows(cur)
+    for statement in index_build_sql(rows, kind, force=force):
+        print(statement)
+        cur.execute(statement)
+    if should_build_index(rows, kind, force):
+        print(f"Built {kind} index over {rows} rows")
+    else:
+        print(f"Only {rows} rows: dropped the index, a sequential scan is exact and fast at this size. "
+              f"Rebuild after bulk loads, or pass --force.")
+
+def pgvector_version(cur):
+    cur.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+    row = cur.fetchone()
+    return row[0] if row else None
+
+def install_functions(cur):
+    """Recreate the search RPCs with the operator and query settings of the current index"""
+    kind, reloptions, _ = index_info(cur)
+    version = pgvector_version(cur)
+    if kind and not (version and supports_iterative_scan(version)):
+        # Without iterative scans a filtered bucket can come back short or empty
+        raise ValueError(f"pgvector {version} has no iterative index scans, which the filtered searches need. "
+                         f"Run 'ALTER EXTENSION vector UPDATE' (0.8.0 or later).")
+    cur.execute(search_functions_sql(kind, reloptions))
+    print(f"Installed match_documents and comprehensive_search_v1 ({VECTOR_METRIC}, "
+          f"{' '.join(search_settings_sql(kind, reloptions)) or 'no index settings'})")
+
+def status(cur):
+    rows = count_rows(cur)
+    kind, reloptions, definition = index_info(cur)
+    print(f"Rows: {rows}")
+    if not kind:
+        print("Index: none (every query is a sequential scan)")
+        return
+    print(f"Index: {definition}")
+    if operator_class() not in definition:
+        print(f"WARNING: index does not use {operator_class()}, so queries ordering by "
+              f"{distance_operator()} ({VECTOR_METRIC}) cannot use it; run 'build'")
+    print(f"Query settings: {' '.join(search_settings_sql(kind, reloptions)) or 'none'}")
+
+def explain(cur):
+    """Check that a top-k query plans an index scan with the settings the query paths use"""
+    kind, reloptions, _ = index_info(cur)
+    for statement in search_settings_sql(kind, reloptions):
+        cur.execute(statement)
+
+    probe = "[" + ",".join(["0.1"] * EMBEDDING_DIMENSIONS) + "]"
+    query = f"EXPLAIN SELECT id FROM documents ORDER BY embedding {distance_operator()} %s::vector LIMIT 5"
+    cur.execute(query, (probe,))
+    plan = "\n".join(row[0] for row in cur.fetchall())
+    print(plan)
+    if INDEX_NAME in plan:
+        print(f"OK: the query uses {INDEX_NAME}")
+        return True
+
+    # Small tables legitimately prefer a sequential scan; check the index is at least usable
+    cur.execute("SET enable_seqscan = off")
+    cur.execute(query, (probe,))
+    usable = INDEX_NAME in "\n".join(row[0] for row in cur.fetchall())
+    cur.execute("RESET enable_seqscan")
+    if usable:
+        print(f"The planner prefers a sequential scan at this table size, but {INDEX_NAME} is usable")
+    else:
+        print(f"FAIL: {INDEX_NAME} cannot serve ORDER BY embedding {distance_operator()}; run 'build'")
+    return usable
+
+def main():
+    parser = argparse.ArgumentParser(description="Build, inspect and verify the documents.embedding index")
+    parser.add_argument("command", choices=["build", "status", "explain", "functions"])
+    parser.add_argument("--kind", choices=INDEX_KINDS, default=VECTOR_INDEX_KIND,
+                        help="index type for 'build' (default: VECTOR_INDEX_KIND or ivfflat)")
+    parser.add_argument("--force", action="store_true", help="build an ivfflat index even on a small table")
+    args = parser.parse_args()
+
+    conn = connect()
+    # Each statement commits on its own, as in the Supabase SQL editor
+    conn.autocommit = True
+    cur = conn.cursor()
+    try:
+        if args.command == "build":
+            build(cur, args.kind, args.force)
+            install_functions(cur)
+            explain(cur)
+        elif args.command == "status":
+            status(cur)
+        elif args.command == "functions":
+            install_functions(cur)
+        elif not explain(cur):
+            sys.exit(1)
+    finally:
+        cur.close()
+        conn.close()
+
+if __name__ == "__main__":
+    main()
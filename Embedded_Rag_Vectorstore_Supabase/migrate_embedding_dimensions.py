@@ -0,0 +1,114 @@
+import os
+import sys
+import argparse
+from dotenv import load_dotenv
+import psycopg2
+
+# Shared ingestion helpers live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from embedding_batcher import EMBEDDING_DIMENSIONS
+from vector_index import INDEX_NAME, index_build_sql, should_build_index
+
+# Load environment variables
+load_dotenv()
+
+SUPABASE_DB_HOST = os.getenv("SUPABASE_DB_HOST")
+SUPABASE_DB_PORT = int(os.getenv("SUPABASE_DB_PORT", 5432))
+SUPABASE_DB_NAME = os.getenv("SUPABASE_DB_NAME")
+SUPABASE_DB_USER = os.getenv("SUPABASE_DB_USER")
+SUPABASE_DB_PASSWORD = os.getenv("SUPABASE_DB_PASSWORD")
+
+# subvector() and l2_normalize() arrived in pgvector 0.7.0
+MIN_PGVECTOR_VERSION = (0, 7, 0)
+
+def shrink_sql(dimensions, rows):
+    """Shorten stored vectors in place, the same way the API's dimensions parameter does"""
+    return [
+        f"ALTER TABLE documents ADD COLUMN embedding_new vector({dimensions});",
+        f"UPDATE documents SET embedding_new = l2_normalize(subvector(embedding, 1, {dimensions}))::vector({dimensions});",
+        f"DROP INDEX IF EXISTS {INDEX_NAME};",
+        "ALTER TABLE documents DROP COLUMN embedding;",
+        "ALTER TABLE documents RENAME COLUMN embedding_new TO embedding;",
+        "ALTER TABLE documents ALTER COLUMN embedding SET NOT NULL;",
+    ] + index_build_sql(rows)
+
+def reset_sql(dimensions):
+    """Larger vectors cannot be derived from smaller ones, so the table is emptied for re-ingestion"""
+    # The index is rebuilt with manage_vector_index.py once the table is filled again
+    return [
+        f"DROP INDEX IF EXISTS {INDEX_NAME};",
+        "DELETE FROM documents;",
+        f"ALTER TABLE documents ALTER COLUMN embedding TYPE vector({dimensions});",
+    ]
+
+def current_dimensions(cur):
+    # pgvector stores the declared size as the column's type modifier
+    cur.execute(
+        "SELECT atttypmod FROM pg_attribute "
+        "WHERE attrelid = 'documents'::regclass AND attname = 'embedding'"
+    )
+    return cur.fetchone()[0]
+
+def pgvector_version(cur):
+    cur.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+    return tuple(int(part) for part in cur.fetchone()[0].split("."))
+
+def main():
+    parser = argparse.ArgumentParser(description="Resize the documents.embedding column")
+    parser.add_argument("--dimensions", type=int, default=EMBEDDING_DIMENSIONS,
+                        help="target size (default: EMBEDDING_DIMENSIONS)")
+    parser.add_argument("--dry-run", action="store_true", help="print the SQL without running it")
+    parser.add_argument("--reset", action="store_true",
+                        help="allow growing the column, which deletes all rows for re-ingestion")
+    args = parser.parse_args()
+
+    if not all([SUPABASE_DB_HOST, SUPABASE_DB_NAME, SUPABASE_DB_USER, SUPABASE_DB_PASSWORD]):
+        raise ValueError("Missing required environment variables. Please check your .env file.")
+
+    conn = psycopg2.connect(
+        host=SUPABASE_DB_HOST,
+        port=SUPABASE_DB_PORT,
+        dbname=SUPABASE_DB_NAME,
+        user=SUPABASE_DB_USER,
+        password=SUPABASE_DB_PASSWORD
+    )
+    cur = conn.cursor()
+    current = current_dimensions(cur)
+    target = args.dimensions
+    print(f"documents.embedding is vector({current}), target is vector({target})")
+
+    if current == target:
+        print("Nothing to do.")
+        return
+    if args.reset:
+        statements = reset_sql(target)
+    elif target > current:
+        raise SystemExit("Growing the column needs fresh embeddings; re-run with --reset, then re-ingest.")
+    elif pgvector_version(cur) < MIN_PGVECTOR_VERSION:
+        raise SystemExit("In-place shrinking needs pgvector 0.7.0+; upgrade it or use --reset and re-ingest.")
+    else:
+        cur.execute("SELECT count(*) FROM documents")
+        rows = cur.fetchone()[0]
+        statements = shrink_sql(target, rows)
+        if not should_build_index(rows):
+            print(f"Only {rows} rows: the index is dropped, not rebuilt; "
+                  "run 'python manage_vector_index.py build' after loading more.")
+
+    for statement in statements:
+        print(statement)
+    if args.dry_run:
+        return
+
+    # One transaction: readers see either the old column or the new one
+    for statement in statements:
+        cur.execute(statement)
+    conn.commit()
+    cur.close()
+    conn.close()
+    print(f"Migrated documents.embedding to vector({target}). Set EMBEDDING_DIMENSIONS={target} for all scripts.")
+    if args.reset:
+        print("The table is empty: re-ingest with 'python improved_chunk_processor.py --full' or ingest_to_supabase.py, "
+              "then run 'python manage_vector_index.py build'.")
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,14 @@
 import os
+import sys
 from dotenv import load_dotenv
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from openai import OpenAI
-import tiktoken
+
+# Shared ingestion helpers live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from embedding_batcher import EmbeddingBatcher
+from embedding_cache import EmbeddingCache
+from token_chunker import TokenChunker
+from embedding_store import save_store
 
 # Load environment variables
 load_dotenv()
@@ -20,33 +26,32 @@ FILES = [
     ("Axie Studio Knowledge Base.txt", "knowledge_base"),
 ]
 
-# Chunking parameters
-CHUNK_SIZE = 500
-CHUNK_OVERLAP = 50
+# Chunking parameters, in model tokens
+CHUNK_TOKENS = 256
+CHUNK_OVERLAP_TOKENS = 32
+
+chunker = TokenChunker(CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS)
 
 def read_file(filepath):
     with open(filepath, "r", encoding="utf-8") as f:
         return f.read()
 
 def chunk_text(text, source):
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP,
-        separators=["\n\n", "\n", ".", "!", "?", " "]
-    )
-    chunks = splitter.split_text(text)
+    chunks = chunker.split(text)
     return [{"content": chunk, "source": source} for chunk in chunks]
 
 def embed_chunks(chunks):
     client = OpenAI(api_key=OPENAI_API_KEY)
+    batcher = EmbeddingBatcher(client, cache=EmbeddingCache())
+    vectors = batcher.embed([chunk["content"] for chunk in chunks])
     embeddings = []
-    for chunk in chunks:
-        response = client.embeddings.create(
-            input=chunk["content"],
-            model="text-embedding-3-small"
-        )
-        chunk["embedding"] = response.data[0].embedding
+    for chunk, vector in zip(chunks, vectors):
+        if vector is None:
+            print(f"Skipping chunk from {chunk['source']}: embedding failed")
+            continue
+        chunk["embedding"] = vector
         embeddings.append(chunk)
+    print(f"Embedding API calls: {batcher.requests_made} (cache: {batcher.cache.stats()})")
     return embeddings
 
 def main():
@@ -61,11 +66,9 @@ def main():
     embedded_chunks = embed_chunks(all_chunks)
     print(f"Embedded {len(embedded_chunks)} chunks.")
 
-    # Save to file for ingestion
-    import json
-    with open("embedded_chunks.json", "w", encoding="utf-8") as f:
-        json.dump(embedded_chunks, f, ensure_ascii=False, indent=2)
-    print("Saved embedded chunks to embedded_chunks.json")
+    # Save to a binary store for ingestion and local search
+    matrix_path, records_path = save_store("embedded_chunks", embedded_chunks)
+    print(f"Saved embedded chunks to {matrix_path} and {records_path}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,9 +1,16 @@
 import os
+import sys
 from dotenv import load_dotenv
 from openai import OpenAI
-import psycopg2
 import numpy as np
 
+# Shared ingestion helpers live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from embedding_batcher import embedding_params
+from embedding_cache import EmbeddingCache
+from postgres_vector_store import PostgresVectorStore
+from query_embedding_cache import QueryEmbeddingCache
+
 # Load environment variables
 load_dotenv()
 
@@ -20,44 +27,42 @@ required_vars = [OPENAI_API_KEY, SUPABASE_DB_HOST, SUPABASE_DB_NAME, SUPABASE_DB
 if not all(required_vars):
     raise ValueError("Missing required environment variables. Please check your .env file.")
 
+# Each run answers one question, so only the shared on-disk store carries embeddings between runs
+query_cache = QueryEmbeddingCache(store=EmbeddingCache())
+
 def embed_query(query):
+    return query_cache.get_or_embed(query, create_query_embedding)
+
+def create_query_embedding(query):
     client = OpenAI(api_key=OPENAI_API_KEY)
     response = client.embeddings.create(
         input=query,
-        model="text-embedding-3-small"
+        **embedding_params()
     )
     return response.data[0].embedding
 
+# Opened on the first query; later queries reuse its warm connection and prepared statement
+vector_store = None
+
 def query_supabase(query_embedding, top_k=1):
-    # Connect to Supabase Postgres
-    conn = psycopg2.connect(
-        host=SUPABASE_DB_HOST,
-        port=SUPABASE_DB_PORT,
-        dbname=SUPABASE_DB_NAME,
-        user=SUPABASE_DB_USER,
-        password=SUPABASE_DB_PASSWORD
-    )
-    cur = conn.cursor()
-    # Prepare the embedding as a Postgres array
-    emb_str = "[" + ",".join([str(x) for x in query_embedding]) + "]"
-    sql = f"""
-        SELECT content, source, embedding <#> %s AS distance
-        FROM documents
-        ORDER BY embedding <#> %s
-        LIMIT {top_k};
-    """
-    cur.execute(sql, (emb_str, emb_str))
-    results = cur.fetchall()
-    cur.close()
-    conn.close()
-    return results
+    global vector_store
+    if vector_store is None:
+        vector_store = PostgresVectorStore(min_size=1, max_size=2)
+    return vector_store.search(query_embedding, top_k)
 
 def main():
-    user_query = input("Enter your question: ")
-    query_embedding = embed_query(user_query)
-    results = query_supabase(query_embedding, top_k=3)
-    for idx, (content, source, distance) in enumerate(results, 1):
-        print(f"\nResult {idx} (source: {source}, distance: {distance:.4f}):\n{content}\n")
+    try:
+        while True:
+            user_query = input("Enter your question (empty to exit): ").strip()
+            if not user_query:
+                break
+            query_embedding = embed_query(user_query)
+            results = query_supabase(np.asarray(query_embedding, dtype=np.float32), top_k=3)
+            for idx, (content, source, distance) in enumerate(results, 1):
+                print(f"\nResult {idx} (source: {source}, distance: {distance:.4f}):\n{content}\n")
+    finally:
+        if vector_store is not None:
+            vector_store.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,65 @@
+-- Search functions called over RPC by enhanced_query_system.py (run after supabase_vector_table.sql)
+-- Versioned by name: a changed signature or result shape gets a new _vN function so
+-- older clients keep working until they are updated. Re-running this file is safe.
+-- query_embedding is an unsized vector so the functions survive migrate_embedding_dimensions.py.
+-- Generated by vector_index.search_functions_sql() for the default cosine metric and an ivfflat
+-- index with lists = 100. `python manage_vector_index.py build` (or `functions`) recreates them
+-- with the operator of VECTOR_METRIC and the probes / ef_search of the index actually built,
+-- so the RPCs always use the index. The index settings include an iterative scan, which
+-- needs pgvector 0.8.0 or later (ALTER EXTENSION vector UPDATE).
+
+-- Top matches for a query embedding, optionally restricted to rows whose metadata
+-- contains filter (e.g. '{"chunk_type": "pricing"}'). The filter is checked on the rows
+-- the index scan returns, and an iterative scan keeps going until match_count rows pass it.
+-- The similarity threshold is applied to those top match_count rows.
+-- Rows without metadata only match the empty filter.
+CREATE OR REPLACE FUNCTION match_documents(
+    query_embedding vector,
+    match_threshold float DEFAULT 0.7,
+    match_count int DEFAULT 10,
+    filter jsonb DEFAULT '{}'
+)
+RETURNS TABLE (id uuid, content text, source text, metadata jsonb, similarity float)
+LANGUAGE sql STABLE
+SET ivfflat.probes = 10
+SET ivfflat.iterative_scan = relaxed_order
+AS $$
+    SELECT m.id, m.content, m.source, m.metadata, m.similarity
+    FROM (
+        SELECT d.id, d.content, d.source, d.metadata,
+               1 - (d.embedding <=> query_embedding) AS similarity
+        FROM documents d
+        WHERE filter = '{}'::jsonb OR COALESCE(d.metadata, '{}'::jsonb) @> filter
+        ORDER BY d.embedding <=> query_embedding
+        LIMIT match_count
+    ) m
+    WHERE m.similarity > match_threshold
+    -- An iterative scan may return rows slightly out of order
+    ORDER BY m.similarity DESC;
+$$;
+
+-- Semantic matches plus the closest rows of each chunk type in one round trip.
+-- buckets maps chunk_type -> row count; each result row is tagged with its bucket
+-- ('semantic_search' or the chunk_type). Buckets ignore the similarity threshold.
+CREATE OR REPLACE FUNCTION comprehensive_search_v1(
+    query_embedding vector,
+    match_threshold float DEFAULT 0.7,
+    semantic_count int DEFAULT 5,
+    buckets jsonb DEFAULT '{"pricing": 3, "contact": 3, "key_fact": 5, "full_document": 2}',
+    filter jsonb DEFAULT '{}'
+)
+RETURNS TABLE (bucket text, id uuid, content text, source text, metadata jsonb, similarity float)
+LANGUAGE sql STABLE
+SET ivfflat.probes = 10
+SET ivfflat.iterative_scan = relaxed_order
+AS $$
+    SELECT 'semantic_search', m.*
+    FROM match_documents(query_embedding, match_threshold, semantic_count, filter) m
+    UNION ALL
+    SELECT b.key, m.*
+    FROM jsonb_each_text(buckets) b
+    CROSS JOIN LATERAL match_documents(
+        query_embedding, '-infinity', b.value::int,
+        COALESCE(filter, '{}'::jsonb) || jsonb_build_object('chunk_type', b.key)
+    ) m;
+$$;
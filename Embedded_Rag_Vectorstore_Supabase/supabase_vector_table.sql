@@ -1,17 +1,34 @@
--- Enable pgvector extension (run as superuser if not already enabled)
-CREATE EXTENSION IF NOT EXISTS vector;
-
--- Create the documents table for RAG
-CREATE TABLE IF NOT EXISTS documents (
-    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
-    content text NOT NULL,
-    embedding vector(1536) NOT NULL,
-    source text,
-    metadata jsonb
-);
-
--- Optional: Create an index for fast vector similarity search
-CREATE INDEX IF NOT EXISTS idx_documents_embedding
-ON documents
-USING ivfflat (embedding vector_cosine_ops)
-WITH (lists = 100);
\ No newline at end of file
+-- Enable pgvector extension (run as superuser if not already enabled)
+CREATE EXTENSION IF NOT EXISTS vector;
+
+-- Create the documents table for RAG
+-- vector(1536) must match EMBEDDING_DIMENSIONS (e.g. 256 or 512 for smaller, faster
+-- text-embedding-3 vectors); resize an existing table with migrate_embedding_dimensions.py
+CREATE TABLE IF NOT EXISTS documents (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    content text NOT NULL,
+    embedding vector(1536) NOT NULL,
+    source text,
+    metadata jsonb
+);
+
+-- Vector index: build it AFTER the bulk load with `python manage_vector_index.py build`.
+-- ivfflat takes its centroids from the rows present at build time, so an index
+-- created on an empty table is useless; lists/probes are sized to the row count
+-- and VECTOR_INDEX_KIND=hnsw builds an HNSW index instead. Queries must order by
+-- the operator matching the operator class (<=> for vector_cosine_ops) or the
+-- index is ignored; `python manage_vector_index.py explain` checks the plan.
+-- Equivalent for ~100k rows:
+-- CREATE INDEX idx_documents_embedding ON documents
+-- USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
+-- ANALYZE documents;
+
+-- Ingestion scripts assign deterministic ids (uuid5 of source, chunk type and
+-- content) and upsert on id, so re-running them converges to the same rows.
+-- One-off cleanup of duplicates left by earlier random-id ingestion runs:
+-- DELETE FROM documents a
+-- USING documents b
+-- WHERE a.ctid < b.ctid
+--   AND a.content = b.content
+--   AND a.source IS NOT DISTINCT FROM b.source
+--   AND a.metadata->>'chunk_type' IS NOT DISTINCT FROM b.metadata->>'chunk_type';
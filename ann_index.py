@@ -0,0 +1,164 @@
+"""
+ANN Index
+Inverted-file (IVF) approximate nearest-neighbour index over the local
+embedding store, built with k-means in NumPy
+"""
+
+import math
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+METRICS = ("cosine", "inner_product")
+
+# k-means settings; training on a sample keeps build time flat as the corpus grows
+KMEANS_ITERATIONS = 20
+TRAINING_POINTS_PER_LIST = 256
+
+DEFAULT_N_PROBE = 8
+
+
+def default_n_lists(count: int) -> int:
+    """Rule-of-thumb list count: about sqrt(n), at least one"""
+    return max(1, int(math.sqrt(count)))
+
+
+class IVFIndex:
+    def __init__(self, dimensions: int, n_lists: Optional[int] = None, metric: str = "cosine", seed: int = 0):
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric {metric!r}, expected one of {METRICS}")
+        self.dimensions = dimensions
+        self.n_lists = n_lists
+        self.metric = metric
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        # One (vectors, ids) pair per inverted list
+        self.list_vectors: List[np.ndarray] = []
+        self.list_ids: List[np.ndarray] = []
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def prepare(self, vectors: Sequence[Sequence[float]]) -> np.ndarray:
+        """Convert to float32 and, for cosine, to unit length so scoring is a plain dot product"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors[np.newaxis, :]
+        if vectors.shape[1] != self.dimensions:
+            raise ValueError(f"Vectors have {vectors.shape[1]} dimensions, index has {self.dimensions}")
+        if self.metric == "cosine":
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            vectors = vectors / norms
+        return np.ascontiguousarray(vectors)
+
+    def assign(self, vectors: np.ndarray) -> np.ndarray:
+        """Nearest centroid (by inner product) for each prepared vector"""
+        return np.argmax(vectors @ self.centroids.T, axis=1)
+
+    def train(self, vectors: Sequence[Sequence[float]], n_lists: Optional[int] = None) -> None:
+        """Learn list centroids with spherical k-means on a sample of the vectors"""
+        data = self.prepare(vectors)
+        n_lists = min(n_lists or self.n_lists or default_n_lists(len(data)), len(data))
+        rng = np.random.default_rng(self.seed)
+
+        sample_size = min(len(data), n_lists * TRAINING_POINTS_PER_LIST)
+        sample = data[rng.choice(len(data), sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+
+        for _ in range(KMEANS_ITERATIONS):
+            self.centroids = centroids
+            labels = self.assign(sample)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=n_lists)
+            empty = counts == 0
+            # Re-seed empty lists with random points instead of letting them die
+            sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+
+        self.centroids = centroids
+        self.n_lists = n_lists
+        self.list_vectors = [np.empty((0, self.dimensions), dtype=np.float32) for _ in range(n_lists)]
+        self.list_ids = [np.empty(0, dtype=np.int64) for _ in range(n_lists)]
+        self.count = 0
+
+    def add(self, vectors: Sequence[Sequence[float]], ids: Optional[Sequence[int]] = None) -> None:
+        """Add vectors to their nearest lists; ids default to consecutive row numbers"""
+        data = self.prepare(vectors)
+        if len(data) == 0:
+            return
+        if not self.is_trained:
+            self.train(data)
+        ids = np.arange(self.count, self.count + len(data)) if ids is None else np.asarray(ids, dtype=np.int64)
+
+        labels = self.assign(data)
+        for list_number in np.unique(labels):
+            members = labels == list_number
+            self.list_vectors[list_number] = np.concatenate([self.list_vectors[list_number], data[members]])
+            self.list_ids[list_number] = np.concatenate([self.list_ids[list_number], ids[members]])
+        self.count += len(data)
+
+    def search(self, queries: Sequence[Sequence[float]], top_k: int = 5,
+               n_probe: int = DEFAULT_N_PROBE) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (ids, scores) of shape (queries, top_k), scanning the n_probe closest lists per query"""
+        if not self.is_trained:
+            raise ValueError("Index is empty; add vectors before searching")
+        queries = self.prepare(queries)
+        n_probe = min(n_probe, self.n_lists)
+        # Queries with fewer than top_k candidates are padded with id -1
+        result_ids = np.full((len(queries), top_k), -1, dtype=np.int64)
+        result_scores = np.full((len(queries), top_k), -np.inf, dtype=np.float32)
+
+        centroid_scores = queries @ self.centroids.T
+        probes = np.argpartition(-centroid_scores, n_probe - 1, axis=1)[:, :n_probe]
+
+        for row, (query, lists) in enumerate(zip(queries, probes)):
+            candidates = np.concatenate([self.list_vectors[l] for l in lists])
+            if len(candidates) == 0:
+                continue
+            candidate_ids = np.concatenate([self.list_ids[l] for l in lists])
+            scores = candidates @ query
+            k = min(top_k, len(scores))
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best], kind="stable")]
+            result_ids[row, :k] = candidate_ids[best]
+            result_scores[row, :k] = scores[best]
+
+        return result_ids, result_scores
+
+    def save(self, path: str) -> None:
+        """Write the index to a single .npz file"""
+        if not self.is_trained:
+            raise ValueError("Cannot save an untrained index")
+        sizes = np.array([len(ids) for ids in self.list_ids], dtype=np.int64)
+        np.savez(
+            path,
+            centroids=self.centroids,
+            vectors=np.concatenate(self.list_vectors),
+            ids=np.concatenate(self.list_ids),
+            sizes=sizes,
+            metric=np.array(self.metric),
+            seed=np.array(self.seed)
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        """Read an index written by save()"""
+        with np.load(path) as data:
+            centroids = data["centroids"]
+            index = cls(centroids.shape[1], len(centroids), str(data["metric"]), int(data["seed"]))
+            index.centroids = centroids
+            offsets = np.concatenate([[0], np.cumsum(data["sizes"])])
+            vectors, ids = data["vectors"], data["ids"]
+            index.list_vectors = [vectors[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+            index.list_ids = [ids[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+            index.count = int(offsets[-1])
+        return index
@@ -0,0 +1,111 @@
+"""
+Answer Cache
+Reuses a generated answer when a new question embeds close to a cached one and
+retrieval returned the same context; re-ingestion clears every entry
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from corpus_version import CORPUS_VERSION_PATH, corpus_version
+
+# Cosine similarity a new question needs to a cached one to reuse its answer
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", 0.95))
+# Answers kept per process; 0 disables the cache
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", 512))
+
+
+def unit_vector(vector: List[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return array / norm if norm else array
+
+
+def context_fingerprint(context_docs: List[Dict[str, Any]]) -> str:
+    """Hash the ids and contents of the documents placed in the prompt"""
+    # Content is included so rows rewritten under the same id, e.g. from another host, still miss
+    payload = [[doc.get("id"), doc.get("content")] for doc in context_docs]
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class SemanticAnswerCache:
+    def __init__(self, similarity: float = ANSWER_CACHE_SIMILARITY, max_entries: int = ANSWER_CACHE_SIZE,
+                 version_path: str = CORPUS_VERSION_PATH):
+        self.similarity = similarity
+        self.max_entries = max_entries
+        self.version_path = version_path
+        self.version = corpus_version(version_path)
+        # entry id -> (context fingerprint, unit query vector, answer), least recently used first
+        self.entries: "OrderedDict[int, tuple]" = OrderedDict()
+        # context fingerprint -> entry ids, so a lookup only scores questions over the same context
+        self.by_context: Dict[str, List[int]] = {}
+        self.next_id = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def _check_version(self) -> None:
+        version = corpus_version(self.version_path)
+        if version != self.version:
+            self.version = version
+            if self.entries:
+                self.invalidations += 1
+            self.entries.clear()
+            self.by_context = {}
+
+    def get(self, query_embedding: List[float], context_docs: List[Dict[str, Any]]) -> Optional[str]:
+        """Answer cached for a similar question over the same context, or None"""
+        if self.max_entries <= 0:
+            return None
+        vector = unit_vector(query_embedding)
+        fingerprint = context_fingerprint(context_docs)
+        with self._lock:
+            self._check_version()
+            best = None
+            ids = self.by_context.get(fingerprint)
+            if ids:
+                scores = np.stack([self.entries[entry_id][1] for entry_id in ids]) @ vector
+                position = int(np.argmax(scores))
+                if scores[position] >= self.similarity:
+                    best = ids[position]
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(best)
+            return self.entries[best][2]
+
+    def put(self, query_embedding: List[float], context_docs: List[Dict[str, Any]], answer: str) -> None:
+        if self.max_entries <= 0 or not answer:
+            return
+        fingerprint = context_fingerprint(context_docs)
+        with self._lock:
+            self._check_version()
+            self.entries[self.next_id] = (fingerprint, unit_vector(query_embedding), answer)
+            self.by_context.setdefault(fingerprint, []).append(self.next_id)
+            self.next_id += 1
+            while len(self.entries) > self.max_entries:
+                entry_id, (old_fingerprint, _, _) = self.entries.popitem(last=False)
+                ids = self.by_context[old_fingerprint]
+                ids.remove(entry_id)
+                if not ids:
+                    del self.by_context[old_fingerprint]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters, invalidations and the entry count"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "entries": len(self.entries)
+            }
@@ -0,0 +1,179 @@
+"""
+Async Query System
+asyncio version of EnhancedQuerySystem: each question is a coroutine on shared
+async OpenAI and Supabase clients, so one process serves many at once
+"""
+
+import asyncio
+import os
+from typing import Any, Dict, List, Optional
+
+from openai import AsyncOpenAI
+from supabase import AsyncClient, acreate_client
+
+from answer_cache import SemanticAnswerCache
+from embedding_batcher import embedding_params
+from enhanced_query_system import (ANSWER_CONTEXT_DOCS, ANSWER_MODEL, COMPREHENSIVE_SEARCH_RPC, OPENAI_API_KEY,
+                                   SUPABASE_SERVICE_KEY, SUPABASE_URL, answer_messages, comprehensive_search_params,
+                                   group_search_rows)
+from query_embedding_cache import QueryEmbeddingCache
+
+# Questions answered at once per process; the rest wait for a slot without holding a thread
+MAX_CONCURRENT_QUESTIONS = int(os.getenv("MAX_CONCURRENT_QUESTIONS", 200))
+
+
+class AsyncQuerySystem:
+    def __init__(self, client: AsyncOpenAI, supabase: AsyncClient,
+                 max_concurrent: int = MAX_CONCURRENT_QUESTIONS):
+        self.client = client
+        self.supabase = supabase
+        self.slots = asyncio.Semaphore(max_concurrent)
+        self.query_cache = QueryEmbeddingCache.from_env()
+        self.answer_cache = SemanticAnswerCache()
+
+    @classmethod
+    async def create(cls, max_concurrent: int = MAX_CONCURRENT_QUESTIONS) -> "AsyncQuerySystem":
+        """Build the clients inside the running event loop"""
+        supabase = await acreate_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+        return cls(AsyncOpenAI(api_key=OPENAI_API_KEY), supabase, max_concurrent)
+
+    async def close(self) -> None:
+        """Close the OpenAI and Supabase HTTP connections"""
+        try:
+            await self.client.close()
+        finally:
+            # AsyncClient has no close of its own; its PostgREST client owns the HTTP session
+            await self.supabase.postgrest.aclose()
+
+    async def get_embedding(self, text: str) -> List[float]:
+        """Generate embedding for query text"""
+        # The shared store is SQLite, so its lookups run off the event loop
+        shared = self.query_cache.store is not None
+        vector = await asyncio.to_thread(self.query_cache.get, text) if shared else self.query_cache.get(text)
+        if vector is not None:
+            return vector
+
+        response = await self.client.embeddings.create(input=text, **embedding_params())
+        vector = response.data[0].embedding
+        if shared:
+            await asyncio.to_thread(self.query_cache.put, text, vector)
+        else:
+            self.query_cache.put(text, vector)
+        return vector
+
+    async def search_documents(self, query: str, limit: int = 10, similarity_threshold: float = 0.7,
+                               filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Search documents using vector similarity"""
+        query_embedding = await self.get_embedding(query)
+        response = await self.supabase.rpc(
+            'match_documents',
+            {
+                'query_embedding': query_embedding,
+                'match_threshold': similarity_threshold,
+                'match_count': limit,
+                'filter': filters or {}
+            }
+        ).execute()
+        return response.data if response.data else []
+
+    async def search_by_source(self, source: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Search documents by source file"""
+        response = await self.supabase.table("documents").select("*").eq("source", source).limit(limit).execute()
+        return response.data if response.data else []
+
+    async def comprehensive_search(self, query: str, similarity_threshold: float = 0.7,
+                                   filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Perform comprehensive search across all document types"""
+        query_embedding = await self.get_embedding(query)
+        response = await self.supabase.rpc(
+            COMPREHENSIVE_SEARCH_RPC,
+            comprehensive_search_params(query_embedding, similarity_threshold, filters)
+        ).execute()
+        return group_search_rows(response.data or [])
+
+    async def search_sources(self, query: str, sources: List[str]) -> Dict[str, Any]:
+        """Comprehensive search plus the chunks of specific source files, fetched concurrently"""
+        results, *by_source = await asyncio.gather(
+            self.comprehensive_search(query),
+            *[self.search_by_source(source) for source in sources]
+        )
+        results["sources"] = [doc for docs in by_source for doc in docs]
+        return results
+
+    async def generate_answer(self, query: str, context_docs: List[Dict[str, Any]]) -> str:
+        """Generate comprehensive answer using retrieved context"""
+        query_embedding = await self.get_embedding(query)
+        prompt_docs = context_docs[:ANSWER_CONTEXT_DOCS]
+        # Lookups read the corpus version file, so they run off the event loop
+        cached = await asyncio.to_thread(self.answer_cache.get, query_embedding, prompt_docs)
+        if cached is not None:
+            return cached
+
+        response = await self.client.chat.completions.create(
+            model=ANSWER_MODEL,
+            messages=answer_messages(query, context_docs),
+            max_tokens=500,
+            temperature=0.3
+        )
+        answer = response.choices[0].message.content
+        await asyncio.to_thread(self.answer_cache.put, query_embedding, prompt_docs, answer)
+        return answer
+
+    async def answer(self, query: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Retrieve context and answer one question; cancelling the task aborts the in-flight request"""
+        async with self.slots:
+            return await asyncio.wait_for(self._answer(query), timeout)
+
+    async def _answer(self, query: str) -> Dict[str, Any]:
+        results = await self.comprehensive_search(query)
+        all_docs = [doc for docs in results.values() for doc in docs]
+        if not all_docs:
+            return {"query": query, "answer": None, "documents": []}
+        answer = await self.generate_answer(query, all_docs)
+        return {"query": query, "answer": answer, "documents": all_docs}
+
+    async def answer_many(self, queries: List[str], timeout: Optional[float] = None) -> List[Any]:
+        """Answer questions concurrently; a failed or timed-out question yields its exception"""
+        return await asyncio.gather(*[self.answer(query, timeout) for query in queries],
+                                    return_exceptions=True)
+
+
+async def main():
+    query_system = await AsyncQuerySystem.create()
+
+    print("Async Axie Studio Query System")
+    print("=" * 40)
+
+    try:
+        while True:
+            query = (await asyncio.to_thread(input, "\nEnter your question (or 'quit' to exit): ")).strip()
+
+            if query.lower() in ['quit', 'exit', 'q']:
+                print(f"Query embedding cache: {query_system.query_cache.stats()}")
+                print(f"Answer cache: {query_system.answer_cache.stats()}")
+                break
+
+            if not query:
+                continue
+
+            print("\nSearching...")
+            result = await query_system.answer(query)
+
+            if not result["documents"]:
+                print("No relevant information found.")
+                continue
+
+            print(f"\nAnswer:\n{result['answer']}")
+
+            # Show source information
+            print(f"\nBased on {len(result['documents'])} relevant documents:")
+            for i, doc in enumerate(result["documents"][:3], 1):
+                title = doc.get("metadata", {}).get("title", "Unknown")
+                chunk_type = doc.get("metadata", {}).get("chunk_type", "unknown")
+                print(f"{i}. {title} ({chunk_type})")
+    finally:
+        await query_system.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
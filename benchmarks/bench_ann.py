@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+ANN Benchmark
+Recall@k and latency of the IVF index against exact search, on clustered
+synthetic vectors or on the local embedding store
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ann_index import IVFIndex
+from embedding_store import load_chunks
+from local_vector_search import LocalVectorIndex
+
+N_PROBES = (1, 2, 4, 8, 16, 32, 64)
+
+
+def synthetic_corpus(count, dimensions, clusters, seed=0):
+    """Unit vectors scattered around random topic centres, like real embedding corpora"""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dimensions)).astype(np.float32)
+    labels = rng.integers(0, clusters, count)
+    vectors = centres[labels] + 1.5 * rng.standard_normal((count, dimensions)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def recall_at_k(approximate, exact):
+    """Fraction of the exact top-k ids that the approximate search also returned"""
+    hits = sum(len(set(a) & set(e)) for a, e in zip(approximate, exact))
+    return hits / exact.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--store", help="embedding store to index instead of synthetic data")
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--lists", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.store:
+        corpus, _ = load_chunks(args.store)
+        corpus = np.asarray(corpus, dtype=np.float32)
+    else:
+        corpus = synthetic_corpus(args.count, args.dimensions, args.clusters)
+    rng = np.random.default_rng(1)
+    queries = corpus[rng.choice(len(corpus), min(args.queries, len(corpus)), replace=False)]
+    queries = queries + 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+    print(f"Corpus: {corpus.shape[0]} x {corpus.shape[1]}, queries: {len(queries)}, k={args.top_k}")
+
+    # Both searches are timed one query at a time, as the query path issues them
+    exact_index = LocalVectorIndex(corpus, [{"id": i} for i in range(len(corpus))])
+    start = time.perf_counter()
+    exact = np.array([[r["id"] for r in exact_index.search(query, args.top_k)] for query in queries])
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    start = time.perf_counter()
+    index = IVFIndex(corpus.shape[1], args.lists)
+    # Build in two halves to exercise incremental add
+    half = len(corpus) // 2
+    index.add(corpus[:half])
+    index.add(corpus[half:])
+    build_s = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "index.npz")
+        index.save(path)
+        start = time.perf_counter()
+        index = IVFIndex.load(path)
+        load_ms = (time.perf_counter() - start) * 1000
+    print(f"IVF: {index.n_lists} lists, built in {build_s:.2f}s, loaded in {load_ms:.1f} ms")
+    print(f"Exact search: {exact_ms:.3f} ms/query")
+
+    print(f"{'n_probe':>8} {'recall@' + str(args.top_k):>10} {'ms/query':>9} {'speedup':>8}")
+    for n_probe in N_PROBES:
+        if n_probe > index.n_lists:
+            break
+        start = time.perf_counter()
+        ids = np.concatenate([index.search(query, args.top_k, n_probe)[0] for query in queries])
+        ann_ms = (time.perf_counter() - start) * 1000 / len(queries)
+        print(f"{n_probe:>8} {recall_at_k(ids, exact):>10.3f} {ann_ms:>9.3f} {exact_ms / ann_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Dimensions Benchmark
+Recall@k of shortened text-embedding-3 vectors against the full-size ranking
+on the local embedding store, plus index size and exact-search latency per size
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench_ann import recall_at_k, synthetic_corpus
+from embedding_store import DEFAULT_STORE_BASE, load_chunks, shorten_embeddings
+from local_vector_search import LocalVectorIndex
+
+DIMENSIONS = (256, 512, 1024, 1536)
+
+
+def neighbours(matrix, top_k):
+    """Leave-one-out top_k neighbours of every row"""
+    scores = matrix @ matrix.T
+    np.fill_diagonal(scores, -np.inf)
+    return np.argsort(-scores, axis=1)[:, :top_k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--store", default=DEFAULT_STORE_BASE, help="embedding store with full-size vectors")
+    parser.add_argument("--count", type=int, default=50000, help="synthetic rows for the latency table")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus, _ = load_chunks(args.store)
+    corpus = np.asarray(corpus, dtype=np.float32)
+    full = corpus.shape[1]
+    top_k = min(args.top_k, len(corpus) - 1)
+    reference = neighbours(shorten_embeddings(corpus, full), top_k)
+    print(f"Store: {corpus.shape[0]} x {full}, leave-one-out recall@{top_k} against the full-size ranking")
+    for dimensions in DIMENSIONS:
+        if dimensions > full:
+            break
+        recall = recall_at_k(neighbours(shorten_embeddings(corpus, dimensions), top_k), reference)
+        print(f"{dimensions:>6} dims  recall@{top_k} {recall:.3f}")
+
+    # Latency depends only on the vector size, so synthetic rows stand in for a large corpus
+    synthetic = synthetic_corpus(args.count, max(DIMENSIONS), 200)
+    rng = np.random.default_rng(1)
+    query_rows = rng.choice(args.count, args.queries, replace=False)
+    print(f"\nExact search over {args.count} synthetic rows")
+    print(f"{'dims':>6} {'MB':>8} {'ms/query':>9}")
+    for dimensions in DIMENSIONS:
+        matrix = shorten_embeddings(synthetic, dimensions)
+        index = LocalVectorIndex(matrix, [{} for _ in range(args.count)])
+        start = time.perf_counter()
+        for row in query_rows:
+            index.search(matrix[row], top_k)
+        elapsed_ms = (time.perf_counter() - start) * 1000 / len(query_rows)
+        print(f"{dimensions:>6} {index.matrix.nbytes / 1e6:>8.1f} {elapsed_ms:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Extraction Benchmark
+Compares the shared extraction scan with the previous per-strategy regex
+passes on a large synthetic input built from the knowledge base
+"""
+
+import glob
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from extraction_engine import scan_text
+
+TXT_GLOB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        "Embedded_Rag_Vectorstore_Supabase", "Txt File", "*.txt")
+REPEATS = 5
+
+
+def legacy_scan(text):
+    """The extraction passes the chunkers used to run, one regex at a time"""
+    results = []
+    # extract_key_information
+    results.append(re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', text))
+    results.append(re.findall(r'[\+]?[1-9]?[0-9]{7,15}', text))
+    results.append(re.findall(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', text))
+    results.append(re.findall(r'[\$€£¥₹]\s*\d+(?:[\.,]\d+)*|(\d+(?:[\.,]\d+)*)\s*(?:kr|SEK|USD|EUR|GBP)', text))
+    results.append(re.findall(r'\d+\.\s+([^\n]+)', text))
+    results.append(re.findall(r'[•\-\*]\s+([^\n]+)', text))
+    # split_by_bullets
+    for pattern in [r'[•\-\*]\s+', r'✅\s+', r'🌐\s+', r'📱\s+', r'📅\s+', r'🛒\s+', r'✔\s+']:
+        results.append(re.split(pattern, text))
+    # extract_key_facts
+    results.append(re.findall(r'[🌐📱📅🛒✅✔🎯🌍💡🛠📊⚙️💬📍❓]\s*([^\n]+)', text))
+    results.append(re.findall(r'[-•*]\s*([^\n]+)', text))
+    results.append(re.findall(r'"([^"]+)"', text))
+    # extract_pricing_info
+    for pattern in [r'(\d+\s*\d*\s*kr[^\n]*)', r'(Startavgift[^\n]*)', r'(Månadsavgift[^\n]*)', r'(\d+\s*995[^\n]*)']:
+        results.append(re.findall(pattern, text, re.IGNORECASE))
+    # extract_contact_info
+    results.append(re.findall(r'([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})', text))
+    results.append(re.findall(r'(\+\d{2}\s*\d{3}\s*\d{3}\s*\d{3})', text))
+    results.append(re.findall(r'(www\.[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})', text))
+    return results
+
+
+def best_time(fn, text):
+    """Best wall-clock time of several runs"""
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn(text)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    corpus = "\n\n".join(open(path, encoding="utf-8").read() for path in sorted(glob.glob(TXT_GLOB)))
+    if not corpus:
+        print("No knowledge base files found")
+        return
+
+    print(f"{'size':>10} {'legacy ms':>10} {'engine ms':>10} {'speedup':>8}")
+    for multiplier in (1, 10, 100, 500):
+        text = corpus * multiplier
+        legacy = best_time(legacy_scan, text)
+        engine = best_time(scan_text, text)
+        print(f"{len(text):>10} {legacy * 1000:>10.1f} {engine * 1000:>10.1f} {legacy / engine:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
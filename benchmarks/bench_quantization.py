@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Quantization Benchmark
+Memory, recall@k and latency of int8 and product-quantized search, with and
+without full-precision rescoring, against exact search
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench_ann import recall_at_k, synthetic_corpus
+from embedding_store import load_chunks
+from local_vector_search import LocalVectorIndex
+from quantization import QuantizedIndex
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--store", help="embedding store to quantize instead of synthetic data")
+    parser.add_argument("--count", type=int, default=50000)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.store:
+        corpus, _ = load_chunks(args.store)
+    else:
+        corpus = synthetic_corpus(args.count, args.dimensions, args.clusters)
+    rng = np.random.default_rng(1)
+    queries = np.asarray(corpus[rng.choice(len(corpus), min(args.queries, len(corpus)), replace=False)], dtype=np.float32)
+    queries = queries + 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+    top_k = min(args.top_k, len(corpus))
+
+    exact_index = LocalVectorIndex(corpus, [{"id": i} for i in range(len(corpus))])
+    start = time.perf_counter()
+    exact = np.array([[r["id"] for r in exact_index.search(query, top_k)] for query in queries])
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    full_bytes = exact_index.matrix.nbytes
+    print(f"Corpus: {corpus.shape[0]} x {corpus.shape[1]}, queries: {len(queries)}, k={top_k}")
+    print(f"{'method':<16} {'MB':>8} {'smaller':>8} {'recall@' + str(top_k):>10} {'ms/query':>9}")
+    print(f"{'float32 exact':<16} {full_bytes / 1e6:>8.1f} {1.0:>7.1f}x {1.0:>10.3f} {exact_ms:>9.2f}")
+
+    for method in ("int8", "pq"):
+        start = time.perf_counter()
+        index = QuantizedIndex(corpus, method)
+        build_s = time.perf_counter() - start
+        for label, rescore_factor in (("", None), (" +rescore", 10)):
+            start = time.perf_counter()
+            ids = np.array([index.search(query, top_k, rescore_factor)[0] for query in queries])
+            elapsed_ms = (time.perf_counter() - start) * 1000 / len(queries)
+            print(f"{method + label:<16} {index.nbytes / 1e6:>8.1f} {full_bytes / index.nbytes:>7.1f}x "
+                  f"{recall_at_k(ids, exact):>10.3f} {elapsed_ms:>9.2f}")
+        print(f"  ({method} codes trained and encoded in {build_s:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
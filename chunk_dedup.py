@@ -0,0 +1,125 @@
+"""
+Chunk Deduplication
+Drops exact and near-identical chunks (MinHash over word shingles with LSH
+banding) before they reach the embedding API
+"""
+
+import hashlib
+import random
+import re
+from typing import Any, Dict, List, Set, Tuple
+
+SHINGLE_SIZE = 3
+NUM_PERMUTATIONS = 32
+LSH_BANDS = 8  # 8 bands x 4 rows: pairs above ~0.6 Jaccard become candidates
+DEFAULT_THRESHOLD = 0.85
+
+# Mersenne prime for the universal hash family used as permutations
+_PRIME = (1 << 61) - 1
+
+
+def shingles(text: str) -> Set[int]:
+    """Hash the word trigrams of a text into a set of 64-bit integers"""
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= SHINGLE_SIZE:
+        grams = [" ".join(words)]
+    else:
+        grams = [" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+    return {int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest(), "big") for g in grams}
+
+
+def jaccard(a: Set[int], b: Set[int]) -> float:
+    """Jaccard similarity of two shingle sets"""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class ChunkDeduplicator:
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, seed: int = 1):
+        self.threshold = threshold
+        # Fixed seed keeps signatures, and so the kept chunks, stable across runs
+        rng = random.Random(seed)
+        self.permutations = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(NUM_PERMUTATIONS)]
+        self.rows_per_band = NUM_PERMUTATIONS // LSH_BANDS
+
+    def signature(self, shingle_set: Set[int]) -> Tuple[int, ...]:
+        """MinHash signature of a shingle set"""
+        return tuple(min((a * x + b) % _PRIME for x in shingle_set) for a, b in self.permutations)
+
+    def band_keys(self, signature: Tuple[int, ...]) -> List[Tuple[int, Tuple[int, ...]]]:
+        """Split a signature into LSH band keys"""
+        r = self.rows_per_band
+        return [(band, signature[band * r:(band + 1) * r]) for band in range(LSH_BANDS)]
+
+    def merge_into(self, kept: Dict[str, Any], duplicate: Dict[str, Any]) -> None:
+        """Record a dropped chunk on the chunk that replaces it"""
+        merged = kept["metadata"].setdefault("merged_duplicates", [])
+        merged.append({"title": duplicate.get("title"), "chunk_type": duplicate.get("chunk_type")})
+
+    def deduplicate(self, chunks: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Keep the first of each group of near-identical chunks and report what was saved"""
+        kept, report, _ = self.deduplicate_with_sources(chunks)
+        return kept, report
+
+    def deduplicate_with_sources(self, chunks: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, Any], List[int]]:
+        """Like deduplicate, also returning for every input chunk the position of the kept chunk standing for it"""
+        sources = []
+        kept = []
+        kept_shingles = []
+        exact_index = {}
+        buckets = {}
+        dropped_exact = 0
+        dropped_near = 0
+        chars_saved = 0
+
+        for chunk in chunks:
+            content = chunk["content"]
+            normalized = " ".join(content.lower().split())
+            digest = hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+            if digest in exact_index:
+                sources.append(exact_index[digest])
+                self.merge_into(kept[exact_index[digest]], chunk)
+                dropped_exact += 1
+                chars_saved += len(content)
+                continue
+
+            shingle_set = shingles(normalized)
+            keys = self.band_keys(self.signature(shingle_set)) if shingle_set else []
+
+            candidates = set()
+            for key in keys:
+                candidates.update(buckets.get(key, ()))
+            duplicate_of = None
+            for index in sorted(candidates):
+                if jaccard(shingle_set, kept_shingles[index]) >= self.threshold:
+                    duplicate_of = index
+                    break
+
+            if duplicate_of is not None:
+                sources.append(duplicate_of)
+                self.merge_into(kept[duplicate_of], chunk)
+                dropped_near += 1
+                chars_saved += len(content)
+                continue
+
+            # Copy so merge bookkeeping never leaks into the caller's chunks
+            index = len(kept)
+            sources.append(index)
+            kept.append(dict(chunk, metadata=dict(chunk.get("metadata") or {})))
+            kept_shingles.append(shingle_set)
+            exact_index[digest] = index
+            for key in keys:
+                buckets.setdefault(key, []).append(index)
+
+        total_chars = sum(len(chunk["content"]) for chunk in chunks)
+        report = {
+            "input_chunks": len(chunks),
+            "kept_chunks": len(kept),
+            "exact_duplicates": dropped_exact,
+            "near_duplicates": dropped_near,
+            "chars_saved": chars_saved,
+            "percent_saved": round(100 * chars_saved / total_chars, 1) if total_chars else 0.0
+        }
+        return kept, report, sources
@@ -0,0 +1,22 @@
+"""
+Chunk IDs
+Deterministic documents row ids so re-ingesting the same material upserts
+the same rows instead of adding duplicates
+"""
+
+import uuid
+from typing import Any, Dict, Optional
+
+# Fixed namespace for uuid5; changing it would re-key every stored row
+CHUNK_NAMESPACE = uuid.UUID("6f1c2a4e-9b1d-5c3e-8f2a-7d4b0e9c1a35")
+
+
+def chunk_id(source: Optional[str], chunk_type: Optional[str], content: str) -> str:
+    """Derive a stable uuid from a chunk's source, type and content"""
+    name = f"{source or ''}\0{chunk_type or ''}\0{content}"
+    return str(uuid.uuid5(CHUNK_NAMESPACE, name))
+
+
+def id_for_chunk(chunk: Dict[str, Any]) -> str:
+    """Return the chunk's id, deriving it from the chunk if it has none"""
+    return chunk.get("id") or chunk_id(chunk.get("source"), chunk.get("chunk_type"), chunk["content"])
@@ -0,0 +1,32 @@
+"""
+Corpus Version
+A marker file touched whenever rows in the documents table change, so caches
+built from search results can tell that they are stale
+"""
+
+import os
+import time
+from typing import Optional
+
+# Touched by SupabaseBulkWriter whenever documents rows change
+CORPUS_VERSION_PATH = os.getenv(
+    "CORPUS_VERSION_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".rag_cache", "corpus_version")
+)
+
+
+def mark_corpus_changed(path: str = CORPUS_VERSION_PATH) -> None:
+    """Record that the documents table changed so answer caches drop their entries"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(str(time.time_ns()))
+
+
+def corpus_version(path: str = CORPUS_VERSION_PATH) -> Optional[str]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
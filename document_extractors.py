@@ -0,0 +1,217 @@
+"""
+Document Extractors
+Streaming text extraction for large uploads, kept free of API clients so
+worker processes can import it cheaply
+"""
+
+import csv
+import io
+import multiprocessing
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+# Row groups close at whichever limit is reached first
+CSV_ROWS_PER_GROUP = 50
+CSV_MAX_GROUP_CHARS = 2000
+
+# PDF pages handed to one worker task; DOCX paragraphs merged into one "page"
+PDF_PAGES_PER_TASK = 8
+DOCX_PARAGRAPHS_PER_PAGE = 30
+
+# Parsing processes shared by all uploads, and the page-range tasks one document may
+# have queued at once so extracted text waiting to be consumed stays bounded
+EXTRACTION_MAX_WORKERS = int(os.getenv("EXTRACTION_MAX_WORKERS", min(4, os.cpu_count() or 1)))
+PDF_TASKS_IN_FLIGHT = 2 * EXTRACTION_MAX_WORKERS
+
+_extraction_pool = None
+_extraction_pool_lock = threading.Lock()
+
+
+def open_text(file_path: str, file_content: Optional[bytes] = None) -> io.TextIOBase:
+    """Open an upload as a text stream without decoding it all at once"""
+    if file_content:
+        return io.TextIOWrapper(io.BytesIO(file_content), encoding="utf-8", errors="ignore", newline="")
+    return open(file_path, "r", encoding="utf-8", errors="ignore", newline="")
+
+
+def format_csv_row(row_number: int, headers: List[str], row: List[str]) -> str:
+    """Render one CSV row as 'Row n: header: value;' text"""
+    row_text = f"Row {row_number}:"
+    for header, value in zip(headers, row):
+        if value.strip():
+            row_text += f" {header}: {value};"
+    return row_text
+
+
+def iter_csv_row_groups(file_path: str, file_content: Optional[bytes] = None,
+                        rows_per_group: int = CSV_ROWS_PER_GROUP,
+                        max_group_chars: int = CSV_MAX_GROUP_CHARS) -> Iterator[Tuple[str, int, int]]:
+    """Yield (text, first_row, last_row) groups of CSV rows, each prefixed with the headers"""
+    with open_text(file_path, file_content) as f:
+        reader = csv.reader(f)
+        headers = next(reader, None)
+        if not headers:
+            return
+
+        header_line = "Headers: " + ", ".join(headers)
+        group = []
+        group_chars = 0
+        first_row = last_row = 1
+
+        for row_number, row in enumerate(reader, 1):
+            # Rows that do not line up with the headers cannot be labelled
+            if len(row) != len(headers):
+                continue
+            row_text = format_csv_row(row_number, headers, row)
+
+            if group and (len(group) >= rows_per_group or group_chars + len(row_text) > max_group_chars):
+                yield "\n".join([header_line] + group), first_row, last_row
+                group = []
+                group_chars = 0
+
+            if not group:
+                first_row = row_number
+            group.append(row_text)
+            group_chars += len(row_text)
+            last_row = row_number
+
+        if group:
+            yield "\n".join([header_line] + group), first_row, last_row
+
+
+class InlineExecutor(Executor):
+    """Executor that runs each task immediately in the calling process"""
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+def get_extraction_pool() -> ProcessPoolExecutor:
+    """Return the shared process pool used for CPU-heavy document parsing"""
+    global _extraction_pool
+    with _extraction_pool_lock:
+        if _extraction_pool is None:
+            # The pool is created from request threads of a process holding API clients,
+            # an SQLite connection and other threads' locks, none of which survive a fork
+            _extraction_pool = ProcessPoolExecutor(max_workers=EXTRACTION_MAX_WORKERS,
+                                                   mp_context=multiprocessing.get_context("spawn"))
+        return _extraction_pool
+
+
+def shutdown_extraction_pool() -> None:
+    """Stop the shared parsing processes, e.g. when the server exits"""
+    global _extraction_pool
+    with _extraction_pool_lock:
+        if _extraction_pool is not None:
+            _extraction_pool.shutdown(cancel_futures=True)
+            _extraction_pool = None
+
+
+def count_pdf_pages(file_path: str, file_content: Optional[bytes] = None) -> int:
+    """Count the pages of a PDF without extracting any text"""
+    from pypdf import PdfReader
+
+    reader = PdfReader(io.BytesIO(file_content) if file_content else file_path)
+    return len(reader.pages)
+
+
+def extract_pdf_pages(file_path: str, file_content: Optional[bytes], start: int, end: int) -> List[Tuple[int, str]]:
+    """Extract the text of pages [start, end) as (page_number, text); runs in a worker"""
+    from pypdf import PdfReader
+
+    reader = PdfReader(io.BytesIO(file_content) if file_content else file_path)
+    pages = []
+    for index in range(start, min(end, len(reader.pages))):
+        pages.append((index + 1, reader.pages[index].extract_text() or ""))
+    return pages
+
+
+def extract_docx_pages(file_path: str, file_content: Optional[bytes] = None) -> List[Tuple[int, str]]:
+    """Extract paragraphs and table rows from a DOCX, grouped into pseudo-pages; runs in a worker"""
+    import docx
+
+    document = docx.Document(io.BytesIO(file_content) if file_content else file_path)
+    blocks = [paragraph.text for paragraph in document.paragraphs if paragraph.text.strip()]
+    for table in document.tables:
+        for row in table.rows:
+            cells = [cell.text.strip() for cell in row.cells if cell.text.strip()]
+            if cells:
+                blocks.append(" | ".join(cells))
+
+    # Word files carry no page layout, so fixed paragraph groups stand in for pages
+    pages = []
+    for start in range(0, len(blocks), DOCX_PARAGRAPHS_PER_PAGE):
+        pages.append((len(pages) + 1, "\n\n".join(blocks[start:start + DOCX_PARAGRAPHS_PER_PAGE])))
+    return pages
+
+
+def extract_doc_pages(file_path: str, file_content: Optional[bytes] = None) -> List[Tuple[int, str]]:
+    """Extract text from a legacy .doc with antiword, if it is installed; runs in a worker"""
+    if not shutil.which("antiword"):
+        print(f"Skipping {os.path.basename(file_path)}: .doc extraction requires antiword")
+        return []
+    if file_content:
+        result = subprocess.run(["antiword", "-"], input=file_content, capture_output=True, check=True)
+    else:
+        result = subprocess.run(["antiword", file_path], capture_output=True, check=True)
+    text = result.stdout.decode("utf-8", errors="ignore")
+    # antiword separates pages with form feeds
+    return [(number, page) for number, page in enumerate(text.split("\f"), 1) if page.strip()]
+
+
+def iter_document_pages(file_path: str, file_content: Optional[bytes] = None,
+                        pool: Optional[Executor] = None) -> Iterator[Tuple[int, str]]:
+    """Yield (page_number, text) for a PDF, DOCX or DOC, parsing in the process pool"""
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension not in (".pdf", ".docx", ".doc"):
+        raise ValueError(f"Unsupported document type: {extension}")
+    if pool is None:
+        # Inside a worker process already: parse inline instead of nesting pools
+        pool = InlineExecutor() if multiprocessing.parent_process() is not None else get_extraction_pool()
+
+    temp_path = None
+    if file_content:
+        # Workers open the file themselves instead of receiving the upload with every task
+        with tempfile.NamedTemporaryFile(suffix=extension, delete=False) as f:
+            f.write(file_content)
+            temp_path = f.name
+    path = temp_path or file_path
+    futures = deque()
+
+    try:
+        if extension == ".pdf":
+            starts = iter(range(0, count_pdf_pages(path), PDF_PAGES_PER_TASK))
+            tasks = (pool.submit(extract_pdf_pages, path, None, start, start + PDF_PAGES_PER_TASK)
+                     for start in starts)
+        elif extension == ".docx":
+            tasks = iter([pool.submit(extract_docx_pages, path)])
+        else:
+            tasks = iter([pool.submit(extract_doc_pages, path)])
+
+        # Page ranges are parsed in parallel but handed on in page order as they finish;
+        # a new range is only queued once an earlier one has been consumed
+        futures.extend(future for _, future in zip(range(PDF_TASKS_IN_FLIGHT), tasks))
+        while futures:
+            pages = futures.popleft().result()
+            futures.extend(future for _, future in zip(range(1), tasks))
+            for page_number, text in pages:
+                if text.strip():
+                    yield page_number, text
+    finally:
+        # A consumer that stops early leaves queued ranges nobody will read
+        for future in futures:
+            future.cancel()
+        if temp_path:
+            os.remove(temp_path)
+
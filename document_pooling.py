@@ -0,0 +1,64 @@
+"""
+Document Pooling
+Builds full-document vectors from the embeddings of a document's child
+chunks instead of embedding the whole text again
+"""
+
+import math
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Derive full_document vectors from child chunks unless disabled
+POOL_DOCUMENT_VECTORS = os.getenv("POOL_DOCUMENT_VECTORS", "true").lower() not in ("0", "false", "no")
+
+DOCUMENT_CHUNK_TYPE = "full_document"
+
+
+def chunk_weight(chunk: Dict[str, Any]) -> int:
+    """Weight of a child chunk in the pooled vector: its length in words"""
+    return max(len(chunk["content"].split()), 1)
+
+
+def pool_embeddings(vectors: List[List[float]], weights: List[float]) -> Optional[List[float]]:
+    """Weighted mean of the vectors, rescaled to unit length like the model's own output"""
+    if not vectors:
+        return None
+    pooled = [0.0] * len(vectors[0])
+    for vector, weight in zip(vectors, weights):
+        for i, value in enumerate(vector):
+            pooled[i] += weight * value
+    norm = math.sqrt(sum(value * value for value in pooled))
+    if norm == 0:
+        return None
+    return [value / norm for value in pooled]
+
+
+def document_pool_groups(chunks: List[Dict[str, Any]], child_types: Iterable[str],
+                         sources: Optional[List[int]] = None) -> Dict[int, List[Tuple[int, int]]]:
+    """Map each kept full_document chunk to (kept position, weight) pairs covering all of its child chunks"""
+    # chunks is the list before deduplication and sources[i] the kept position standing for chunks[i]
+    # (identity when nothing was deduplicated). A child dropped as a near-duplicate is pooled through
+    # the chunk that replaced it, so the document vector still covers the whole text.
+    if sources is None:
+        sources = list(range(len(chunks)))
+    child_types = set(child_types)
+    children: Dict[str, List[Tuple[int, int]]] = {}
+    for i, chunk in enumerate(chunks):
+        if chunk.get("chunk_type") in child_types:
+            children.setdefault(chunk["source"], []).append((sources[i], chunk_weight(chunk)))
+
+    first_input = {}
+    for i, position in enumerate(sources):
+        first_input.setdefault(position, i)
+
+    groups = {}
+    for i, chunk in enumerate(chunks):
+        position = sources[i]
+        # A document dropped as a duplicate is stored through the chunk that replaced it
+        if chunk.get("chunk_type") != DOCUMENT_CHUNK_TYPE or first_input[position] != i:
+            continue
+        members = children.get(chunk["source"])
+        # Documents without children, or as short as one of them, are embedded directly
+        if members and all(member != position for member, _ in members):
+            groups[position] = members
+    return groups
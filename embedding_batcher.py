@@ -0,0 +1,156 @@
+"""
+Embedding Batcher
+Packs many chunk texts into as few embeddings.create calls as possible
+"""
+
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import tiktoken
+
+# Embedding model shared by all ingestion and query paths
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Output size of each model; text-embedding-3-* can return fewer dimensions on request
+NATIVE_DIMENSIONS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536
+}
+
+# Vector size used everywhere: ingestion, queries, the documents table and its index
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", NATIVE_DIMENSIONS[EMBEDDING_MODEL]))
+
+# text-embedding-3-* reject single inputs above 8191 tokens
+MAX_INPUT_TOKENS = 8191
+
+# Per-request budgets (the API allows up to 2048 inputs per call)
+DEFAULT_MAX_BATCH_TOKENS = 100000
+DEFAULT_MAX_BATCH_ITEMS = 512
+
+
+def embedding_params(model: str = EMBEDDING_MODEL, dimensions: int = EMBEDDING_DIMENSIONS) -> Dict[str, Any]:
+    """Keyword arguments for embeddings.create that pin the model and vector size"""
+    params = {"model": model}
+    # Only text-embedding-3-* accept the dimensions parameter
+    if dimensions != NATIVE_DIMENSIONS.get(model):
+        params["dimensions"] = dimensions
+    return params
+
+
+def cache_model_name(model: str = EMBEDDING_MODEL, dimensions: int = EMBEDDING_DIMENSIONS) -> str:
+    """Model label for cache keys; vectors of different sizes must not share entries"""
+    return model if "dimensions" not in embedding_params(model, dimensions) else f"{model}:{dimensions}"
+
+
+@lru_cache(maxsize=None)
+def get_encoder(model: str = EMBEDDING_MODEL) -> tiktoken.Encoding:
+    """Return a cached tiktoken encoder for the model"""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+class EmbeddingBatcher:
+    def __init__(self, client, model: str = EMBEDDING_MODEL,
+                 max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+                 max_batch_items: int = DEFAULT_MAX_BATCH_ITEMS,
+                 cache=None, dimensions: int = EMBEDDING_DIMENSIONS):
+        self.client = client
+        self.model = model
+        self.dimensions = dimensions
+        self.params = embedding_params(model, dimensions)
+        self.cache_model = cache_model_name(model, dimensions)
+        self.cache = cache
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_items = max_batch_items
+        self.encoder = get_encoder(model)
+        self.requests_made = 0
+
+    def prepare_input(self, text: str) -> Tuple[str, int]:
+        """Truncate text to the model's input limit and return it with its token count"""
+        tokens = self.encoder.encode(text, disallowed_special=())
+        if len(tokens) > MAX_INPUT_TOKENS:
+            tokens = tokens[:MAX_INPUT_TOKENS]
+            text = self.encoder.decode(tokens)
+        return text, len(tokens)
+
+    def make_batches(self, token_counts: List[int]) -> List[List[int]]:
+        """Group input positions into batches within the token and item budgets"""
+        batches = []
+        current_batch = []
+        current_tokens = 0
+
+        for position, token_count in enumerate(token_counts):
+            over_budget = (current_tokens + token_count > self.max_batch_tokens or
+                           len(current_batch) >= self.max_batch_items)
+            if over_budget and current_batch:
+                batches.append(current_batch)
+                current_batch = []
+                current_tokens = 0
+            current_batch.append(position)
+            current_tokens += token_count
+
+        if current_batch:
+            batches.append(current_batch)
+
+        return batches
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed one batch with a single API call, in input order"""
+        response = self.client.embeddings.create(input=texts, **self.params)
+        self.requests_made += 1
+        # The API returns one item per input tagged with its position
+        ordered = sorted(response.data, key=lambda item: item.index)
+        return [item.embedding for item in ordered]
+
+    def plan(self, texts: List[str]) -> Tuple[List[Optional[List[float]]], List[Dict[str, Any]]]:
+        """Resolve cached embeddings and group the remaining texts into request batches"""
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+
+        # Empty strings are rejected by the API, so they never enter a batch
+        positions = [i for i, text in enumerate(texts) if text and text.strip()]
+
+        if self.cache is not None and positions:
+            cached = self.cache.get_many(self.cache_model, [texts[i] for i in positions])
+            for i, vector in zip(positions, cached):
+                embeddings[i] = vector
+            positions = [i for i in positions if embeddings[i] is None]
+
+        prepared = [self.prepare_input(texts[i]) for i in positions]
+
+        # Originals are kept as cache keys since sent texts may be truncated
+        batches = []
+        for batch in self.make_batches([token_count for _, token_count in prepared]):
+            batches.append({
+                "positions": [positions[b] for b in batch],
+                "texts": [prepared[b][0] for b in batch],
+                "originals": [texts[positions[b]] for b in batch],
+                "tokens": sum(prepared[b][1] for b in batch)
+            })
+
+        return embeddings, batches
+
+    def run_batch(self, batch: Dict[str, Any]) -> List[List[float]]:
+        """Embed a planned batch and store the result in the cache"""
+        vectors = self.embed_batch(batch["texts"])
+        if self.cache is not None:
+            self.cache.put_many(self.cache_model, batch["originals"], vectors)
+        return vectors
+
+    def embed(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Embed all texts; the result is aligned with the input and holds None on failure"""
+        embeddings, batches = self.plan(texts)
+
+        for batch in batches:
+            try:
+                vectors = self.run_batch(batch)
+            except Exception as e:
+                print(f"Error generating embeddings for batch of {len(batch['texts'])}: {e}")
+                continue
+            for position, vector in zip(batch["positions"], vectors):
+                embeddings[position] = vector
+
+        return embeddings
@@ -0,0 +1,124 @@
+"""
+Embedding Store
+Binary chunk store: a memory-mappable .npy matrix of embeddings plus a JSONL
+sidecar with one metadata record per row
+"""
+
+import json
+import os
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_STORE_BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                  "Embedded_Rag_Vectorstore_Supabase", "embedded_chunks")
+
+# float16 halves the file again at a small precision cost; float32 keeps the API's precision
+DEFAULT_STORE_DTYPE = os.getenv("EMBEDDING_STORE_DTYPE", "float32")
+STORE_DTYPES = ("float32", "float16")
+
+
+def store_paths(path: str) -> Tuple[str, str]:
+    """Return the (.npy, .jsonl) pair for a store base path or either of its files"""
+    base, extension = os.path.splitext(path)
+    if extension not in (".npy", ".jsonl", ".json"):
+        base = path
+    return base + ".npy", base + ".jsonl"
+
+
+def save_store(path: str, chunks: List[Dict[str, Any]], dtype: str = DEFAULT_STORE_DTYPE) -> Tuple[str, str]:
+    """Write chunk embeddings to .npy and everything else to a .jsonl sidecar"""
+    if dtype not in STORE_DTYPES:
+        raise ValueError(f"Unsupported store dtype {dtype!r}, expected one of {STORE_DTYPES}")
+    matrix_path, records_path = store_paths(path)
+    directory = os.path.dirname(matrix_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    matrix = np.asarray([chunk["embedding"] for chunk in chunks], dtype=dtype)
+
+    # Write both files before swapping either in, so readers never see a mismatched pair
+    with open(matrix_path + ".tmp", "wb") as f:
+        np.save(f, matrix)
+    with open(records_path + ".tmp", "w", encoding="utf-8") as f:
+        for chunk in chunks:
+            record = {key: value for key, value in chunk.items() if key != "embedding"}
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    os.replace(matrix_path + ".tmp", matrix_path)
+    os.replace(records_path + ".tmp", records_path)
+    return matrix_path, records_path
+
+
+def load_store(path: str = DEFAULT_STORE_BASE, mmap: bool = True) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+    """Load (embeddings matrix, records); the matrix is memory-mapped read-only by default"""
+    matrix_path, records_path = store_paths(path)
+    # Memory-mapped pages are shared by every process that opens the same file
+    matrix = np.load(matrix_path, mmap_mode="r" if mmap else None)
+    with open(records_path, "r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    if len(records) != matrix.shape[0]:
+        raise ValueError(f"{records_path} has {len(records)} records but {matrix_path} has {matrix.shape[0]} rows")
+    return matrix, records
+
+
+def load_json_chunks(path: str) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+    """Load the legacy embedded_chunks.json format into the same shape as load_store"""
+    with open(path, "r", encoding="utf-8") as f:
+        chunks = json.load(f)
+    matrix = np.asarray([chunk["embedding"] for chunk in chunks], dtype=np.float32)
+    records = [{key: value for key, value in chunk.items() if key != "embedding"} for chunk in chunks]
+    return matrix, records
+
+
+def shorten_embeddings(matrix: np.ndarray, dimensions: int) -> np.ndarray:
+    """Cut text-embedding-3 vectors to their first dimensions and rescale each to unit length"""
+    # Same result as the API's dimensions parameter, so stored vectors follow a smaller
+    # EMBEDDING_DIMENSIONS without re-embedding
+    head = np.asarray(matrix[:, :dimensions], dtype=np.float32)
+    norms = np.linalg.norm(head, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return head / norms
+
+
+def load_chunks(path: str = DEFAULT_STORE_BASE, mmap: bool = True,
+                dimensions: Optional[int] = None) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+    """Load embedded chunks from a binary store, falling back to legacy JSON, optionally shortened to dimensions"""
+    matrix_path, _ = store_paths(path)
+    if not path.endswith(".json") and os.path.exists(matrix_path):
+        matrix, records = load_store(path, mmap)
+    else:
+        json_path = path if path.endswith(".json") else os.path.splitext(matrix_path)[0] + ".json"
+        matrix, records = load_json_chunks(json_path)
+
+    stored = matrix.shape[1] if matrix.ndim == 2 else dimensions
+    if dimensions is None or stored == dimensions:
+        return matrix, records
+    if stored < dimensions:
+        raise ValueError(f"{path} holds {stored}-dimension embeddings but {dimensions} are needed; "
+                         f"re-embed the chunks with EMBEDDING_DIMENSIONS={dimensions}")
+    # The shortened copy lives in memory instead of the memory-mapped file
+    return shorten_embeddings(matrix, dimensions), records
+
+
+def iter_chunks(path: str = DEFAULT_STORE_BASE, dimensions: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Yield chunk dicts with an "embedding" list, for writers that need plain JSON values"""
+    matrix, records = load_chunks(path, dimensions=dimensions)
+    for record, vector in zip(records, matrix):
+        yield dict(record, embedding=vector.astype(np.float32).tolist())
+
+
+def main():
+    # Convert a legacy JSON file: python embedding_store.py embedded_chunks.json [float16]
+    source = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_STORE_BASE + ".json"
+    dtype = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_STORE_DTYPE
+    matrix, records = load_json_chunks(source)
+    chunks = [dict(record, embedding=vector) for record, vector in zip(records, matrix)]
+    matrix_path, records_path = save_store(source, chunks, dtype)
+    stored = os.path.getsize(matrix_path) + os.path.getsize(records_path)
+    print(f"Wrote {len(records)} chunks to {matrix_path} and {records_path}: "
+          f"{os.path.getsize(source) / 1024:.0f} KB -> {stored / 1024:.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
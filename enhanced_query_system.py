@@ -1,9 +1,12 @@
 import os
 import json
 from dotenv import load_dotenv
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional
 from openai import OpenAI
 from supabase import create_client, Client
+from answer_cache import SemanticAnswerCache
+from embedding_batcher import embedding_params
+from query_embedding_cache import QueryEmbeddingCache
 
 # Load environment variables
 load_dotenv()
@@ -21,30 +24,98 @@ if not all([OPENAI_API_KEY, SUPABASE_URL, SUPABASE_SERVICE_KEY]):
 openai_client = OpenAI(api_key=OPENAI_API_KEY)
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
 
+# Versioned RPC defined in Embedded_Rag_Vectorstore_Supabase/supabase_search_functions.sql
+COMPREHENSIVE_SEARCH_RPC = "comprehensive_search_v1"
+
+# Result key -> (chunk_type, row count) returned alongside the semantic matches
+CATEGORY_BUCKETS = {
+    "pricing_info": ("pricing", 3),
+    "contact_info": ("contact", 3),
+    "key_facts": ("key_fact", 5),
+    "full_documents": ("full_document", 2)
+}
+
+# Chat model and instructions used to answer from retrieved context
+ANSWER_MODEL = "gpt-4"
+ANSWER_CONTEXT_DOCS = 5
+SYSTEM_PROMPT = "You are a helpful assistant that provides accurate information about Axie Studio based on the provided context."
+
+def comprehensive_search_params(query_embedding: List[float], similarity_threshold: float = 0.7,
+                                filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Arguments for the comprehensive search RPC"""
+    return {
+        'query_embedding': query_embedding,
+        'match_threshold': similarity_threshold,
+        'semantic_count': 5,
+        'buckets': {chunk_type: count for chunk_type, count in CATEGORY_BUCKETS.values()},
+        'filter': filters or {}
+    }
+
+def group_search_rows(rows: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Split the RPC's bucket-tagged rows into the comprehensive search result keys"""
+    result_keys = {chunk_type: key for key, (chunk_type, _) in CATEGORY_BUCKETS.items()}
+    result_keys["semantic_search"] = "semantic_search"
+    results = {key: [] for key in ["semantic_search", *CATEGORY_BUCKETS]}
+    for row in rows:
+        results[result_keys[row.pop("bucket")]].append(row)
+    
+    # UNION ALL does not promise an order, so rank each bucket here
+    for docs in results.values():
+        docs.sort(key=lambda doc: doc["similarity"], reverse=True)
+    
+    return results
+
+def answer_messages(query: str, context_docs: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """Chat messages asking the model to answer query from the top context documents"""
+    context = "\n\n".join([doc["content"] for doc in context_docs[:ANSWER_CONTEXT_DOCS]])
+    
+    prompt = f"""
+Based on the following information about Axie Studio, please provide a comprehensive answer to the user's question.
+
+Context Information:
+{context}
+
+User Question: {query}
+
+Please provide a detailed, accurate answer based on the context provided. If the information is not available in the context, please say so.
+"""
+    
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
 class EnhancedQuerySystem:
     def __init__(self):
         self.client = openai_client
         self.supabase = supabase
+        self.query_cache = QueryEmbeddingCache.from_env()
+        self.answer_cache = SemanticAnswerCache()
     
     def get_embedding(self, text: str) -> List[float]:
         """Generate embedding for query text"""
+        return self.query_cache.get_or_embed(text, self._embed)
+    
+    def _embed(self, text: str) -> List[float]:
         response = self.client.embeddings.create(
             input=text,
-            model="text-embedding-3-small"
+            **embedding_params()
         )
         return response.data[0].embedding
     
-    def search_documents(self, query: str, limit: int = 10, similarity_threshold: float = 0.7) -> List[Dict[str, Any]]:
+    def search_documents(self, query: str, limit: int = 10, similarity_threshold: float = 0.7,
+                         filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """Search documents using vector similarity"""
         query_embedding = self.get_embedding(query)
         
-        # Use Supabase's vector similarity search
+        # Use Supabase's vector similarity search; filters match metadata inside the vector query
         response = supabase.rpc(
             'match_documents',
             {
                 'query_embedding': query_embedding,
                 'match_threshold': similarity_threshold,
-                'match_count': limit
+                'match_count': limit,
+                'filter': filters or {}
             }
         ).execute()
         
@@ -60,44 +131,52 @@ class EnhancedQuerySystem:
         response = supabase.table("documents").select("*").eq("source", source).limit(limit).execute()
         return response.data if response.data else []
     
-    def comprehensive_search(self, query: str) -> Dict[str, Any]:
+    def comprehensive_search(self, query: str, similarity_threshold: float = 0.7,
+                             filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Perform comprehensive search across all document types"""
-        results = {
-            "semantic_search": self.search_documents(query, limit=5),
-            "pricing_info": self.search_by_category("pricing", limit=3),
-            "contact_info": self.search_by_category("contact", limit=3),
-            "key_facts": self.search_by_category("key_fact", limit=5),
-            "full_documents": self.search_by_category("full_document", limit=2)
-        }
+        query_embedding = self.get_embedding(query)
+        
+        # Semantic matches and every category bucket come back from a single RPC
+        response = supabase.rpc(
+            COMPREHENSIVE_SEARCH_RPC,
+            comprehensive_search_params(query_embedding, similarity_threshold, filters)
+        ).execute()
         
-        return results
+        return group_search_rows(response.data or [])
     
     def generate_answer(self, query: str, context_docs: List[Dict[str, Any]]) -> str:
         """Generate comprehensive answer using retrieved context"""
-        context = "\n\n".join([doc["content"] for doc in context_docs[:5]])
-        
-        prompt = f"""
-Based on the following information about Axie Studio, please provide a comprehensive answer to the user's question.
-
-Context Information:
-{context}
-
-User Question: {query}
-
-Please provide a detailed, accurate answer based on the context provided. If the information is not available in the context, please say so.
-"""
+        return "".join(self.stream_answer(query, context_docs))
+    
+    def stream_answer(self, query: str, context_docs: List[Dict[str, Any]]) -> Iterator[str]:
+        """Yield the answer in pieces as the model produces them"""
+        # The query embedding is already cached by the search that produced context_docs
+        query_embedding = self.get_embedding(query)
+        prompt_docs = context_docs[:ANSWER_CONTEXT_DOCS]
+        cached = self.answer_cache.get(query_embedding, prompt_docs)
+        if cached is not None:
+            yield cached
+            return
         
-        response = self.client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that provides accurate information about Axie Studio based on the provided context."},
-                {"role": "user", "content": prompt}
-            ],
+        pieces = []
+        # Leaving the with block early (e.g. the HTTP client went away) closes the stream
+        with self.client.chat.completions.create(
+            model=ANSWER_MODEL,
+            messages=answer_messages(query, context_docs),
             max_tokens=500,
-            temperature=0.3
-        )
+            temperature=0.3,
+            stream=True
+        ) as stream:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                piece = chunk.choices[0].delta.content
+                if piece:
+                    pieces.append(piece)
+                    yield piece
         
-        return response.choices[0].message.content
+        # Only complete answers are cached
+        self.answer_cache.put(query_embedding, prompt_docs, "".join(pieces))
 
 def main():
     query_system = EnhancedQuerySystem()
@@ -109,6 +188,8 @@ def main():
         query = input("\nEnter your question (or 'quit' to exit): ").strip()
         
         if query.lower() in ['quit', 'exit', 'q']:
+            print(f"Query embedding cache: {query_system.query_cache.stats()}")
+            print(f"Answer cache: {query_system.answer_cache.stats()}")
             break
         
         if not query:
@@ -128,10 +209,11 @@ def main():
             print("No relevant information found.")
             continue
         
-        # Generate comprehensive answer
-        answer = query_system.generate_answer(query, all_docs)
-        
-        print(f"\nAnswer:\n{answer}")
+        # Print the answer as it is generated
+        print("\nAnswer:")
+        for piece in query_system.stream_answer(query, all_docs):
+            print(piece, end="", flush=True)
+        print()
         
         # Show source information
         print(f"\nBased on {len(all_docs)} relevant documents:")
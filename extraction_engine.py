@@ -0,0 +1,118 @@
+"""
+Extraction Engine
+Precompiled scanner shared by the chunkers' extractors. Each pattern runs at
+most once per text and its matches are reused by every strategy that needs them
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+# The chunkers' original patterns, kept verbatim so their output does not change
+PATTERNS = {
+    # extract_key_information
+    "emails": re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b"),
+    "phones": re.compile(r"[\+]?[1-9]?[0-9]{7,15}"),
+    "urls": re.compile(r"http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+"),
+    "prices": re.compile(r"[\$€£¥₹]\s*\d+(?:[\.,]\d+)*|(\d+(?:[\.,]\d+)*)\s*(?:kr|SEK|USD|EUR|GBP)"),
+    "numbered_items": re.compile(r"\d+\.\s+([^\n]+)"),
+    "bullets": re.compile(r"[•\-\*]\s+([^\n]+)"),
+    # extract_key_facts
+    "emoji_facts": re.compile(r"[🌐📱📅🛒✅✔🎯🌍💡🛠📊⚙️💬📍❓]\s*([^\n]+)"),
+    "bullet_facts": re.compile(r"[-•*]\s*([^\n]+)"),
+    "quotes": re.compile(r'"([^"]+)"'),
+    # extract_contact_info
+    "contact_emails": re.compile(r"([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})"),
+    "intl_phones": re.compile(r"(\+\d{2}\s*\d{3}\s*\d{3}\s*\d{3})"),
+    "websites": re.compile(r"(www\.[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})"),
+}
+
+# extract_pricing_info keeps every match of each pattern, in this order
+PRICE_LINE_PATTERNS = [
+    re.compile(r"(\d+\s*\d*\s*kr[^\n]*)", re.IGNORECASE),
+    re.compile(r"(Startavgift[^\n]*)", re.IGNORECASE),
+    re.compile(r"(Månadsavgift[^\n]*)", re.IGNORECASE),
+    re.compile(r"(\d+\s*995[^\n]*)", re.IGNORECASE),
+]
+
+# split_by_bullets splits on bullets first, then on each list emoji in this order.
+# The emoji are single characters, so one pattern finds the matches of all six
+BULLET_SPLIT = re.compile(r"[•\-\*]\s+")
+SPLIT_EMOJI = "✅🌐📱📅🛒✔"
+EMOJI_SPLIT = re.compile("[" + SPLIT_EMOJI + r"]\s+")
+
+# Kinds each extractor reads, so callers only pay for the patterns they use
+KEY_INFO_KINDS = ("emails", "phones", "urls", "prices", "numbered_items", "bullets")
+FACT_KINDS = ("emoji_facts", "bullet_facts", "quotes")
+PRICING_KINDS = ("price_lines",)
+CONTACT_KINDS = ("contact_emails", "intl_phones", "websites")
+SPLIT_KINDS = ("split_spans",)
+KINDS = KEY_INFO_KINDS + FACT_KINDS + PRICING_KINDS + CONTACT_KINDS + SPLIT_KINDS
+
+# Email matches never span a line and always contain '@', so those patterns only
+# need to see the lines that have one; everything else would be tried and rejected
+EMAIL_KINDS = ("emails", "contact_emails")
+# Every emoji pattern needs a non-ASCII character to match
+EMOJI_KINDS = ("emoji_facts",)
+
+
+def _lines_containing(text: str, needle: str) -> str:
+    """Join the lines of text that contain needle"""
+    lines = []
+    position = text.find(needle)
+    while position != -1:
+        start = text.rfind("\n", 0, position) + 1
+        end = text.find("\n", position)
+        if end == -1:
+            lines.append(text[start:])
+            break
+        lines.append(text[start:end])
+        position = text.find(needle, end)
+    return "\n".join(lines)
+
+
+def _split_spans(text: str) -> List[List[Tuple[int, int]]]:
+    """Match spans of each split_by_bullets pattern, one list per pattern"""
+    spans = [[match.span() for match in BULLET_SPLIT.finditer(text)]]
+    by_emoji: Dict[str, List[Tuple[int, int]]] = {emoji: [] for emoji in SPLIT_EMOJI}
+    if not text.isascii():
+        for match in EMOJI_SPLIT.finditer(text):
+            by_emoji[text[match.start()]].append(match.span())
+    spans.extend(by_emoji[emoji] for emoji in SPLIT_EMOJI)
+    return spans
+
+
+def scan_text(text: str, kinds: Tuple[str, ...] = KINDS) -> Dict[str, List]:
+    """Run the patterns behind each requested kind once over text and group the matches by kind"""
+    found: Dict[str, List] = {}
+    email_lines = None
+    for kind in kinds:
+        if kind == "split_spans":
+            found[kind] = _split_spans(text)
+        elif kind == "price_lines":
+            found[kind] = [line for pattern in PRICE_LINE_PATTERNS for line in pattern.findall(text)]
+        elif kind == "prices":
+            # Whole symbol prices, or the amount in front of the currency word
+            found[kind] = [match.group(1) or match.group(0) for match in PATTERNS[kind].finditer(text)]
+        elif kind in EMAIL_KINDS:
+            if email_lines is None:
+                email_lines = _lines_containing(text, "@")
+            found[kind] = PATTERNS[kind].findall(email_lines)
+        elif kind in EMOJI_KINDS and text.isascii():
+            found[kind] = []
+        else:
+            found[kind] = PATTERNS[kind].findall(text)
+    return found
+
+
+def split_sections(text: str, min_length: int = 20, found: Optional[Dict[str, List]] = None) -> List[str]:
+    """Split text after each bullet, then after each list emoji, keeping the longer pieces"""
+    spans_by_pattern = (found or scan_text(text, SPLIT_KINDS))["split_spans"]
+    sections = []
+    for spans in spans_by_pattern:
+        # The pieces re.split would return after the first one
+        for i, (_, start) in enumerate(spans):
+            end = spans[i + 1][0] if i + 1 < len(spans) else len(text)
+            section = text[start:end].strip()
+            if len(section) > min_length:
+                sections.append(section)
+    return sections
@@ -0,0 +1,275 @@
+"""
+File Chunker
+Text extraction and multi-strategy chunking for uploaded files. Needs no API
+clients, so worker processes can run it without connecting to anything
+"""
+
+import re
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+from token_chunker import TokenChunker
+from document_pooling import POOL_DOCUMENT_VECTORS
+from extraction_engine import scan_text, KEY_INFO_KINDS
+from document_extractors import iter_csv_row_groups, iter_document_pages
+
+# Formats that are chunked incrementally instead of as one text blob
+STREAMED_EXTENSIONS = {'.csv', '.pdf', '.doc', '.docx'}
+
+class FileChunker:
+    def __init__(self):
+        self.supported_extensions = {'.txt', '.pdf', '.doc', '.docx', '.csv'}
+        self.chunker = TokenChunker()
+        
+    def extract_text_from_file(self, file_path: str, file_content: bytes = None) -> str:
+        """Extract text from various file formats"""
+        file_extension = Path(file_path).suffix.lower()
+        
+        try:
+            if file_extension == '.txt':
+                if file_content:
+                    return file_content.decode('utf-8', errors='ignore')
+                else:
+                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                        return f.read()
+            
+            elif file_extension == '.csv':
+                # Large CSV files should go through stream_csv_chunks instead
+                groups = [text for text, _, _ in iter_csv_row_groups(file_path, file_content)]
+                if not groups:
+                    return ""
+                return "CSV Data:\n" + "\n\n".join(groups)
+            
+            elif file_extension in ['.pdf', '.doc', '.docx']:
+                # Large documents should go through stream_document_chunks instead
+                pages = [text for _, text in iter_document_pages(file_path, file_content)]
+                return "\n\n".join(pages)
+            
+            else:
+                return f"Unsupported file type: {file_extension}"
+                
+        except Exception as e:
+            return f"Error reading file {file_path}: {str(e)}"
+    
+    def create_comprehensive_chunks(self, text: str, source: str, filename: str) -> List[Dict[str, Any]]:
+        """Create comprehensive chunks from text content"""
+        chunks = []
+        
+        if not text or len(text.strip()) < 10:
+            return chunks
+        
+        # Clean the text
+        text = self.clean_text(text)
+        
+        # Sentence groups are the children a pooled document vector is built from
+        sentences = self.split_into_sentences(text)
+        sentence_groups = self.group_sentences(sentences)
+        has_children = any(len(group.strip()) > 30 for group in sentence_groups)
+        
+        # Strategy 1: Full document chunk; a pooled vector covers any length, otherwise
+        # the document is split into parts that fit the model's token limit
+        document_parts = [text] if POOL_DOCUMENT_VECTORS and has_children else self.chunker.fit(text)
+        for i, part in enumerate(document_parts):
+            chunks.append({
+                "content": part,
+                "source": source,
+                "title": f"Complete document: {filename}" + (f" (part {i+1})" if len(document_parts) > 1 else ""),
+                "chunk_type": "full_document",
+                "metadata": {
+                    "filename": filename,
+                    "word_count": len(part.split()),
+                    "char_count": len(part),
+                    "token_count": self.chunker.count(part)
+                }
+            })
+        
+        # Strategy 2: Split by paragraphs
+        paragraphs = [part for p in text.split('\n\n') if p.strip() and len(p.strip()) > 50
+                      for part in self.chunker.fit(p.strip())]
+        for i, paragraph in enumerate(paragraphs):
+            chunks.append({
+                "content": paragraph,
+                "source": source,
+                "title": f"{filename} - Section {i+1}",
+                "chunk_type": "paragraph",
+                "metadata": {
+                    "filename": filename,
+                    "section_number": i+1
+                }
+            })
+        
+        # Strategy 3: Split by sentences for detailed coverage
+        for i, group in enumerate(sentence_groups):
+            if len(group.strip()) > 30:
+                chunks.append({
+                    "content": group,
+                    "source": source,
+                    "title": f"{filename} - Detail {i+1}",
+                    "chunk_type": "sentence_group",
+                    "metadata": {
+                        "filename": filename,
+                        "group_number": i+1
+                    }
+                })
+        
+        # Strategy 4: Extract key information
+        key_info = self.extract_key_information(text)
+        for info_type, content in key_info.items():
+            if content:
+                chunks.append({
+                    "content": content,
+                    "source": source,
+                    "title": f"{filename} - {info_type.title()}",
+                    "chunk_type": info_type,
+                    "metadata": {
+                        "filename": filename,
+                        "info_type": info_type
+                    }
+                })
+        
+        return chunks
+    
+    def clean_text(self, text: str) -> str:
+        """Clean text while preserving important information"""
+        # Remove excessive whitespace but keep structure
+        text = re.sub(r'\n\s*\n\s*\n+', '\n\n', text)
+        text = re.sub(r'[ \t]+', ' ', text)
+        return text.strip()
+    
+    def split_into_sentences(self, text: str) -> List[str]:
+        """Split text into sentences"""
+        # Simple sentence splitting
+        sentences = re.split(r'[.!?]+', text)
+        return [s.strip() for s in sentences if s.strip() and len(s.strip()) > 10]
+    
+    def group_sentences(self, sentences: List[str]) -> List[str]:
+        """Group sentences into chunks of up to the chunker's token size"""
+        # Leave room for the full stop added back to each group
+        limit = self.chunker.chunk_tokens - self.chunker.count('.')
+        return [group + '.' for group in self.chunker.group(sentences, joiner='. ', chunk_tokens=limit)]
+    
+    def extract_key_information(self, text: str) -> Dict[str, str]:
+        """Extract different types of key information"""
+        info = {}
+        # One scan of the text yields every kind of item below
+        found = scan_text(text, KEY_INFO_KINDS)
+        
+        if found["emails"]:
+            info['contact_emails'] = 'Email addresses found: ' + ', '.join(found["emails"])
+        
+        if found["phones"]:
+            info['contact_phones'] = 'Phone numbers found: ' + ', '.join(found["phones"])
+        
+        if found["urls"]:
+            info['urls'] = 'URLs found: ' + ', '.join(found["urls"])
+        
+        if found["prices"]:
+            info['pricing'] = 'Pricing information: ' + ', '.join(found["prices"])
+        
+        if found["numbered_items"]:
+            info['numbered_lists'] = 'Key points: ' + '; '.join(found["numbered_items"][:5])
+        
+        if found["bullets"]:
+            info['bullet_points'] = 'Important items: ' + '; '.join(found["bullets"][:5])
+        
+        return info
+    
+    def stream_csv_chunks(self, file_path: str, file_content: bytes = None) -> Iterator[Dict[str, Any]]:
+        """Yield row-group chunks from a CSV file without loading it into memory"""
+        filename = Path(file_path).name
+        source = Path(file_path).stem.lower().replace(' ', '_')
+        
+        for text, first_row, last_row in iter_csv_row_groups(file_path, file_content):
+            yield {
+                "content": f"CSV Data from {filename}\n{text}",
+                "source": source,
+                "title": f"{filename} - Rows {first_row}-{last_row}",
+                "chunk_type": "csv_rows",
+                "metadata": {
+                    "filename": filename,
+                    "first_row": first_row,
+                    "last_row": last_row
+                }
+            }
+    
+    def stream_document_chunks(self, file_path: str, file_content: bytes = None) -> Iterator[Dict[str, Any]]:
+        """Yield page and paragraph chunks from a PDF or Word file as pages are extracted"""
+        filename = Path(file_path).name
+        source = Path(file_path).stem.lower().replace(' ', '_')
+        
+        for page_number, page_text in iter_document_pages(file_path, file_content):
+            page_text = self.clean_text(page_text)
+            if len(page_text) < 10:
+                continue
+            
+            for page_part in self.chunker.fit(page_text):
+                yield {
+                    "content": page_part,
+                    "source": source,
+                    "title": f"{filename} - Page {page_number}",
+                    "chunk_type": "page",
+                    "metadata": {
+                        "filename": filename,
+                        "page_number": page_number
+                    }
+                }
+            
+            paragraphs = [part for p in page_text.split('\n\n') if p.strip() and len(p.strip()) > 50
+                          for part in self.chunker.fit(p.strip())]
+            # A single-paragraph page is already covered by the page chunk
+            if len(paragraphs) < 2:
+                continue
+            for i, paragraph in enumerate(paragraphs):
+                yield {
+                    "content": paragraph,
+                    "source": source,
+                    "title": f"{filename} - Page {page_number}, Section {i+1}",
+                    "chunk_type": "paragraph",
+                    "metadata": {
+                        "filename": filename,
+                        "page_number": page_number,
+                        "section_number": i+1
+                    }
+                }
+    
+    def stream_file_chunks(self, file_path: str, file_content: bytes = None) -> Iterator[Dict[str, Any]]:
+        """Yield chunks from a streamed format without materialising the whole file"""
+        if Path(file_path).suffix.lower() == '.csv':
+            return self.stream_csv_chunks(file_path, file_content)
+        return self.stream_document_chunks(file_path, file_content)
+    
+    def process_file(self, file_path: str, file_content: bytes = None) -> List[Dict[str, Any]]:
+        """Process a single file and return chunks"""
+        filename = Path(file_path).name
+        source = Path(file_path).stem.lower().replace(' ', '_')
+        
+        print(f"Processing file: {filename}")
+        
+        if Path(file_path).suffix.lower() in STREAMED_EXTENSIONS:
+            file_chunks = list(self.stream_file_chunks(file_path, file_content))
+            print(f"Created {len(file_chunks)} chunks from {filename}")
+            return file_chunks
+        
+        # Extract text content
+        text_content = self.extract_text_from_file(file_path, file_content)
+        
+        if not text_content or len(text_content.strip()) < 10:
+            print(f"No content extracted from {filename}")
+            return []
+        
+        # Create comprehensive chunks
+        file_chunks = self.create_comprehensive_chunks(text_content, source, filename)
+        
+        print(f"Created {len(file_chunks)} chunks from {filename}")
+        return file_chunks
+
+_worker_chunker = None
+
+def chunk_file_in_worker(file_path: str) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Extract and chunk one file inside a worker process; returns (chunks, error)"""
+    global _worker_chunker
+    if _worker_chunker is None:
+        _worker_chunker = FileChunker()
+    try:
+        return _worker_chunker.process_file(file_path), None
+    except Exception as e:
+        return [], str(e)
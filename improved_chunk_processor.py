@@ -1,10 +1,23 @@
 import os
 import re
+import sys
 import json
+from itertools import groupby
 from dotenv import load_dotenv
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from openai import OpenAI
 from supabase import create_client, Client
+from embedding_batcher import EmbeddingBatcher
+from embedding_cache import EmbeddingCache
+from supabase_writer import SupabaseBulkWriter
+from ingestion_pipeline import IngestionPipeline
+from ingestion_manifest import IngestionManifest, chunk_hash, file_hash
+from chunk_ids import id_for_chunk
+from chunk_dedup import ChunkDeduplicator
+from token_chunker import TokenChunker
+from document_pooling import POOL_DOCUMENT_VECTORS, document_pool_groups
+from extraction_engine import (scan_text, split_sections, FACT_KINDS, PRICING_KINDS,
+                               CONTACT_KINDS)
 
 # Load environment variables
 load_dotenv()
@@ -19,13 +32,19 @@ if not all([OPENAI_API_KEY, SUPABASE_URL, SUPABASE_SERVICE_KEY]):
     raise ValueError("Missing required environment variables. Please check your .env file.")
 
 # Initialize clients
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
+# The ingestion pipeline's rate limiter retries 429s, so the SDK must not retry them as well
+openai_client = OpenAI(api_key=OPENAI_API_KEY, max_retries=0)
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
 
 class ComprehensiveChunkProcessor:
     def __init__(self):
         self.txt_folder = "Txt File"
         self.chunks = []
+        self.embedder = EmbeddingBatcher(openai_client, cache=EmbeddingCache())
+        self.writer = SupabaseBulkWriter(supabase)
+        self.pipeline = IngestionPipeline(self.embedder, self.writer)
+        self.deduplicator = ChunkDeduplicator()
+        self.chunker = TokenChunker()
         
     def get_all_txt_files(self) -> List[str]:
         """Get all .txt files from the Txt File folder"""
@@ -62,18 +81,23 @@ class ComprehensiveChunkProcessor:
             # Create multiple chunk types for comprehensive coverage
             chunks.extend(self.create_multiple_chunk_types(section, source, main_title))
         
-        # Strategy 3: Create overview chunks for entire file
-        chunks.append({
-            "content": self.clean_text(text),
-            "source": source,
-            "title": main_title,
-            "chunk_type": "full_document",
-            "metadata": {
-                "filename": filename,
-                "word_count": len(text.split()),
-                "char_count": len(text)
-            }
-        })
+        # Strategy 3: Create overview chunks for entire file; a pooled vector covers any
+        # length, otherwise the text is split only if over the model's token limit
+        clean_text = self.clean_text(text)
+        has_children = any(chunk["chunk_type"] == "section" for chunk in chunks)
+        for part in ([clean_text] if POOL_DOCUMENT_VECTORS and has_children else self.chunker.fit(clean_text)):
+            chunks.append({
+                "content": part,
+                "source": source,
+                "title": main_title,
+                "chunk_type": "full_document",
+                "metadata": {
+                    "filename": filename,
+                    "word_count": len(part.split()),
+                    "char_count": len(part),
+                    "token_count": self.chunker.count(part)
+                }
+            })
         
         return chunks
     
@@ -103,45 +127,31 @@ class ComprehensiveChunkProcessor:
             if len(bullet_sections) > 1:
                 sections.extend(bullet_sections)
         
-        return list(set(sections))  # Remove duplicates
+        return list(dict.fromkeys(sections))  # Remove duplicates, keeping order stable across runs
     
     def split_by_bullets(self, text: str) -> List[str]:
         """Split text by bullet points and list items"""
-        bullet_patterns = [
-            r'[•\-\*]\s+',  # Bullet points
-            r'✅\s+',       # Checkmarks
-            r'🌐\s+',       # Emojis as bullets
-            r'📱\s+',
-            r'📅\s+',
-            r'🛒\s+',
-            r'✔\s+',
-        ]
-        
-        sections = []
-        for pattern in bullet_patterns:
-            parts = re.split(pattern, text)
-            if len(parts) > 1:
-                for part in parts[1:]:  # Skip first empty part
-                    if len(part.strip()) > 20:
-                        sections.append(part.strip())
-        
-        return sections
+        return split_sections(text, min_length=20)
     
     def create_multiple_chunk_types(self, section: str, source: str, main_title: str) -> List[Dict[str, Any]]:
         """Create multiple types of chunks for comprehensive coverage"""
         chunks = []
         
-        # Type 1: Original section
-        chunks.append({
-            "content": section,
-            "source": source,
-            "title": main_title,
-            "chunk_type": "section",
-            "metadata": {"length": len(section)}
-        })
+        # Type 1: Original section, in token-sized chunks
+        for part in self.chunker.split(section):
+            chunks.append({
+                "content": part,
+                "source": source,
+                "title": main_title,
+                "chunk_type": "section",
+                "metadata": {"length": len(part), "token_count": self.chunker.count(part)}
+            })
+        
+        # One scan of the section serves every extractor below
+        found = scan_text(section, FACT_KINDS + PRICING_KINDS + CONTACT_KINDS)
         
         # Type 2: Extract key facts and features
-        facts = self.extract_key_facts(section)
+        facts = self.extract_key_facts(section, found)
         for fact in facts:
             chunks.append({
                 "content": fact,
@@ -152,7 +162,7 @@ class ComprehensiveChunkProcessor:
             })
         
         # Type 3: Extract pricing and numerical information
-        pricing_info = self.extract_pricing_info(section)
+        pricing_info = self.extract_pricing_info(section, found)
         for price in pricing_info:
             chunks.append({
                 "content": price,
@@ -163,7 +173,7 @@ class ComprehensiveChunkProcessor:
             })
         
         # Type 4: Extract contact and company information
-        contact_info = self.extract_contact_info(section)
+        contact_info = self.extract_contact_info(section, found)
         for contact in contact_info:
             chunks.append({
                 "content": contact,
@@ -175,64 +185,24 @@ class ComprehensiveChunkProcessor:
         
         return chunks
     
-    def extract_key_facts(self, text: str) -> List[str]:
+    def extract_key_facts(self, text: str, found: Optional[Dict[str, List]] = None) -> List[str]:
         """Extract key facts and features from text"""
-        facts = []
-        
-        # Extract emoji-prefixed items
-        emoji_pattern = r'[🌐📱📅🛒✅✔🎯🌍💡🛠📊⚙️💬📍❓]\s*([^\n]+)'
-        emoji_matches = re.findall(emoji_pattern, text)
-        facts.extend(emoji_matches)
-        
-        # Extract bullet points
-        bullet_pattern = r'[-•*]\s*([^\n]+)'
-        bullet_matches = re.findall(bullet_pattern, text)
-        facts.extend(bullet_matches)
-        
-        # Extract quoted text
-        quote_pattern = r'"([^"]+)"'
-        quote_matches = re.findall(quote_pattern, text)
-        facts.extend(quote_matches)
-        
+        found = found or scan_text(text, FACT_KINDS)
+        # Emoji-prefixed items, bullet points and quoted text
+        facts = found["emoji_facts"] + found["bullet_facts"] + found["quotes"]
         return [fact.strip() for fact in facts if len(fact.strip()) > 10]
     
-    def extract_pricing_info(self, text: str) -> List[str]:
+    def extract_pricing_info(self, text: str, found: Optional[Dict[str, List]] = None) -> List[str]:
         """Extract pricing and cost information"""
-        pricing = []
-        
-        # Extract price patterns
-        price_patterns = [
-            r'(\d+\s*\d*\s*kr[^\n]*)',
-            r'(Startavgift[^\n]*)',
-            r'(Månadsavgift[^\n]*)',
-            r'(\d+\s*995[^\n]*)',
-        ]
-        
-        for pattern in price_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            pricing.extend(matches)
-        
-        return [price.strip() for price in pricing if len(price.strip()) > 5]
+        found = found or scan_text(text, PRICING_KINDS)
+        return [price.strip() for price in found["price_lines"] if len(price.strip()) > 5]
     
-    def extract_contact_info(self, text: str) -> List[str]:
+    def extract_contact_info(self, text: str, found: Optional[Dict[str, List]] = None) -> List[str]:
         """Extract contact information"""
-        contact = []
-        
-        # Extract email addresses
-        email_pattern = r'([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})'
-        emails = re.findall(email_pattern, text)
-        contact.extend([f"Email: {email}" for email in emails])
-        
-        # Extract phone numbers
-        phone_pattern = r'(\+\d{2}\s*\d{3}\s*\d{3}\s*\d{3})'
-        phones = re.findall(phone_pattern, text)
-        contact.extend([f"Phone: {phone}" for phone in phones])
-        
-        # Extract websites
-        website_pattern = r'(www\.[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})'
-        websites = re.findall(website_pattern, text)
-        contact.extend([f"Website: {website}" for website in websites])
-        
+        found = found or scan_text(text, CONTACT_KINDS)
+        contact = [f"Email: {email}" for email in found["contact_emails"]]
+        contact.extend([f"Phone: {phone}" for phone in found["intl_phones"]])
+        contact.extend([f"Website: {website}" for website in found["websites"]])
         return contact
     
     def get_source_name(self, filename: str) -> str:
@@ -245,15 +215,11 @@ class ComprehensiveChunkProcessor:
     
     def get_embedding(self, text: str) -> List[float]:
         """Generate embedding for text"""
-        try:
-            response = openai_client.embeddings.create(
-                input=text,
-                model="text-embedding-3-small"
-            )
-            return response.data[0].embedding
-        except Exception as e:
-            print(f"Error generating embedding: {e}")
-            return None
+        return self.get_embeddings([text])[0]
+    
+    def get_embeddings(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Generate embeddings for many texts in token-budgeted batches"""
+        return self.pipeline.embed(texts)
     
     def process_all_files(self) -> List[Dict[str, Any]]:
         """Process all txt files and create comprehensive chunks"""
@@ -280,55 +246,155 @@ class ComprehensiveChunkProcessor:
         print(f"Total chunks created: {len(all_chunks)}")
         return all_chunks
     
-    def upload_to_supabase(self, chunks: List[Dict[str, Any]]) -> None:
-        """Upload all chunks to Supabase with embeddings"""
-        print("Starting upload to Supabase...")
-        
-        # Clear existing data (optional - remove if you want to keep existing data)
+    def build_row(self, chunk: Dict[str, Any], embedding: List[float]) -> Dict[str, Any]:
+        """Prepare a documents row for Supabase"""
+        return {
+            "id": id_for_chunk(chunk),
+            "content": chunk["content"],
+            "embedding": embedding,
+            "source": chunk["source"],
+            "metadata": {
+                "title": chunk["title"],
+                "chunk_type": chunk["chunk_type"],
+                **chunk.get("metadata", {})
+            }
+        }
+    
+    def pool_groups(self, chunks: List[Dict[str, Any]], sources: List[int]) -> Optional[Dict[int, List[Tuple[int, int]]]]:
+        """Full-document chunks whose vectors are pooled from all of the file's section chunks"""
+        if not POOL_DOCUMENT_VECTORS:
+            return None
+        return document_pool_groups(chunks, ("section",), sources)
+    
+    def deduplicate_by_file(self, chunks: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, Any], List[int]]:
+        """Deduplicate each file's chunks on their own, the scope sync_to_supabase works in"""
+        unique_chunks = []
+        sources = []
+        report = dict.fromkeys(("input_chunks", "kept_chunks", "exact_duplicates", "near_duplicates", "chars_saved"), 0)
+        # Every chunk of a file carries the file's source, and process_all_files keeps them together
+        for _, file_chunks in groupby(chunks, key=lambda chunk: chunk["source"]):
+            kept, file_report, file_sources = self.deduplicator.deduplicate_with_sources(list(file_chunks))
+            sources.extend(len(unique_chunks) + source for source in file_sources)
+            unique_chunks.extend(kept)
+            for key in report:
+                report[key] += file_report[key]
+        total_chars = sum(len(chunk["content"]) for chunk in chunks)
+        report["percent_saved"] = round(100 * report["chars_saved"] / total_chars, 1) if total_chars else 0.0
+        return unique_chunks, report, sources
+    
+    def clear_documents(self) -> None:
+        """Delete every row in the documents table"""
         try:
             supabase.table("documents").delete().neq("id", "00000000-0000-0000-0000-000000000000").execute()
             print("Cleared existing documents")
         except Exception as e:
             print(f"Note: Could not clear existing data: {e}")
+    
+    def sync_to_supabase(self) -> None:
+        """Embed and insert only new chunks and delete rows whose chunks disappeared"""
+        manifest = IngestionManifest()
+        if not manifest.exists:
+            # Rows from earlier runs are unknown to the manifest, so start from a clean table once
+            print("No ingestion manifest found, performing a full rebuild")
+            self.clear_documents()
         
-        successful_uploads = 0
-        failed_uploads = 0
+        txt_files = self.get_all_txt_files()
+        removed_ids = manifest.forget_missing_files(txt_files)
+        new_chunks = []
+        # chunk hash -> position in new_chunks, and pooled document positions -> their children
+        positions = {}
+        pool_groups = {}
+        pending = {}
+        unchanged_files = 0
         
-        for i, chunk in enumerate(chunks, 1):
+        for file_path in txt_files:
             try:
-                # Generate embedding
-                embedding = self.get_embedding(chunk["content"])
-                if embedding is None:
-                    print(f"Chunk {i}: Failed to generate embedding")
-                    failed_uploads += 1
-                    continue
-                
-                # Prepare data for Supabase
-                data = {
-                    "content": chunk["content"],
-                    "embedding": embedding,
-                    "source": chunk["source"],
-                    "metadata": {
-                        "title": chunk["title"],
-                        "chunk_type": chunk["chunk_type"],
-                        **chunk.get("metadata", {})
-                    }
-                }
-                
-                # Insert into Supabase
-                response = supabase.table("documents").insert(data).execute()
-                
-                if hasattr(response, 'error') and response.error:
-                    print(f"Chunk {i}: Upload failed - {response.error}")
-                    failed_uploads += 1
-                else:
-                    successful_uploads += 1
-                    if i % 10 == 0:  # Progress update every 10 chunks
-                        print(f"Uploaded {i}/{len(chunks)} chunks...")
-                
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    content = f.read()
             except Exception as e:
-                print(f"Chunk {i}: Exception during upload - {e}")
-                failed_uploads += 1
+                print(f"Error processing {file_path}: {e}")
+                continue
+            
+            content_hash = file_hash(content)
+            if manifest.is_unchanged(file_path, content_hash):
+                unchanged_files += 1
+                continue
+            
+            raw_chunks = self.extract_structured_info(content, file_path)
+            file_chunks, _, sources = self.deduplicator.deduplicate_with_sources(raw_chunks)
+            added, kept, removed = manifest.diff_chunks(file_path, file_chunks)
+            for h, chunk in added.items():
+                chunk["id"] = id_for_chunk(chunk)
+                positions[h] = len(new_chunks)
+                new_chunks.append(chunk)
+            for document, children in (self.pool_groups(raw_chunks, sources) or {}).items():
+                if chunk_hash(file_chunks[document]) not in added:
+                    continue
+                # A changed document's pooled vector needs all of its children, not just the new ones;
+                # unchanged children are re-upserted with cached embeddings
+                for child, _ in children:
+                    h = chunk_hash(file_chunks[child])
+                    if h not in positions:
+                        file_chunks[child]["id"] = kept[h]
+                        positions[h] = len(new_chunks)
+                        new_chunks.append(file_chunks[child])
+                pool_groups[positions[chunk_hash(file_chunks[document])]] = [
+                    (positions[chunk_hash(file_chunks[child])], weight) for child, weight in children]
+            removed_ids.extend(removed)
+            pending[file_path] = (content_hash, kept, added)
+            print(f"  {file_path}: {len(added)} new, {len(kept)} unchanged, {len(removed)} removed chunks")
+        
+        print(f"Unchanged files: {unchanged_files}, new chunks: {len(new_chunks)}, stale rows: {len(removed_ids)}")
+        
+        failed = set()
+        if new_chunks:
+            stats = self.pipeline.run(new_chunks, self.build_row, pool_groups)
+            failed = {id(chunk) for chunk in self.pipeline.failed_chunks}
+            print(f"Inserted {stats['successful_uploads']} new chunks with "
+                  f"{stats['embedding_requests']} embedding requests and {stats['pooled_vectors']} pooled document vectors")
+        
+        for file_path, (content_hash, kept, added) in pending.items():
+            chunk_ids = dict(kept)
+            for h, chunk in added.items():
+                if id(chunk) not in failed:
+                    chunk_ids[h] = chunk["id"]
+            # A file with failed chunks keeps no hash so the next run retries them
+            has_failures = len(chunk_ids) < len(kept) + len(added)
+            manifest.record_file(file_path, "" if has_failures else content_hash, chunk_ids)
+        
+        # Identical content in different chunks shares one id, so keep rows still referenced
+        live_ids = {row_id for entry in manifest.files.values() for row_id in entry["chunks"].values()}
+        removed_ids = [row_id for row_id in set(removed_ids) if row_id not in live_ids]
+        
+        # Delete stale rows only once their replacements are in place
+        if removed_ids:
+            deleted = self.writer.delete_ids(removed_ids)
+            print(f"Deleted {deleted} stale rows")
+        
+        manifest.save()
+        print("Sync complete!")
+    
+    def upload_to_supabase(self, chunks: List[Dict[str, Any]]) -> None:
+        """Upload all chunks to Supabase with embeddings"""
+        print("Starting upload to Supabase...")
+        
+        # Replace the whole table; the manifest no longer matches it afterwards
+        self.clear_documents()
+        IngestionManifest().clear()
+        
+        # Drop exact and near-identical chunks before paying for their embeddings; per file,
+        # as sync does, so a full rebuild and a sync of the same files give the same rows
+        unique_chunks, dedup_report, sources = self.deduplicate_by_file(chunks)
+        print(f"Deduplication: {dedup_report}")
+        pool_groups = self.pool_groups(chunks, sources)
+        chunks = unique_chunks
+        
+        # Embed batches concurrently and insert them as they complete
+        stats = self.pipeline.run(chunks, self.build_row, pool_groups)
+        successful_uploads = stats["successful_uploads"]
+        failed_uploads = stats["failed_uploads"]
+        print(f"Embedding requests: {stats['embedding_requests']}, pooled document vectors: {stats['pooled_vectors']}, "
+              f"rate limited: {stats['rate_limited']}, cache: {self.embedder.cache.stats()}")
         
         print(f"\nUpload complete!")
         print(f"Successful uploads: {successful_uploads}")
@@ -338,6 +404,11 @@ class ComprehensiveChunkProcessor:
 def main():
     processor = ComprehensiveChunkProcessor()
     
+    if "--full" not in sys.argv:
+        # Only embed and insert what changed since the last run
+        processor.sync_to_supabase()
+        return
+    
     # Process all files
     chunks = processor.process_all_files()
     
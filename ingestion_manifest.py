@@ -0,0 +1,84 @@
+"""
+Ingestion Manifest
+Records the file and chunk hashes already stored in Supabase so re-runs only
+embed new chunks and delete rows whose chunks disappeared
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Tuple
+
+DEFAULT_MANIFEST_PATH = os.getenv(
+    "INGESTION_MANIFEST_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".rag_cache", "ingestion_manifest.json")
+)
+
+
+def file_hash(content: str) -> str:
+    """Hash the raw text of a source file"""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def chunk_hash(chunk: Dict[str, Any]) -> str:
+    """Hash everything that ends up in a documents row except the embedding"""
+    payload = {key: value for key, value in chunk.items() if key not in ("id", "embedding")}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class IngestionManifest:
+    def __init__(self, path: str = DEFAULT_MANIFEST_PATH):
+        self.path = path
+        self.exists = os.path.exists(path)
+        # files: {file path: {"hash": file hash, "chunks": {chunk hash: row id}}}
+        self.files: Dict[str, Dict[str, Any]] = {}
+        if self.exists:
+            with open(path, "r", encoding="utf-8") as f:
+                self.files = json.load(f).get("files", {})
+
+    def save(self) -> None:
+        """Write the manifest atomically"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"files": self.files}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+        self.exists = True
+
+    def clear(self) -> None:
+        """Forget everything, e.g. after the documents table was wiped"""
+        self.files = {}
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.exists = False
+
+    def is_unchanged(self, path: str, content_hash: str) -> bool:
+        """Tell whether a file was already ingested with exactly this content"""
+        entry = self.files.get(path)
+        return entry is not None and entry["hash"] == content_hash
+
+    def diff_chunks(self, path: str, chunks: List[Dict[str, Any]]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str], List[str]]:
+        """Split a file's chunks into new ones, kept rows and row ids to delete"""
+        known = self.files.get(path, {}).get("chunks", {})
+        current = {}
+        for chunk in chunks:
+            current.setdefault(chunk_hash(chunk), chunk)
+
+        new_chunks = {h: chunk for h, chunk in current.items() if h not in known}
+        kept = {h: row_id for h, row_id in known.items() if h in current}
+        removed_ids = [row_id for h, row_id in known.items() if h not in current]
+        return new_chunks, kept, removed_ids
+
+    def record_file(self, path: str, content_hash: str, chunk_ids: Dict[str, str]) -> None:
+        """Remember the rows now stored for a file"""
+        self.files[path] = {"hash": content_hash, "chunks": chunk_ids}
+
+    def forget_missing_files(self, present_paths: List[str]) -> List[str]:
+        """Drop files that no longer exist and return their row ids"""
+        removed_ids = []
+        for path in list(self.files):
+            if path not in present_paths:
+                removed_ids.extend(self.files.pop(path)["chunks"].values())
+        return removed_ids
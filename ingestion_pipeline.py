@@ -0,0 +1,151 @@
+"""
+Ingestion Pipeline
+Embeds chunk batches concurrently under the API rate limits while a
+dedicated thread inserts finished batches into Supabase
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from document_pooling import pool_embeddings
+from embedding_batcher import EmbeddingBatcher
+from rate_limiter import RateLimiter, backoff_delay, get_retry_after, is_rate_limit_error, is_transient_error
+from supabase_writer import SupabaseBulkWriter
+
+DEFAULT_MAX_WORKERS = int(os.getenv("INGESTION_MAX_WORKERS", 4))
+DEFAULT_MAX_RETRIES = 6
+
+
+class IngestionPipeline:
+    def __init__(self, batcher: EmbeddingBatcher, writer: SupabaseBulkWriter,
+                 limiter: Optional[RateLimiter] = None,
+                 max_workers: int = DEFAULT_MAX_WORKERS,
+                 max_retries: int = DEFAULT_MAX_RETRIES):
+        self.batcher = batcher
+        self.writer = writer
+        self.limiter = limiter or RateLimiter()
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        # Chunks from the last run that were not written, for callers that track them
+        self.failed_chunks = []
+
+    def embed_with_retry(self, batch: Dict[str, Any]) -> Optional[List[List[float]]]:
+        """Embed one planned batch, backing off and retrying on 429s and transient errors"""
+        attempt = 0
+        while True:
+            self.limiter.acquire(batch["tokens"])
+            try:
+                vectors = self.batcher.run_batch(batch)
+                self.limiter.on_success()
+                return vectors
+            except Exception as e:
+                # The OpenAI client is built with max_retries=0, so every retry happens here
+                if is_rate_limit_error(e) and attempt < self.max_retries:
+                    pause = self.limiter.on_rate_limited(attempt, get_retry_after(e))
+                    print(f"Rate limited, retrying batch of {len(batch['texts'])} in {pause:.1f}s")
+                elif is_transient_error(e) and attempt < self.max_retries:
+                    pause = backoff_delay(attempt)
+                    print(f"Request failed ({e}), retrying batch of {len(batch['texts'])} in {pause:.1f}s")
+                    time.sleep(pause)
+                else:
+                    print(f"Error generating embeddings for batch of {len(batch['texts'])}: {e}")
+                    return None
+                attempt += 1
+
+    def embed(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Embed texts outside a full run, under the same rate limits and retries"""
+        embeddings, batches = self.batcher.plan(texts)
+        for batch in batches:
+            vectors = self.embed_with_retry(batch)
+            if vectors is not None:
+                for position, vector in zip(batch["positions"], vectors):
+                    embeddings[position] = vector
+        return embeddings
+
+    def run(self, chunks: List[Dict[str, Any]],
+            build_row: Callable[[Dict[str, Any], List[float]], Dict[str, Any]],
+            pool_groups: Optional[Dict[int, List[Tuple[int, int]]]] = None) -> Dict[str, Any]:
+        """Embed and insert all chunks, overlapping API calls with database writes"""
+        start = time.perf_counter()
+        # pool_groups: {chunk position: [(child position, weight)]} for chunks whose vector is pooled from children
+        pool_groups = pool_groups or {}
+        embeddings, batches = self.batcher.plan(
+            ["" if i in pool_groups else chunk["content"] for i, chunk in enumerate(chunks)])
+        requests_before = self.batcher.requests_made
+        self.writer.batch_latencies = []
+        self.writer.failed_rows = []
+
+        rows_submitted = 0
+        insert_futures = []
+        written = []
+        unembedded = []
+
+        # A single insert thread keeps writes ordered per batch and off the embedding workers
+        with ThreadPoolExecutor(max_workers=1) as insert_pool, \
+                ThreadPoolExecutor(max_workers=self.max_workers) as embed_pool:
+
+            def submit_rows(positions: List[int], vectors: List[List[float]]) -> None:
+                nonlocal rows_submitted
+                rows = [build_row(chunks[p], vector) for p, vector in zip(positions, vectors)]
+                rows_submitted += len(rows)
+                written.extend(zip(rows, positions))
+                for offset in range(0, len(rows), self.writer.batch_size):
+                    batch_rows = rows[offset:offset + self.writer.batch_size]
+                    insert_futures.append(insert_pool.submit(self.writer.write_batch, batch_rows))
+
+            # Cached chunks need no API call and can be written immediately
+            cached = [i for i, vector in enumerate(embeddings) if vector is not None]
+            if cached:
+                submit_rows(cached, [embeddings[i] for i in cached])
+
+            embed_futures = {embed_pool.submit(self.embed_with_retry, batch): batch for batch in batches}
+            for future in as_completed(embed_futures):
+                vectors = future.result()
+                if vectors is None:
+                    unembedded.extend(embed_futures[future]["positions"])
+                else:
+                    positions = embed_futures[future]["positions"]
+                    for position, vector in zip(positions, vectors):
+                        embeddings[position] = vector
+                    submit_rows(positions, vectors)
+
+            # Pooled chunks wait for their children and cost no API call
+            pooled = []
+            for position, children in pool_groups.items():
+                # A pool over only some children would not cover the whole document
+                if any(embeddings[c] is None for c, _ in children):
+                    unembedded.append(position)
+                    continue
+                vector = pool_embeddings([embeddings[c] for c, _ in children], [w for _, w in children])
+                if vector is None:
+                    unembedded.append(position)
+                else:
+                    pooled.append((position, vector))
+            if pooled:
+                submit_rows([p for p, _ in pooled], [vector for _, vector in pooled])
+
+            successful = sum(future.result() for future in insert_futures)
+
+        rejected = {id(row) for row in self.writer.failed_rows}
+        failed_positions = set(unembedded)
+        failed_positions.update(p for row, p in written if id(row) in rejected)
+        # Empty chunks are never planned into a batch
+        failed_positions.update(i for i, chunk in enumerate(chunks)
+                                if i not in pool_groups and not (chunk["content"] and chunk["content"].strip()))
+        self.failed_chunks = [chunks[p] for p in sorted(failed_positions)]
+
+        latencies = [elapsed for _, elapsed, _ in self.writer.batch_latencies]
+        return {
+            "successful_uploads": successful,
+            "failed_uploads": len(chunks) - successful,
+            "embedding_failures": len(chunks) - rows_submitted,
+            "total_chunks": len(chunks),
+            "embedding_requests": self.batcher.requests_made - requests_before,
+            "pooled_vectors": len(pooled),
+            "rate_limited": self.limiter.rate_limited,
+            "insert_requests": len(latencies),
+            "avg_batch_latency_ms": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else 0.0,
+            "elapsed_seconds": round(time.perf_counter() - start, 2)
+        }
@@ -0,0 +1,112 @@
+"""
+Local Vector Search
+Exact top-k search over the embedded chunk store in process, without a
+round trip to Supabase
+"""
+
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from embedding_batcher import EMBEDDING_DIMENSIONS, embedding_params
+from embedding_store import DEFAULT_STORE_BASE, load_chunks
+
+METRICS = ("cosine", "inner_product")
+
+
+class LocalVectorIndex:
+    def __init__(self, embeddings: Sequence[Sequence[float]], records: List[Dict[str, Any]]):
+        if len(embeddings) != len(records):
+            raise ValueError("Every record needs exactly one embedding")
+        # One contiguous float32 block so a query is a single BLAS matmul
+        self.matrix = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32).reshape(len(records), -1))
+        norms = np.linalg.norm(self.matrix, axis=1)
+        # Zero vectors score 0 instead of dividing by zero
+        norms[norms == 0] = 1.0
+        self.inverse_norms = (1.0 / norms).astype(np.float32)
+        self.records = records
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_STORE_BASE, dimensions: int = EMBEDDING_DIMENSIONS) -> "LocalVectorIndex":
+        """Load chunks written by prepare_rag_chunks.py (binary store or legacy JSON)"""
+        # Queries are embedded at EMBEDDING_DIMENSIONS, so stored vectors must match it
+        embeddings, records = load_chunks(path, dimensions=dimensions)
+        return cls(embeddings, records)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def dimensions(self) -> int:
+        return self.matrix.shape[1]
+
+    def scores(self, queries: np.ndarray, metric: str = "cosine") -> np.ndarray:
+        """Score a (queries x dims) matrix against every row; higher is more similar"""
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric {metric!r}, expected one of {METRICS}")
+        queries = np.asarray(queries, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[np.newaxis, :]
+        if queries.shape[1] != self.dimensions:
+            raise ValueError(f"Query has {queries.shape[1]} dimensions, index has {self.dimensions}")
+
+        scores = queries @ self.matrix.T
+        if metric == "cosine":
+            query_norms = np.linalg.norm(queries, axis=1, keepdims=True)
+            query_norms[query_norms == 0] = 1.0
+            scores *= self.inverse_norms
+            scores /= query_norms
+        return scores
+
+    def top_k(self, scores: np.ndarray, top_k: int) -> List[List[Dict[str, Any]]]:
+        """Turn a score matrix into ranked result lists"""
+        k = min(top_k, len(self.records))
+        if k <= 0:
+            return [[] for _ in range(scores.shape[0])]
+        # argpartition finds the k best in linear time; only those k are sorted
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, indices in zip(scores, candidates):
+            ranked = indices[np.argsort(-row[indices], kind="stable")]
+            results.append([dict(self.records[i], score=float(row[i])) for i in ranked])
+        return results
+
+    def search(self, query: Sequence[float], top_k: int = 5, metric: str = "cosine") -> List[Dict[str, Any]]:
+        """Return the top_k records most similar to one query vector"""
+        return self.top_k(self.scores(query, metric), top_k)[0]
+
+    def search_batch(self, queries: Sequence[Sequence[float]], top_k: int = 5,
+                     metric: str = "cosine") -> List[List[Dict[str, Any]]]:
+        """Return the top_k records for each query vector, scored in one matmul"""
+        return self.top_k(self.scores(queries, metric), top_k)
+
+
+def main(path: Optional[str] = None):
+    from dotenv import load_dotenv
+    from openai import OpenAI
+
+    load_dotenv()
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("Missing OPENAI_API_KEY environment variable. Please check your .env file.")
+
+    index = LocalVectorIndex.load(path or DEFAULT_STORE_BASE)
+    print(f"Loaded {len(index)} chunks with {index.dimensions} dimensions")
+
+    client = OpenAI(api_key=api_key)
+    user_query = input("Enter your question: ")
+    query_embedding = client.embeddings.create(input=user_query, **embedding_params()).data[0].embedding
+
+    start = time.perf_counter()
+    results = index.search(query_embedding, top_k=3)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    for idx, result in enumerate(results, 1):
+        print(f"\nResult {idx} (source: {result.get('source')}, score: {result['score']:.4f}):\n{result['content']}\n")
+    print(f"Search took {elapsed_ms:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Postgres Vector Store
+Pooled connections for top-k queries against the documents table: the search
+statement is prepared once per connection and vectors travel in pgvector's binary format
+"""
+
+import os
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+from pgvector import Vector
+from pgvector.psycopg import register_vector
+from psycopg.conninfo import make_conninfo
+from psycopg_pool import ConnectionPool
+
+from vector_index import VECTOR_METRIC, distance_operator, index_info_sql, search_settings_sql
+
+PG_POOL_MIN_SIZE = int(os.getenv("PG_POOL_MIN_SIZE", 1))
+PG_POOL_MAX_SIZE = int(os.getenv("PG_POOL_MAX_SIZE", 10))
+# Transaction-mode poolers (Supabase port 6543) cannot keep server-side prepared statements
+PG_PREPARE_STATEMENTS = os.getenv("PG_PREPARE_STATEMENTS", "true").lower() not in ("0", "false", "no")
+
+
+def conninfo_from_env() -> str:
+    """Connection string built from the SUPABASE_DB_* variables"""
+    settings = {
+        "host": os.getenv("SUPABASE_DB_HOST"),
+        "port": os.getenv("SUPABASE_DB_PORT", "5432"),
+        "dbname": os.getenv("SUPABASE_DB_NAME"),
+        "user": os.getenv("SUPABASE_DB_USER"),
+        "password": os.getenv("SUPABASE_DB_PASSWORD")
+    }
+    if not all(settings.values()):
+        raise ValueError("Missing required environment variables. Please check your .env file.")
+    return make_conninfo(**settings)
+
+
+def search_sql(metric: str = VECTOR_METRIC) -> str:
+    """Top-k statement; the named vector parameter is sent once and bound twice"""
+    # The operator must match the index operator class or the index is skipped
+    operator = distance_operator(metric)
+    return (f"SELECT content, source, embedding {operator} %(embedding)b AS distance "
+            f"FROM documents ORDER BY embedding {operator} %(embedding)b LIMIT %(limit)s")
+
+
+class PostgresVectorStore:
+    def __init__(self, conninfo: Optional[str] = None, min_size: int = PG_POOL_MIN_SIZE,
+                 max_size: int = PG_POOL_MAX_SIZE, metric: str = VECTOR_METRIC):
+        self.sql = search_sql(metric)
+        self.pool = ConnectionPool(
+            conninfo or conninfo_from_env(),
+            min_size=min_size,
+            max_size=max_size,
+            # Read-only lookups need no transaction around them
+            kwargs={"autocommit": True},
+            configure=self._configure,
+            open=True
+        )
+
+    @staticmethod
+    def _configure(conn) -> None:
+        """Per-connection setup, run once when the pool opens a connection"""
+        register_vector(conn)
+        # Tune the session for whichever index exists (ivfflat probes or hnsw ef_search)
+        kind, reloptions, _ = conn.execute(index_info_sql()).fetchone() or (None, None, None)
+        for statement in search_settings_sql(kind, reloptions):
+            conn.execute(statement)
+
+    def search(self, embedding: Any, top_k: int = 5) -> List[Tuple[str, str, float]]:
+        """(content, source, distance) of the top_k closest documents"""
+        vector = Vector(np.asarray(embedding, dtype=np.float32))
+        with self.pool.connection() as conn:
+            cur = conn.execute(self.sql, {"embedding": vector, "limit": top_k},
+                               prepare=PG_PREPARE_STATEMENTS, binary=True)
+            return cur.fetchall()
+
+    def close(self) -> None:
+        self.pool.close()
@@ -0,0 +1,197 @@
+"""
+Quantization
+int8 scalar and product quantization of embeddings, searched on the
+compressed codes with a full-precision rescoring pass over a shortlist
+"""
+
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+METHODS = ("int8", "pq")
+
+# Codes are decoded and scored in cache-sized blocks so memory stays near the compressed size
+SCORE_BLOCK_ROWS = 4096
+
+# Shortlist size as a multiple of top_k for the rescoring pass
+DEFAULT_RESCORE_FACTOR = 10
+
+PQ_CENTROIDS = 256  # one byte per sub-vector code
+PQ_DIMS_PER_SUBSPACE = 4  # 16x smaller than float32
+PQ_ITERATIONS = 10
+PQ_TRAINING_POINTS = 8192
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length so inner product equals cosine similarity"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def kmeans(data: np.ndarray, k: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    """Plain Euclidean k-means; returns the centroids"""
+    k = min(k, len(data))
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+    for _ in range(iterations):
+        # argmin ||x - c||^2 = argmin (||c||^2 - 2 x.c)
+        distances = (centroids * centroids).sum(axis=1) - 2 * data @ centroids.T
+        labels = np.argmin(distances, axis=1)
+        counts = np.bincount(labels, minlength=k)
+        # One weighted bincount per dimension is far faster than np.add.at
+        sums = np.stack([np.bincount(labels, weights=data[:, d], minlength=k)
+                         for d in range(data.shape[1])], axis=1)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, np.newaxis]
+        centroids[empty] = data[rng.choice(len(data), int(empty.sum()))]
+    return centroids
+
+
+class ScalarQuantizer:
+    """Per-dimension int8 codes: 4x smaller than float32"""
+
+    def __init__(self):
+        self.offset: Optional[np.ndarray] = None
+        self.scale: Optional[np.ndarray] = None
+
+    def train(self, vectors: np.ndarray) -> None:
+        """Fit the per-dimension value range"""
+        low = vectors.min(axis=0)
+        high = vectors.max(axis=0)
+        self.scale = np.maximum((high - low) / 255.0, 1e-12).astype(np.float32)
+        # Codes are stored as int8 in [-128, 127], so shift the midpoint to zero
+        self.offset = (low + 128.0 * self.scale).astype(np.float32)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.round((vectors - self.offset) / self.scale)
+        return np.clip(codes, -128, 127).astype(np.int8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) * self.scale + self.offset
+
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Approximate inner products of the query with every encoded row"""
+        # q . (c * scale + offset) = (q * scale) . c + q . offset
+        scaled_query = query * self.scale
+        bias = float(query @ self.offset)
+        result = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), SCORE_BLOCK_ROWS):
+            block = codes[start:start + SCORE_BLOCK_ROWS].astype(np.float32)
+            result[start:start + len(block)] = block @ scaled_query + bias
+        return result
+
+
+class ProductQuantizer:
+    """One byte per group of dimensions, scored with per-query lookup tables"""
+
+    def __init__(self, dims_per_subspace: int = PQ_DIMS_PER_SUBSPACE, seed: int = 0):
+        self.dims_per_subspace = dims_per_subspace
+        self.seed = seed
+        self.codebooks: Optional[np.ndarray] = None  # (subspaces, centroids, dims_per_subspace)
+
+    def subspaces(self, vectors: np.ndarray) -> np.ndarray:
+        """View (n, dims) as (n, subspaces, dims_per_subspace)"""
+        if vectors.shape[1] % self.dims_per_subspace:
+            raise ValueError(f"{vectors.shape[1]} dimensions do not split into groups of {self.dims_per_subspace}")
+        return vectors.reshape(len(vectors), -1, self.dims_per_subspace)
+
+    def train(self, vectors: np.ndarray) -> None:
+        """Learn a 256-entry codebook for every subspace"""
+        rng = np.random.default_rng(self.seed)
+        sample = vectors[rng.choice(len(vectors), min(len(vectors), PQ_TRAINING_POINTS), replace=False)]
+        parts = self.subspaces(np.asarray(sample, dtype=np.float32))
+        codebooks = []
+        for m in range(parts.shape[1]):
+            centroids = kmeans(parts[:, m], PQ_CENTROIDS, PQ_ITERATIONS, rng)
+            # Small corpora have fewer distinct points than codebook entries
+            if len(centroids) < PQ_CENTROIDS:
+                centroids = np.concatenate([centroids, np.repeat(centroids[:1], PQ_CENTROIDS - len(centroids), axis=0)])
+            codebooks.append(centroids)
+        self.codebooks = np.stack(codebooks).astype(np.float32)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Codes laid out subspace-major, (subspaces, n), so scoring reads contiguous rows"""
+        codes = np.empty((self.codebooks.shape[0], len(vectors)), dtype=np.uint8)
+        for start in range(0, len(vectors), SCORE_BLOCK_ROWS):
+            parts = self.subspaces(np.asarray(vectors[start:start + SCORE_BLOCK_ROWS], dtype=np.float32))
+            for m, codebook in enumerate(self.codebooks):
+                distances = (codebook * codebook).sum(axis=1) - 2 * parts[:, m] @ codebook.T
+                codes[m, start:start + len(parts)] = np.argmin(distances, axis=1)
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        subspace_index = np.arange(self.codebooks.shape[0])[:, np.newaxis]
+        return self.codebooks[subspace_index, codes].transpose(1, 0, 2).reshape(codes.shape[1], -1)
+
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Asymmetric distance computation: sum of per-subspace query/centroid products"""
+        # table[m, c] = query sub-vector m . centroid c of subspace m
+        table = np.einsum("md,mcd->mc", self.subspaces(query[np.newaxis, :])[0], self.codebooks)
+        result = np.zeros(codes.shape[1], dtype=np.float32)
+        for m in range(len(table)):
+            result += np.take(table[m], codes[m])
+        return result
+
+
+class QuantizedIndex:
+    def __init__(self, vectors: np.ndarray, method: str = "int8", metric: str = "cosine",
+                 keep_full_precision: bool = True):
+        if method not in METHODS:
+            raise ValueError(f"Unknown quantization method {method!r}, expected one of {METHODS}")
+        self.method = method
+        self.metric = metric
+        # Full-precision rows are only read for the shortlist, so a memory-mapped
+        # store stays on disk apart from the pages that rescoring touches
+        self.full_vectors = vectors if keep_full_precision else None
+
+        data = np.asarray(vectors, dtype=np.float32)
+        if metric == "cosine":
+            data = normalize(data)
+        self.quantizer = ScalarQuantizer() if method == "int8" else ProductQuantizer()
+        self.quantizer.train(data)
+        self.codes = self.quantizer.encode(data)
+        self.count = len(data)
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the compressed codes"""
+        return self.codes.nbytes
+
+    def prepare_query(self, query: Sequence[float]) -> np.ndarray:
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        if self.metric == "cosine":
+            norm = np.linalg.norm(query)
+            if norm:
+                query = query / norm
+        return query
+
+    def exact_scores(self, rows: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Full-precision scores for a handful of rows"""
+        # Sorted reads are friendlier to mmap; scores are put back in the caller's order
+        order = np.argsort(rows)
+        vectors = np.asarray(self.full_vectors[rows[order]], dtype=np.float32)
+        if self.metric == "cosine":
+            vectors = normalize(vectors)
+        scores = np.empty(len(rows), dtype=np.float32)
+        scores[order] = vectors @ query
+        return scores
+
+    def search(self, query: Sequence[float], top_k: int = 5,
+               rescore_factor: Optional[int] = DEFAULT_RESCORE_FACTOR) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (row ids, scores) of the top_k rows, rescoring a shortlist at full precision"""
+        query = self.prepare_query(query)
+        approximate = self.quantizer.scores(self.codes, query)
+
+        rescore = rescore_factor and self.full_vectors is not None
+        shortlist_size = min(top_k * rescore_factor if rescore else top_k, len(approximate))
+        if shortlist_size <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        shortlist = np.argpartition(-approximate, shortlist_size - 1)[:shortlist_size]
+        scores = self.exact_scores(shortlist, query) if rescore else approximate[shortlist]
+
+        k = min(top_k, len(shortlist))
+        best = np.argsort(-scores, kind="stable")[:k]
+        return shortlist[best], scores[best]
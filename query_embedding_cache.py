@@ -0,0 +1,108 @@
+"""
+Query Embedding Cache
+In-memory LRU cache with expiry for question embeddings, keyed on the normalized
+question and optionally backed by the shared on-disk embedding cache
+"""
+
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from embedding_batcher import cache_model_name
+from embedding_cache import EmbeddingCache
+
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", 1024))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", 24 * 3600))
+# Share embeddings between worker processes through the SQLite embedding cache
+QUERY_CACHE_SHARED = os.getenv("QUERY_CACHE_SHARED", "false").lower() in ("1", "true", "yes")
+
+# Trailing punctuation does not change what is being asked
+TRAILING_PUNCTUATION = "?!.,;: "
+
+
+def normalize_query(query: str) -> str:
+    """Cache key for a question: Unicode-normalized, case-folded, single-spaced"""
+    text = unicodedata.normalize("NFKC", query).casefold()
+    return re.sub(r"\s+", " ", text).strip(TRAILING_PUNCTUATION)
+
+
+class QueryEmbeddingCache:
+    def __init__(self, max_entries: int = QUERY_CACHE_SIZE, ttl_seconds: float = QUERY_CACHE_TTL,
+                 store: Optional[EmbeddingCache] = None, model: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.store = store
+        # Entries are keyed by the normalized question, not the text that was embedded, so they get
+        # their own label in the shared store instead of posing as embeddings of that exact text
+        self.model = f"{model or cache_model_name()}:query"
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.memory_hits = 0
+        self.store_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "QueryEmbeddingCache":
+        """Cache configured by QUERY_CACHE_SIZE, QUERY_CACHE_TTL and QUERY_CACHE_SHARED"""
+        return cls(store=EmbeddingCache() if QUERY_CACHE_SHARED else None)
+
+    def get(self, query: str) -> Optional[List[float]]:
+        """Cached embedding for the question, or None"""
+        key = normalize_query(query)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires_at, vector = entry
+                if expires_at > time.monotonic():
+                    self.entries.move_to_end(key)
+                    self.memory_hits += 1
+                    return vector
+                del self.entries[key]
+
+        vector = self.store.get(self.model, key) if self.store is not None else None
+        with self._lock:
+            if vector is None:
+                self.misses += 1
+                return None
+            self.store_hits += 1
+        self._remember(key, vector)
+        return vector
+
+    def put(self, query: str, vector: List[float]) -> None:
+        key = normalize_query(query)
+        self._remember(key, vector)
+        if self.store is not None:
+            self.store.put(self.model, key, vector)
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        with self._lock:
+            self.entries[key] = (time.monotonic() + self.ttl_seconds, vector)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def get_or_embed(self, query: str, embed: Callable[[str], List[float]]) -> List[float]:
+        """Return the cached embedding or compute it with embed and cache it"""
+        vector = self.get(query)
+        if vector is None:
+            vector = embed(query)
+            self.put(query, vector)
+        return vector
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the in-memory entry count"""
+        with self._lock:
+            hits = self.memory_hits + self.store_hits
+            lookups = hits + self.misses
+            return {
+                "hits": hits,
+                "memory_hits": self.memory_hits,
+                "store_hits": self.store_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "entries": len(self.entries)
+            }
@@ -0,0 +1,130 @@
+"""
+Rate Limiter
+Token buckets for OpenAI requests-per-minute and tokens-per-minute limits,
+with adaptive backoff when the API answers 429
+"""
+
+import os
+import random
+import threading
+import time
+from typing import Optional
+
+from openai import APIConnectionError
+
+# Defaults match the text-embedding-3-small limits of a tier 1 account
+DEFAULT_RPM = int(os.getenv("OPENAI_EMBEDDING_RPM", 3000))
+DEFAULT_TPM = int(os.getenv("OPENAI_EMBEDDING_TPM", 1000000))
+
+# Rate multiplier bounds used by the adaptive backoff
+MIN_RATE_SCALE = 0.1
+RATE_DECREASE = 0.5
+RATE_INCREASE = 1.05
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.per_second = per_minute / 60.0
+        self.available = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def set_rate(self, per_minute: float) -> None:
+        """Change the refill rate without touching the burst capacity"""
+        with self._lock:
+            self._refill()
+            self.per_second = per_minute / 60.0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.per_second)
+        self.updated = now
+
+    def acquire(self, amount: float = 1) -> None:
+        """Block until amount units are available, then take them"""
+        # A request larger than the bucket could never be served otherwise
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self.available >= amount:
+                    self.available -= amount
+                    return
+                wait = (amount - self.available) / self.per_second
+            time.sleep(wait)
+
+
+class RateLimiter:
+    def __init__(self, rpm: int = DEFAULT_RPM, tpm: int = DEFAULT_TPM):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.scale = 1.0
+        self.paused_until = 0.0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int) -> None:
+        """Wait for one request slot and the given number of tokens"""
+        while True:
+            with self._lock:
+                wait = self.paused_until - time.monotonic()
+            if wait <= 0:
+                break
+            time.sleep(wait)
+        self.requests.acquire(1)
+        self.tokens.acquire(tokens)
+
+    def _apply_scale(self, scale: float) -> None:
+        self.scale = scale
+        self.requests.set_rate(self.rpm * scale)
+        self.tokens.set_rate(self.tpm * scale)
+
+    def on_success(self) -> None:
+        """Recover the configured rate gradually after backing off"""
+        with self._lock:
+            if self.scale < 1.0:
+                self._apply_scale(min(1.0, self.scale * RATE_INCREASE))
+
+    def on_rate_limited(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Pause all callers and halve the rate after a 429; returns the pause length"""
+        with self._lock:
+            self.rate_limited += 1
+            self._apply_scale(max(MIN_RATE_SCALE, self.scale * RATE_DECREASE))
+            if retry_after is None:
+                retry_after = backoff_delay(attempt)
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+            return retry_after
+
+
+def backoff_delay(attempt: int) -> float:
+    """Seconds to wait before retry number attempt + 1"""
+    # Exponential backoff with jitter so workers do not retry in lockstep
+    return min(60.0, 2 ** attempt) * (0.5 + random.random() / 2)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Tell whether an API exception is a 429 response"""
+    return getattr(error, "status_code", None) == 429
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Tell whether an API exception is worth retrying: timeouts, conflicts, 5xx and lost connections"""
+    if isinstance(error, APIConnectionError):
+        return True
+    status = getattr(error, "status_code", None)
+    return status is not None and (status in (408, 409) or status >= 500)
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """Read the Retry-After header from an API exception, if present"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
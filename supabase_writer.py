@@ -0,0 +1,88 @@
+"""
+Supabase Bulk Writer
+Shared write path that upserts rows into the documents table in batches
+"""
+
+import time
+from typing import Any, Dict, List
+
+from corpus_version import mark_corpus_changed
+
+DEFAULT_BATCH_SIZE = 100
+
+
+class SupabaseBulkWriter:
+    def __init__(self, client, table: str = "documents", batch_size: int = DEFAULT_BATCH_SIZE,
+                 upsert: bool = True):
+        self.client = client
+        self.table = table
+        self.batch_size = batch_size
+        self.upsert = upsert
+        self.batch_latencies = []
+        self.failed_rows = []
+
+    def send_batch(self, rows: List[Dict[str, Any]]) -> None:
+        """Send rows in one request, raising if Supabase rejects them"""
+        if self.upsert:
+            # Postgres rejects an upsert that touches the same id twice in one statement
+            unique_rows = {}
+            for position, row in enumerate(rows):
+                unique_rows[row.get("id") or position] = row
+            response = self.client.table(self.table).upsert(list(unique_rows.values()), on_conflict="id").execute()
+        else:
+            response = self.client.table(self.table).insert(rows).execute()
+        if getattr(response, "error", None):
+            raise RuntimeError(response.error)
+
+    def write_batch(self, rows: List[Dict[str, Any]]) -> int:
+        """Write one batch, splitting it on rejection to isolate bad rows; returns rows written"""
+        start = time.perf_counter()
+        try:
+            self.send_batch(rows)
+        except Exception as e:
+            elapsed = time.perf_counter() - start
+            self.batch_latencies.append((len(rows), elapsed, False))
+            if len(rows) == 1:
+                print(f"Row rejected by {self.table}: {e}")
+                self.failed_rows.append(rows[0])
+                return 0
+            # Bisect so a single bad row only costs log2(batch_size) extra requests
+            middle = len(rows) // 2
+            return self.write_batch(rows[:middle]) + self.write_batch(rows[middle:])
+
+        elapsed = time.perf_counter() - start
+        self.batch_latencies.append((len(rows), elapsed, True))
+        mark_corpus_changed()
+        print(f"Wrote batch of {len(rows)} rows in {elapsed * 1000:.0f} ms")
+        return len(rows)
+
+    def write(self, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Write all rows in batches of batch_size and return upload statistics"""
+        self.batch_latencies = []
+        self.failed_rows = []
+        successful = 0
+        for start in range(0, len(rows), self.batch_size):
+            successful += self.write_batch(rows[start:start + self.batch_size])
+
+        latencies = [elapsed for _, elapsed, _ in self.batch_latencies]
+        return {
+            "successful_uploads": successful,
+            "failed_uploads": len(rows) - successful,
+            "total_rows": len(rows),
+            "requests": len(latencies),
+            "avg_batch_latency_ms": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else 0.0,
+            "max_batch_latency_ms": round(max(latencies) * 1000, 1) if latencies else 0.0
+        }
+
+    def delete_ids(self, ids: List[str]) -> int:
+        """Delete rows by id in batches and return how many ids were sent"""
+        deleted = 0
+        for start in range(0, len(ids), self.batch_size):
+            batch = ids[start:start + self.batch_size]
+            try:
+                self.client.table(self.table).delete().in_("id", batch).execute()
+                deleted += len(batch)
+                mark_corpus_changed()
+            except Exception as e:
+                print(f"Could not delete {len(batch)} rows from {self.table}: {e}")
+        return deleted
@@ -0,0 +1,19 @@
+"""
+Test Configuration
+Puts the repository root on the import path and gives the modules that validate
+their environment at import time placeholder settings
+"""
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Clients are created at import but never used by the tests
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("SUPABASE_URL", "https://test.supabase.co")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test.service.key")
+# Writers touch the corpus version marker; keep it out of the working tree
+os.environ["CORPUS_VERSION_PATH"] = os.path.join(tempfile.mkdtemp(), "corpus_version")
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from ann_index import IVFIndex
+
+TOP_K = 10
+
+
+def synthetic_corpus(count=5000, dimensions=64, clusters=50, seed=0):
+    """Unit vectors scattered around random topic centres, like real embedding corpora"""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dimensions)).astype(np.float32)
+    labels = rng.integers(0, clusters, count)
+    vectors = centres[labels] + 1.5 * rng.standard_normal((count, dimensions)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def recall_at_k(approximate, exact):
+    hits = sum(len(set(a) & set(e)) for a, e in zip(approximate, exact))
+    return hits / exact.size
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    vectors = synthetic_corpus()
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), 100, replace=False)]
+    queries = queries + 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+    units = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    exact = np.argsort(-(units @ vectors.T), axis=1)[:, :TOP_K]
+    return vectors, queries, exact
+
+
+@pytest.fixture(scope="module")
+def index(corpus):
+    index = IVFIndex(corpus[0].shape[1])
+    index.add(corpus[0])
+    return index
+
+
+def test_default_search_breadth_keeps_recall_high(corpus, index):
+    _, queries, exact = corpus
+    ids, _ = index.search(queries, TOP_K)
+    assert recall_at_k(ids, exact) >= 0.9
+
+
+def test_recall_grows_with_search_breadth(corpus, index):
+    _, queries, exact = corpus
+    recalls = [recall_at_k(index.search(queries, TOP_K, n_probe)[0], exact) for n_probe in (1, 4, 16)]
+    assert recalls == sorted(recalls)
+    assert recalls[0] < recalls[-1]
+
+
+def test_probing_every_list_is_exact(corpus, index):
+    _, queries, exact = corpus
+    ids, scores = index.search(queries, TOP_K, n_probe=index.n_lists)
+    assert recall_at_k(ids, exact) == 1.0
+    assert np.all(np.diff(scores, axis=1) <= 0)
+
+
+def test_incremental_add_assigns_new_ids(corpus):
+    vectors, _, _ = corpus
+    index = IVFIndex(vectors.shape[1])
+    index.add(vectors[:4000])
+    index.add(vectors[4000:])
+    assert len(index) == len(vectors)
+    ids, _ = index.search(vectors[4500:4510], top_k=1, n_probe=index.n_lists)
+    assert ids[:, 0].tolist() == list(range(4500, 4510))
+
+
+def test_save_and_load_return_the_same_results(corpus, index, tmp_path):
+    _, queries, _ = corpus
+    path = str(tmp_path / "ivf.npz")
+    index.save(path)
+    loaded = IVFIndex.load(path)
+    assert len(loaded) == len(index)
+    expected_ids, expected_scores = index.search(queries, TOP_K)
+    ids, scores = loaded.search(queries, TOP_K)
+    assert np.array_equal(ids, expected_ids)
+    assert np.allclose(scores, expected_scores)
+
+
+def test_small_lists_are_padded(corpus):
+    index = IVFIndex(corpus[0].shape[1], n_lists=2)
+    index.add(corpus[0][:3])
+    ids, scores = index.search(corpus[0][:1], top_k=5, n_probe=2)
+    assert sorted(ids[0, :3].tolist()) == [0, 1, 2]
+    assert ids[0, 3:].tolist() == [-1, -1]
+    assert np.all(np.isneginf(scores[0, 3:]))
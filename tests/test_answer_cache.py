@@ -0,0 +1,84 @@
+import types
+
+import corpus_version
+from answer_cache import SemanticAnswerCache
+from corpus_version import mark_corpus_changed
+from supabase_writer import SupabaseBulkWriter
+
+DOCS = [{"id": "a", "content": "Startavgift 8 995 kr"}, {"id": "b", "content": "Support varje dag"}]
+QUESTION = [1.0, 0.0, 0.0]
+SIMILAR = [0.99, 0.05, 0.0]
+DIFFERENT = [0.0, 1.0, 0.0]
+
+
+def make_cache(tmp_path, **options):
+    return SemanticAnswerCache(version_path=str(tmp_path / "corpus_version"), **options)
+
+
+def test_similar_question_over_the_same_context_hits(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put(QUESTION, DOCS, "8 995 kr")
+    assert cache.get(SIMILAR, DOCS) == "8 995 kr"
+    assert cache.get(DIFFERENT, DOCS) is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_changed_context_misses(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put(QUESTION, DOCS, "8 995 kr")
+    assert cache.get(QUESTION, DOCS[:1]) is None
+    # Same ids with rewritten content is a different context
+    assert cache.get(QUESTION, [dict(DOCS[0], content="Startavgift 9 995 kr"), DOCS[1]]) is None
+
+
+def test_corpus_change_invalidates_every_entry(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put(QUESTION, DOCS, "8 995 kr")
+    assert cache.get(QUESTION, DOCS) == "8 995 kr"
+
+    mark_corpus_changed(cache.version_path)
+    assert cache.get(QUESTION, DOCS) is None
+    assert cache.stats()["invalidations"] == 1
+    assert cache.stats()["entries"] == 0
+
+    # Answers cached after the change are served again
+    cache.put(QUESTION, DOCS, "9 995 kr")
+    assert cache.get(QUESTION, DOCS) == "9 995 kr"
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = make_cache(tmp_path, max_entries=2)
+    cache.put(QUESTION, DOCS, "first")
+    cache.put(DIFFERENT, DOCS, "second")
+    assert cache.get(QUESTION, DOCS) == "first"
+    cache.put([0.0, 0.0, 1.0], DOCS, "third")
+    assert cache.get(DIFFERENT, DOCS) is None
+    assert cache.get(QUESTION, DOCS) == "first"
+    assert cache.stats()["entries"] == 2
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = make_cache(tmp_path, max_entries=0)
+    cache.put(QUESTION, DOCS, "8 995 kr")
+    assert cache.get(QUESTION, DOCS) is None
+
+
+def test_writes_and_deletes_bump_the_corpus_version():
+    executed = types.SimpleNamespace(execute=lambda: types.SimpleNamespace(error=None))
+    table = types.SimpleNamespace(upsert=lambda rows, on_conflict=None: executed,
+                                  delete=lambda: types.SimpleNamespace(in_=lambda column, ids: executed))
+    writer = SupabaseBulkWriter(types.SimpleNamespace(table=lambda name: table))
+    cache = SemanticAnswerCache()
+    cache.put(QUESTION, DOCS, "8 995 kr")
+
+    before = corpus_version.corpus_version()
+    writer.write([{"id": "a", "content": "Startavgift 9 995 kr"}])
+    after_write = corpus_version.corpus_version()
+    assert after_write is not None and after_write != before
+    assert cache.get(QUESTION, DOCS) is None
+
+    cache.put(QUESTION, DOCS, "9 995 kr")
+    writer.delete_ids(["b"])
+    assert corpus_version.corpus_version() != after_write
+    assert cache.get(QUESTION, DOCS) is None
@@ -0,0 +1,134 @@
+import http.client
+import json
+import threading
+import types
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import web_server
+from answer_cache import SemanticAnswerCache
+from enhanced_query_system import EnhancedQuerySystem
+from query_embedding_cache import QueryEmbeddingCache
+
+DOCS = [
+    {"id": "a", "content": "Startavgift 8 995 kr", "source": "paket",
+     "metadata": {"title": "Paket", "chunk_type": "pricing"}},
+    {"id": "b", "content": "Support varje dag", "source": "support",
+     "metadata": {"title": "Support", "chunk_type": "key_fact"}},
+]
+PIECES = ["Startavgiften ", "är ", "8 995 kr."]
+
+
+class FakeStream:
+    """Chat completion stream that checks the answer cache before each piece"""
+
+    def __init__(self, system, pieces, fail_after=None):
+        self.system = system
+        self.pieces = pieces
+        self.fail_after = fail_after
+        self.closed = False
+        self.cached_while_streaming = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.closed = True
+
+    def __iter__(self):
+        for i, piece in enumerate(self.pieces):
+            if i == self.fail_after:
+                raise RuntimeError("stream interrupted")
+            self.cached_while_streaming.append(self.system.answer_cache.get([1.0, 0.0], DOCS))
+            # Role-only and empty deltas come first in real streams and are skipped
+            yield types.SimpleNamespace(choices=[types.SimpleNamespace(delta=types.SimpleNamespace(content=None))])
+            yield types.SimpleNamespace(choices=[types.SimpleNamespace(delta=types.SimpleNamespace(content=piece))])
+
+
+class FakeOpenAI:
+    def __init__(self):
+        self.streams = []
+        self.fail_after = None
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self.create_completion))
+        self.embeddings = types.SimpleNamespace(create=self.create_embedding)
+
+    def create_completion(self, **params):
+        assert params["stream"] is True
+        stream = FakeStream(self.system, PIECES, self.fail_after)
+        self.streams.append(stream)
+        return stream
+
+    def create_embedding(self, **params):
+        return types.SimpleNamespace(data=[types.SimpleNamespace(embedding=[1.0, 0.0])])
+
+
+@pytest.fixture
+def query_system(tmp_path, monkeypatch):
+    system = EnhancedQuerySystem.__new__(EnhancedQuerySystem)
+    system.client = FakeOpenAI()
+    system.client.system = system
+    system.query_cache = QueryEmbeddingCache()
+    system.answer_cache = SemanticAnswerCache(version_path=str(tmp_path / "corpus_version"))
+    system.comprehensive_search = lambda query: {"semantic_search": DOCS[:1], "key_facts": DOCS[1:]}
+    monkeypatch.setattr(web_server, "_query_system", system)
+    return system
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), web_server.FileUploadHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def ask(server, query="Vad kostar det?"):
+    """GET /ask and return the (event, data) pairs in the order they arrived"""
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=10)
+    connection.request("GET", "/ask?q=" + query.replace(" ", "+"))
+    response = connection.getresponse()
+    assert response.status == 200
+    assert response.getheader("Content-Type").startswith("text/event-stream")
+    body = response.read().decode("utf-8")
+    connection.close()
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_events_arrive_as_sources_tokens_then_done(query_system, server):
+    events = ask(server)
+
+    assert [event for event, _ in events] == ["sources"] + ["token"] * len(PIECES) + ["done"]
+    assert [source["chunk_type"] for source in events[0][1]] == ["pricing", "key_fact"]
+    assert [data["text"] for event, data in events if event == "token"] == PIECES
+    assert events[-1][1]["first_token_ms"] is not None
+
+    stream = query_system.client.streams[0]
+    assert stream.closed
+    # The answer is cached only once the stream has finished
+    assert stream.cached_while_streaming == [None] * len(PIECES)
+    assert query_system.answer_cache.get([1.0, 0.0], DOCS) == "".join(PIECES)
+
+
+def test_cached_answer_is_sent_without_a_completion(query_system, server):
+    ask(server)
+    events = ask(server)
+
+    assert [event for event, _ in events] == ["sources", "token", "done"]
+    assert events[1][1]["text"] == "".join(PIECES)
+    assert len(query_system.client.streams) == 1
+
+
+def test_interrupted_stream_is_not_cached(query_system, server):
+    query_system.client.fail_after = 2
+    events = ask(server)
+
+    assert [event for event, _ in events] == ["sources", "token", "token", "error"]
+    assert query_system.client.streams[0].closed
+    assert query_system.answer_cache.get([1.0, 0.0], DOCS) is None
@@ -0,0 +1,108 @@
+import asyncio
+import hashlib
+import types
+
+from answer_cache import SemanticAnswerCache
+from async_query_system import AsyncQuerySystem
+from query_embedding_cache import QueryEmbeddingCache
+
+DOCS = [{"id": "a", "content": "Startavgift 8 995 kr", "metadata": {"chunk_type": "pricing"}}]
+
+
+class FakeAsyncOpenAI:
+    """Completions wait on an event unless a delay is set, and record how many run at once"""
+
+    def __init__(self, delay=None):
+        self.delay = delay
+        self.running = 0
+        self.max_running = 0
+        self.cancelled = 0
+        self.closed = False
+        self.embeddings = types.SimpleNamespace(create=self.create_embedding)
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self.create_completion))
+
+    async def create_embedding(self, input, **params):
+        # A distinct vector per question, so answers are not served from the cache
+        digest = hashlib.sha256(input.encode("utf-8")).digest()
+        return types.SimpleNamespace(data=[types.SimpleNamespace(embedding=[b - 128 for b in digest[:8]])])
+
+    async def create_completion(self, messages, **params):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            if self.delay is None:
+                await asyncio.Event().wait()
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.running -= 1
+        message = types.SimpleNamespace(content=f"answer to {messages[-1]['content'][-20:]}")
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeRequest:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def execute(self):
+        return types.SimpleNamespace(data=self.rows)
+
+
+class FakeAsyncSupabase:
+    def __init__(self):
+        self.closed = False
+        self.postgrest = types.SimpleNamespace(aclose=self.aclose)
+
+    def rpc(self, name, params):
+        return FakeRequest([dict(doc, bucket="semantic_search", similarity=0.9) for doc in DOCS])
+
+    async def aclose(self):
+        self.closed = True
+
+
+def make_system(tmp_path, max_concurrent=3, delay=0.01):
+    system = AsyncQuerySystem(FakeAsyncOpenAI(delay), FakeAsyncSupabase(), max_concurrent)
+    system.query_cache = QueryEmbeddingCache()
+    system.answer_cache = SemanticAnswerCache(version_path=str(tmp_path / "corpus_version"))
+    return system
+
+
+def test_concurrent_questions_are_capped_by_the_semaphore(tmp_path):
+    async def run():
+        system = make_system(tmp_path, max_concurrent=3)
+        results = await system.answer_many([f"Fråga {i}" for i in range(12)])
+        return system, results
+
+    system, results = asyncio.run(run())
+    assert all(result["answer"] for result in results)
+    assert system.client.max_running == 3
+
+
+def test_timed_out_question_cancels_its_request_and_frees_its_slot(tmp_path):
+    async def run():
+        system = make_system(tmp_path, max_concurrent=2, delay=None)
+        results = await system.answer_many(["Vad kostar det?", "Hur når jag support?"], timeout=0.05)
+        # Both slots are free again, so the next question runs at once
+        system.client.delay = 0
+        answer = await asyncio.wait_for(system.answer("Vilka tjänster finns?"), 1)
+        return system, results, answer
+
+    system, results, answer = asyncio.run(run())
+    assert all(isinstance(result, asyncio.TimeoutError) for result in results)
+    assert system.client.cancelled == 2
+    assert system.client.running == 0
+    assert answer["answer"]
+    # A cancelled answer is never cached
+    assert system.answer_cache.stats()["entries"] == 1
+
+
+def test_close_closes_both_clients(tmp_path):
+    system = make_system(tmp_path)
+    asyncio.run(system.close())
+    assert system.client.closed
+    assert system.supabase.closed
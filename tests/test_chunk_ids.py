@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+
+from chunk_ids import chunk_id, id_for_chunk
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHUNK = {"source": "faq", "chunk_type": "pricing", "content": "Startavgift 8 995 kr"}
+
+
+def test_chunk_id_is_pinned():
+    # Changing the namespace or the key layout would re-key every stored row
+    assert chunk_id("faq", "pricing", "Startavgift 8 995 kr") == "855b8b37-4848-5049-a089-0349360aa007"
+
+
+def test_chunk_id_depends_on_every_part():
+    ids = {
+        chunk_id("faq", "pricing", "Startavgift 8 995 kr"),
+        chunk_id("faq2", "pricing", "Startavgift 8 995 kr"),
+        chunk_id("faq", "key_fact", "Startavgift 8 995 kr"),
+        chunk_id("faq", "pricing", "Startavgift 9 995 kr"),
+        # The separator keeps shifted boundaries apart
+        chunk_id("faqp", "ricing", "Startavgift 8 995 kr"),
+    }
+    assert len(ids) == 5
+
+
+def test_missing_source_and_type_are_stable():
+    assert chunk_id(None, None, "text") == chunk_id("", "", "text")
+
+
+def test_id_for_chunk_keeps_an_existing_id():
+    assert id_for_chunk(CHUNK) == chunk_id("faq", "pricing", "Startavgift 8 995 kr")
+    assert id_for_chunk(dict(CHUNK, id="row-1")) == "row-1"
+
+
+def test_chunk_id_is_stable_across_processes():
+    code = "from chunk_ids import chunk_id; print(chunk_id('faq', 'pricing', 'Startavgift 8 995 kr'))"
+    for seed in ("0", "1", "random"):
+        env = dict(os.environ, PYTHONHASHSEED=seed)
+        output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        assert output.strip() == "855b8b37-4848-5049-a089-0349360aa007"
@@ -0,0 +1,97 @@
+import os
+from concurrent.futures import Future
+
+import pytest
+
+import document_extractors
+from document_extractors import InlineExecutor, get_extraction_pool, iter_document_pages, shutdown_extraction_pool
+
+
+def make_pdf(page_count):
+    """A minimal PDF with one line of text per page"""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for number in range(1, page_count + 1):
+        stream = f"BT /F1 12 Tf 72 720 Td (Page {number} text) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {page_count} >>"
+
+    output = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    output += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    return output
+
+
+class RecordingExecutor(InlineExecutor):
+    """Runs tasks inline and records their arguments"""
+
+    def __init__(self):
+        self.calls = []
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        self.calls.append(args)
+        return super().submit(fn, *args, **kwargs)
+
+
+def test_pages_come_back_in_order(tmp_path):
+    path = tmp_path / "report.pdf"
+    path.write_bytes(make_pdf(20))
+    pages = list(iter_document_pages(str(path), pool=InlineExecutor()))
+    assert [number for number, _ in pages] == list(range(1, 21))
+    assert all(f"Page {number} text" in text for number, text in pages)
+
+
+def test_uploads_are_passed_to_workers_by_path(monkeypatch):
+    monkeypatch.setattr(document_extractors, "PDF_PAGES_PER_TASK", 1)
+    monkeypatch.setattr(document_extractors, "PDF_TASKS_IN_FLIGHT", 2)
+    executor = RecordingExecutor()
+    pages = iter_document_pages("upload.pdf", make_pdf(6), pool=executor)
+
+    consumed = 0
+    for _ in pages:
+        consumed += 1
+        # At most the in-flight window is queued beyond what has been consumed
+        assert len(executor.calls) <= consumed + 2
+    assert consumed == 6
+
+    paths = {args[0] for args in executor.calls}
+    assert len(paths) == 1
+    assert all(args[1] is None for args in executor.calls)
+    # The temporary copy of the upload is gone once iteration ends
+    assert not os.path.exists(paths.pop())
+
+
+def test_stopping_early_removes_the_temporary_file(monkeypatch):
+    monkeypatch.setattr(document_extractors, "PDF_PAGES_PER_TASK", 1)
+    executor = RecordingExecutor()
+    pages = iter_document_pages("upload.pdf", make_pdf(5), pool=executor)
+    next(pages)
+    pages.close()
+    assert not os.path.exists(executor.calls[0][0])
+
+
+def test_unsupported_type_is_rejected():
+    with pytest.raises(ValueError):
+        list(iter_document_pages("notes.odt", b"data", pool=InlineExecutor()))
+
+
+def test_shared_pool_parses_in_spawned_workers(tmp_path):
+    path = tmp_path / "report.pdf"
+    path.write_bytes(make_pdf(10))
+    try:
+        pool = get_extraction_pool()
+        assert pool._mp_context.get_start_method() == "spawn"
+        assert [number for number, _ in iter_document_pages(str(path))] == list(range(1, 11))
+    finally:
+        shutdown_extraction_pool()
+    assert document_extractors._extraction_pool is None
@@ -0,0 +1,107 @@
+import types
+
+import pytest
+
+import embedding_batcher
+from embedding_batcher import MAX_INPUT_TOKENS, EmbeddingBatcher
+from embedding_cache import EmbeddingCache
+
+
+class CharacterEncoder:
+    """One token per character, so token budgets are easy to reason about"""
+
+    def encode(self, text, disallowed_special=()):
+        return [ord(c) for c in text]
+
+    def decode(self, tokens):
+        return "".join(chr(t) for t in tokens)
+
+
+def vector_for(text):
+    """Fake embedding that identifies the text it was computed from"""
+    return [float(len(text)), float(sum(map(ord, text)) % 9973)]
+
+
+class FakeEmbeddings:
+    def __init__(self, fail_on=None):
+        self.requests = []
+        self.fail_on = fail_on
+
+    def create(self, input, **params):
+        self.requests.append(list(input))
+        if self.fail_on is not None and self.fail_on in input:
+            raise RuntimeError("batch rejected")
+        data = [types.SimpleNamespace(index=i, embedding=vector_for(text)) for i, text in enumerate(input)]
+        # The API does not promise to return items in input order
+        return types.SimpleNamespace(data=list(reversed(data)))
+
+
+@pytest.fixture(autouse=True)
+def character_encoder(monkeypatch):
+    monkeypatch.setattr(embedding_batcher, "get_encoder", lambda model=None: CharacterEncoder())
+
+
+def make_batcher(fail_on=None, cache=None):
+    embeddings = FakeEmbeddings(fail_on)
+    batcher = EmbeddingBatcher(types.SimpleNamespace(embeddings=embeddings), max_batch_tokens=50,
+                               max_batch_items=3, cache=cache)
+    return batcher, embeddings
+
+
+TEXTS = ["Startavgift 8 995 kr", "", "Support varje dag", "x" * 80, "   ", "Hemsida", "Bokning", "Betalning",
+         "y" * (MAX_INPUT_TOKENS + 100), "Kontakt"]
+
+
+def test_batches_respect_the_token_and_item_budgets():
+    batcher, _ = make_batcher()
+    embeddings, batches = batcher.plan(TEXTS)
+
+    assert embeddings == [None] * len(TEXTS)
+    planned = [position for batch in batches for position in batch["positions"]]
+    # Every non-blank text is planned exactly once, in input order
+    assert planned == [i for i, text in enumerate(TEXTS) if text.strip()]
+    for batch in batches:
+        assert len(batch["positions"]) <= 3
+        assert batch["tokens"] == sum(len(text) for text in batch["texts"])
+        # Only a single over-budget item may exceed the token budget, alone in its batch
+        assert batch["tokens"] <= 50 or len(batch["positions"]) == 1
+    assert [batch["positions"] for batch in batches if batch["tokens"] > 50] == [[3], [8]]
+
+    # Inputs above the model limit are truncated, but the original stays the cache key
+    long_batch = next(batch for batch in batches if batch["positions"] == [8])
+    assert long_batch["texts"] == ["y" * MAX_INPUT_TOKENS]
+    assert long_batch["originals"] == [TEXTS[8]]
+
+
+def test_embeddings_line_up_with_their_inputs():
+    batcher, fake = make_batcher()
+    embeddings = batcher.embed(TEXTS)
+
+    assert len(fake.requests) == batcher.requests_made > 1
+    for text, vector in zip(TEXTS, embeddings):
+        if text.strip():
+            assert vector == vector_for(text[:MAX_INPUT_TOKENS])
+        else:
+            assert vector is None
+
+
+def test_failed_batch_leaves_only_its_own_inputs_empty():
+    batcher, fake = make_batcher(fail_on="Hemsida")
+    embeddings = batcher.embed(TEXTS)
+
+    failed = next(batch for batch in fake.requests if "Hemsida" in batch)
+    for text, vector in zip(TEXTS, embeddings):
+        if text in failed or not text.strip():
+            assert vector is None
+        else:
+            assert vector == vector_for(text[:MAX_INPUT_TOKENS])
+
+
+def test_cached_texts_are_not_sent_again(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite3"))
+    batcher, fake = make_batcher(cache=cache)
+    first = batcher.embed(TEXTS)
+    requests = len(fake.requests)
+
+    assert batcher.embed(TEXTS) == first
+    assert len(fake.requests) == requests
@@ -0,0 +1,100 @@
+import json
+
+import numpy as np
+import pytest
+
+from embedding_store import iter_chunks, load_chunks, load_store, save_store, store_paths
+from local_vector_search import LocalVectorIndex
+
+
+def make_chunks(count=6, dimensions=8, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(count, dimensions)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return [{"content": f"chunk {i}", "source": "test", "embedding": vector.tolist(),
+             "metadata": {"title": f"Åtgärd {i}", "chunk_type": "section", "token_count": i}}
+            for i, vector in enumerate(vectors)]
+
+
+def test_stored_vectors_are_shortened_to_the_configured_size(tmp_path):
+    chunks = make_chunks()
+    base = str(tmp_path / "store")
+    save_store(base, chunks)
+
+    matrix, records = load_chunks(base, dimensions=4)
+    head = np.asarray([chunk["embedding"][:4] for chunk in chunks], dtype=np.float32)
+    assert matrix.shape == (6, 4)
+    assert np.allclose(matrix, head / np.linalg.norm(head, axis=1, keepdims=True), atol=1e-6)
+    assert np.allclose(np.linalg.norm(matrix, axis=1), 1.0, atol=1e-6)
+    assert [record["content"] for record in records] == [chunk["content"] for chunk in chunks]
+
+    assert all(len(chunk["embedding"]) == 4 for chunk in iter_chunks(base, dimensions=4))
+    assert LocalVectorIndex.load(base, dimensions=4).dimensions == 4
+
+
+def test_matching_size_is_loaded_unchanged(tmp_path):
+    base = str(tmp_path / "store")
+    save_store(base, make_chunks())
+    full, _ = load_chunks(base)
+    same, _ = load_chunks(base, dimensions=8)
+    assert np.array_equal(full, same)
+
+
+def test_shorter_stored_vectors_are_refused(tmp_path):
+    base = str(tmp_path / "store")
+    save_store(base, make_chunks(dimensions=4))
+    with pytest.raises(ValueError, match="re-embed"):
+        load_chunks(base, dimensions=8)
+
+
+@pytest.mark.parametrize("dtype,atol", [("float32", 0), ("float16", 1e-3)])
+def test_store_round_trips_embeddings_and_records(tmp_path, dtype, atol):
+    chunks = make_chunks()
+    matrix_path, records_path = save_store(str(tmp_path / "store"), chunks, dtype)
+    assert (matrix_path, records_path) == store_paths(str(tmp_path / "store.jsonl"))
+
+    matrix, records = load_store(matrix_path)
+    assert isinstance(matrix, np.memmap)
+    assert matrix.dtype == np.dtype(dtype)
+    assert not matrix.flags.writeable
+    assert np.allclose(matrix, [chunk["embedding"] for chunk in chunks], atol=atol, rtol=0)
+    # Records come back without the embedding and with non-ASCII text intact
+    assert records == [{key: value for key, value in chunk.items() if key != "embedding"} for chunk in chunks]
+    assert "Åtgärd" in open(records_path, encoding="utf-8").read()
+
+    for chunk, loaded in zip(chunks, iter_chunks(records_path)):
+        assert loaded.keys() == chunk.keys()
+        assert np.allclose(loaded["embedding"], chunk["embedding"], atol=atol, rtol=0)
+        assert all(type(value) is float for value in loaded["embedding"])
+    assert not any(path.suffix == ".tmp" for path in tmp_path.iterdir())
+
+
+def test_unknown_dtype_is_refused(tmp_path):
+    with pytest.raises(ValueError, match="dtype"):
+        save_store(str(tmp_path / "store"), make_chunks(), "float64")
+
+
+def test_mismatched_files_are_refused(tmp_path):
+    base = str(tmp_path / "store")
+    save_store(base, make_chunks())
+    with open(base + ".jsonl", "a", encoding="utf-8") as f:
+        f.write(json.dumps({"content": "extra"}) + "\n")
+    with pytest.raises(ValueError, match="7 records"):
+        load_store(base)
+
+
+def test_legacy_json_is_loaded_when_there_is_no_binary_store(tmp_path):
+    chunks = make_chunks()
+    with open(tmp_path / "store.json", "w", encoding="utf-8") as f:
+        json.dump(chunks, f)
+
+    matrix, records = load_chunks(str(tmp_path / "store"))
+    assert matrix.dtype == np.float32
+    assert np.allclose(matrix, [chunk["embedding"] for chunk in chunks])
+    assert [record["metadata"] for record in records] == [chunk["metadata"] for chunk in chunks]
+
+    # Once converted, the binary store is preferred over the JSON file
+    save_store(str(tmp_path / "store"), make_chunks(seed=1))
+    converted, _ = load_chunks(str(tmp_path / "store"))
+    assert not np.allclose(converted, matrix)
+    assert np.array_equal(load_chunks(str(tmp_path / "store.json"))[0], matrix)
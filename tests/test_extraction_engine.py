@@ -0,0 +1,171 @@
+import glob
+import os
+import random
+import re
+
+import pytest
+
+from extraction_engine import scan_text, split_sections
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TXT_GLOB = os.path.join(ROOT, "Embedded_Rag_Vectorstore_Supabase", "Txt File", "*.txt")
+
+
+# The extractors as they were before the engine, copied verbatim as the reference output
+def baseline_split_by_bullets(text):
+    bullet_patterns = [
+        r'[•\-\*]\s+',  # Bullet points
+        r'✅\s+',       # Checkmarks
+        r'🌐\s+',       # Emojis as bullets
+        r'📱\s+',
+        r'📅\s+',
+        r'🛒\s+',
+        r'✔\s+',
+    ]
+
+    sections = []
+    for pattern in bullet_patterns:
+        parts = re.split(pattern, text)
+        if len(parts) > 1:
+            for part in parts[1:]:  # Skip first empty part
+                if len(part.strip()) > 20:
+                    sections.append(part.strip())
+
+    return sections
+
+
+def baseline_extract_key_facts(text):
+    facts = []
+    emoji_pattern = r'[🌐📱📅🛒✅✔🎯🌍💡🛠📊⚙️💬📍❓]\s*([^\n]+)'
+    facts.extend(re.findall(emoji_pattern, text))
+    bullet_pattern = r'[-•*]\s*([^\n]+)'
+    facts.extend(re.findall(bullet_pattern, text))
+    quote_pattern = r'"([^"]+)"'
+    facts.extend(re.findall(quote_pattern, text))
+    return [fact.strip() for fact in facts if len(fact.strip()) > 10]
+
+
+def baseline_extract_pricing_info(text):
+    pricing = []
+    price_patterns = [
+        r'(\d+\s*\d*\s*kr[^\n]*)',
+        r'(Startavgift[^\n]*)',
+        r'(Månadsavgift[^\n]*)',
+        r'(\d+\s*995[^\n]*)',
+    ]
+    for pattern in price_patterns:
+        pricing.extend(re.findall(pattern, text, re.IGNORECASE))
+    return [price.strip() for price in pricing if len(price.strip()) > 5]
+
+
+def baseline_extract_contact_info(text):
+    contact = []
+    emails = re.findall(r'([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})', text)
+    contact.extend([f"Email: {email}" for email in emails])
+    phones = re.findall(r'(\+\d{2}\s*\d{3}\s*\d{3}\s*\d{3})', text)
+    contact.extend([f"Phone: {phone}" for phone in phones])
+    websites = re.findall(r'(www\.[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})', text)
+    contact.extend([f"Website: {website}" for website in websites])
+    return contact
+
+
+def baseline_key_information(text):
+    # extract_key_information without its pricing entry, which indexed into the
+    # findall strings: it kept only the first digit of every amount and raised
+    # IndexError on prices written with a currency symbol
+    info = {}
+    emails = re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', text)
+    if emails:
+        info['contact_emails'] = 'Email addresses found: ' + ', '.join(emails)
+    phones = re.findall(r'[\+]?[1-9]?[0-9]{7,15}', text)
+    if phones:
+        info['contact_phones'] = 'Phone numbers found: ' + ', '.join(phones)
+    urls = re.findall(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', text)
+    if urls:
+        info['urls'] = 'URLs found: ' + ', '.join(urls)
+    numbered_items = re.findall(r'\d+\.\s+([^\n]+)', text)
+    if numbered_items:
+        info['numbered_lists'] = 'Key points: ' + '; '.join(numbered_items[:5])
+    bullet_items = re.findall(r'[•\-\*]\s+([^\n]+)', text)
+    if bullet_items:
+        info['bullet_points'] = 'Important items: ' + '; '.join(bullet_items[:5])
+    return info
+
+
+# Inputs the knowledge base does not cover: matches across lines, emails that share
+# a run of characters, bullets inside words and variation selectors after emoji
+EDGE_CASES = [
+    "Pris: 12\nkr per månad - \n- E-handel – Extra Info\nMobilappar: 8 995 kr",
+    "a@b.se.c@d.se, info@axiestudio.se.\n.x@y.com och\n\"citat över\nflera rader\"",
+    "✔️ Bokning\n✅  Betalning ingår i paketet\n⚙️ Drift och underhåll dygnet runt\n🌐\nWebb",
+    "STARTAVGIFT 0 kr\nMånadsavgift: 995 KR\n1995kr\n+46 735 132 620 eller 0735132620",
+    "Läs mer på https://axiestudio.se/priser och www.axiestudio.se",
+]
+
+
+def knowledge_base_texts():
+    from improved_chunk_processor import ComprehensiveChunkProcessor
+    processor = ComprehensiveChunkProcessor.__new__(ComprehensiveChunkProcessor)
+    texts = []
+    for path in sorted(glob.glob(TXT_GLOB)):
+        text = open(path, encoding="utf-8").read()
+        texts.append(text)
+        texts.extend(processor.split_into_sections(text))
+    return texts
+
+
+def random_texts(count=2000, seed=0):
+    # Short strings built from the characters and words the patterns care about
+    pieces = list("ab.-_@ \n\t\"*•+$€0123456789kKrR") + [
+        "kr", "www.", "http://", "995", "✅", "✔", "⚙️", "🌐", "Startavgift", "månadsavgift", "ı", "é", "se"]
+    rng = random.Random(seed)
+    return ["".join(rng.choice(pieces) for _ in range(rng.randint(0, 40))) for _ in range(count)]
+
+
+@pytest.fixture(scope="module")
+def texts():
+    texts = knowledge_base_texts()
+    assert len(texts) > 8
+    return texts + EDGE_CASES + random_texts()
+
+
+@pytest.fixture(scope="module")
+def processor():
+    from improved_chunk_processor import ComprehensiveChunkProcessor
+    return ComprehensiveChunkProcessor.__new__(ComprehensiveChunkProcessor)
+
+
+def test_split_sections_matches_the_baseline(texts):
+    for text in texts:
+        assert split_sections(text, min_length=20) == baseline_split_by_bullets(text)
+
+
+def test_chunk_extractors_match_the_baseline(texts, processor):
+    for text in texts:
+        assert processor.extract_key_facts(text) == baseline_extract_key_facts(text)
+        assert processor.extract_pricing_info(text) == baseline_extract_pricing_info(text)
+        assert processor.extract_contact_info(text) == baseline_extract_contact_info(text)
+
+
+def test_shared_scan_gives_the_same_chunks(texts, processor):
+    # create_multiple_chunk_types passes one scan to every extractor
+    found = scan_text(texts[0])
+    assert processor.extract_key_facts(texts[0], found) == baseline_extract_key_facts(texts[0])
+    assert processor.extract_pricing_info(texts[0], found) == baseline_extract_pricing_info(texts[0])
+    assert processor.extract_contact_info(texts[0], found) == baseline_extract_contact_info(texts[0])
+
+
+def test_key_information_matches_the_baseline(texts):
+    from file_chunker import FileChunker
+    chunker = FileChunker.__new__(FileChunker)
+    for text in texts:
+        info = chunker.extract_key_information(text)
+        info.pop('pricing', None)
+        assert info == baseline_key_information(text)
+
+
+def test_key_information_reports_whole_prices():
+    from file_chunker import FileChunker
+    chunker = FileChunker.__new__(FileChunker)
+    info = chunker.extract_key_information("Startavgift 8 995 kr, hosting $100 eller €12,50")
+    assert info['pricing'] == 'Pricing information: 995, $100, €12,50'
@@ -0,0 +1,70 @@
+import http.client
+import json
+import os
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import web_server
+
+BOUNDARY = "----rag-test-boundary"
+
+
+@pytest.fixture
+def saved(monkeypatch):
+    """Record the files each upload hands to the processor"""
+    uploads = []
+
+    def process(directory):
+        uploads.append({name: open(os.path.join(directory, name), "rb").read()
+                        for name in sorted(os.listdir(directory))})
+        return {"success": True, "directory": directory}
+
+    monkeypatch.setattr(web_server, "process_files_from_directory", process)
+    return uploads
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), web_server.FileUploadHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def upload(server, files):
+    parts = []
+    for i, (filename, content) in enumerate(files):
+        parts.append(f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file_{i}"; '
+                     f'filename="{filename}"\r\nContent-Type: application/octet-stream\r\n\r\n'.encode() + content + b"\r\n")
+    body = b"".join(parts) + f"--{BOUNDARY}--\r\n".encode()
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=10)
+    connection.request("POST", "/process-files", body,
+                       {"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"})
+    response = connection.getresponse()
+    result = json.loads(response.read())
+    connection.close()
+    return result
+
+
+def test_uploads_are_saved_under_their_base_name(server, saved, tmp_path):
+    content = os.urandom(256 * 1024)
+    result = upload(server, [("../../escaped.txt", b"outside"), ("..\\..\\windows.txt", b"win"),
+                             ("paket.pdf", content)])
+
+    assert result["success"]
+    assert saved == [{"escaped.txt": b"outside", "paket.pdf": content, "windows.txt": b"win"}]
+    temp_root = os.path.dirname(result["directory"])
+    assert not os.path.exists(os.path.join(temp_root, "escaped.txt"))
+    # The upload directory is removed once the files are processed
+    assert not os.path.exists(result["directory"])
+
+
+def test_names_without_a_file_part_are_skipped(server, saved):
+    result = upload(server, [("..", b"nothing"), ("../", b"nothing")])
+
+    assert result == {"success": False, "message": "No files were uploaded"}
+    assert saved == []
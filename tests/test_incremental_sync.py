@@ -0,0 +1,179 @@
+import functools
+import hashlib
+import os
+import shutil
+import types
+
+import pytest
+
+import embedding_batcher
+import improved_chunk_processor
+import token_chunker
+from chunk_dedup import ChunkDeduplicator
+from embedding_batcher import EmbeddingBatcher
+from embedding_cache import EmbeddingCache
+from improved_chunk_processor import ComprehensiveChunkProcessor
+from ingestion_manifest import IngestionManifest
+from ingestion_pipeline import IngestionPipeline
+from supabase_writer import SupabaseBulkWriter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TXT_FOLDER = os.path.join(ROOT, "Embedded_Rag_Vectorstore_Supabase", "Txt File")
+
+
+class CharacterEncoder:
+    """One token per character, so chunking runs without downloading a tiktoken vocabulary"""
+
+    def encode(self, text, disallowed_special=()):
+        return [ord(c) for c in text]
+
+    def decode(self, tokens):
+        return "".join(chr(t) for t in tokens)
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.inputs = []
+
+    def create(self, input, **params):
+        self.inputs.extend(input)
+        data = []
+        for index, text in enumerate(input):
+            digest = hashlib.sha256(text.encode("utf-8")).digest()
+            data.append(types.SimpleNamespace(index=index, embedding=[b / 255 for b in digest[:8]]))
+        return types.SimpleNamespace(data=data)
+
+
+class FakeQuery:
+    def __init__(self, rows, action, payload=None):
+        self.rows = rows
+        self.action = action
+        self.payload = payload
+        self.ids = None
+
+    def in_(self, column, ids):
+        self.ids = ids
+        return self
+
+    def neq(self, column, value):
+        return self
+
+    def execute(self):
+        if self.action == "upsert":
+            for row in self.payload:
+                self.rows[row["id"]] = row
+        elif self.ids is not None:
+            for row_id in self.ids:
+                self.rows.pop(row_id, None)
+        else:
+            self.rows.clear()
+        return types.SimpleNamespace(data=[], error=None)
+
+
+class FakeTable:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def upsert(self, rows, on_conflict=None):
+        return FakeQuery(self.rows, "upsert", rows)
+
+    def delete(self):
+        return FakeQuery(self.rows, "delete")
+
+
+class FakeSupabase:
+    """The documents table as a dict of rows by id"""
+
+    def __init__(self):
+        self.rows = {}
+
+    def table(self, name):
+        return FakeTable(self.rows)
+
+
+@pytest.fixture
+def make_processor(tmp_path, monkeypatch):
+    monkeypatch.setattr(token_chunker, "get_encoder", lambda model=None: CharacterEncoder())
+    monkeypatch.setattr(embedding_batcher, "get_encoder", lambda model=None: CharacterEncoder())
+
+    def make(folder, manifest_path):
+        database = FakeSupabase()
+        embeddings = FakeEmbeddings()
+        monkeypatch.setattr(improved_chunk_processor, "supabase", database)
+        monkeypatch.setattr(improved_chunk_processor, "IngestionManifest",
+                            functools.partial(IngestionManifest, manifest_path))
+        processor = ComprehensiveChunkProcessor.__new__(ComprehensiveChunkProcessor)
+        processor.txt_folder = folder
+        processor.chunks = []
+        processor.embedder = EmbeddingBatcher(types.SimpleNamespace(embeddings=embeddings))
+        processor.writer = SupabaseBulkWriter(database)
+        processor.pipeline = IngestionPipeline(processor.embedder, processor.writer)
+        processor.deduplicator = ChunkDeduplicator()
+        processor.chunker = token_chunker.TokenChunker()
+        return processor, database, embeddings
+
+    return make
+
+
+def fresh_table(make_processor, folder, tmp_path):
+    """Rows a full ingestion of folder produces, for comparison with incremental runs"""
+    processor, database, _ = make_processor(folder, str(tmp_path / "fresh" / "manifest.json"))
+    processor.sync_to_supabase()
+    return {row_id: (row["content"], row["embedding"]) for row_id, row in database.rows.items()}
+
+
+def test_incremental_sync_converges_to_a_full_rebuild(make_processor, tmp_path):
+    folder = str(tmp_path / "Txt File")
+    shutil.copytree(TXT_FOLDER, folder)
+    manifest_path = str(tmp_path / "manifest.json")
+    processor, database, embeddings = make_processor(folder, manifest_path)
+
+    processor.sync_to_supabase()
+    first_rows = dict(database.rows)
+    first_requests = len(embeddings.inputs)
+    assert first_rows and first_requests
+
+    # Nothing changed: no embeddings, no writes, no deletes
+    processor.sync_to_supabase()
+    assert len(embeddings.inputs) == first_requests
+    assert database.rows == first_rows
+
+    # Edit one line and remove a file
+    names = sorted(os.listdir(folder))
+    edited = os.path.join(folder, names[0])
+    with open(edited, encoding="utf-8") as f:
+        lines = f.read().split("\n")
+    line = next(i for i, text in enumerate(lines) if len(text.strip()) > 30)
+    lines[line] = lines[line] + " Uppdaterad rad."
+    with open(edited, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+    os.remove(os.path.join(folder, names[-1]))
+
+    processor.sync_to_supabase()
+    # Only chunks touching the edited line are embedded again
+    assert 0 < len(embeddings.inputs) - first_requests < len(first_rows) / 4
+
+    rows = {row_id: (row["content"], row["embedding"]) for row_id, row in database.rows.items()}
+    assert rows == fresh_table(make_processor, folder, tmp_path)
+    removed_source = processor.get_source_name(names[-1])
+    assert any(row["source"] == removed_source for row in first_rows.values())
+    assert not any(row["source"] == removed_source for row in database.rows.values())
+
+
+def test_sync_and_full_rebuild_store_the_same_rows(make_processor, tmp_path):
+    folder = str(tmp_path / "Txt File")
+    shutil.copytree(TXT_FOLDER, folder)
+    # A near-copy of another file: its chunks are duplicates only across files
+    names = sorted(os.listdir(folder))
+    with open(os.path.join(folder, names[-1]), encoding="utf-8") as f:
+        content = f.read()
+    with open(os.path.join(folder, "99_Kontakt_kopia.txt"), "w", encoding="utf-8") as f:
+        f.write(content + "\nUppdaterad kopia.")
+    synced = fresh_table(make_processor, folder, tmp_path)
+
+    processor, database, _ = make_processor(folder, str(tmp_path / "full" / "manifest.json"))
+    processor.embedder.cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite3"))
+    processor.upload_to_supabase(processor.process_all_files())
+    rebuilt = {row_id: (row["content"], row["embedding"]) for row_id, row in database.rows.items()}
+
+    assert rebuilt == synced
@@ -0,0 +1,69 @@
+from ingestion_manifest import IngestionManifest, chunk_hash, file_hash
+
+
+def make_chunk(content, chunk_type="section"):
+    return {"content": content, "source": "faq", "title": "FAQ", "chunk_type": chunk_type, "metadata": {}}
+
+
+def record(manifest, path, chunks):
+    """Store chunks as ingested, using each chunk's hash as a stand-in row id"""
+    manifest.record_file(path, file_hash(path), {chunk_hash(chunk): "row-" + chunk["content"] for chunk in chunks})
+
+
+def test_chunk_hash_ignores_id_and_embedding():
+    chunk = make_chunk("Startavgift 8 995 kr")
+    assert chunk_hash(dict(chunk, id="x", embedding=[0.1])) == chunk_hash(chunk)
+    assert chunk_hash(dict(chunk, title="Other")) != chunk_hash(chunk)
+
+
+def test_diff_of_an_unknown_file_is_all_new(tmp_path):
+    manifest = IngestionManifest(str(tmp_path / "manifest.json"))
+    chunks = [make_chunk("a"), make_chunk("b"), make_chunk("a")]
+    new_chunks, kept, removed_ids = manifest.diff_chunks("faq.txt", chunks)
+    assert list(new_chunks.values()) == [make_chunk("a"), make_chunk("b")]
+    assert kept == {}
+    assert removed_ids == []
+
+
+def test_diff_splits_new_kept_and_removed(tmp_path):
+    manifest = IngestionManifest(str(tmp_path / "manifest.json"))
+    record(manifest, "faq.txt", [make_chunk("a"), make_chunk("b"), make_chunk("c")])
+
+    new_chunks, kept, removed_ids = manifest.diff_chunks("faq.txt", [make_chunk("a"), make_chunk("c"), make_chunk("d")])
+    assert list(new_chunks.values()) == [make_chunk("d")]
+    assert sorted(kept.values()) == ["row-a", "row-c"]
+    assert removed_ids == ["row-b"]
+
+
+def test_unchanged_file_is_detected(tmp_path):
+    manifest = IngestionManifest(str(tmp_path / "manifest.json"))
+    record(manifest, "faq.txt", [make_chunk("a")])
+    assert manifest.is_unchanged("faq.txt", file_hash("faq.txt"))
+    assert not manifest.is_unchanged("faq.txt", file_hash("edited"))
+    assert not manifest.is_unchanged("other.txt", file_hash("faq.txt"))
+
+
+def test_missing_files_return_their_rows_for_deletion(tmp_path):
+    manifest = IngestionManifest(str(tmp_path / "manifest.json"))
+    record(manifest, "faq.txt", [make_chunk("a")])
+    record(manifest, "old.txt", [make_chunk("x"), make_chunk("y")])
+
+    assert sorted(manifest.forget_missing_files(["faq.txt"])) == ["row-x", "row-y"]
+    assert list(manifest.files) == ["faq.txt"]
+    assert manifest.forget_missing_files(["faq.txt"]) == []
+
+
+def test_save_load_and_clear(tmp_path):
+    path = str(tmp_path / "cache" / "manifest.json")
+    manifest = IngestionManifest(path)
+    assert not manifest.exists
+    record(manifest, "faq.txt", [make_chunk("a")])
+    manifest.save()
+
+    loaded = IngestionManifest(path)
+    assert loaded.exists
+    assert loaded.files == manifest.files
+
+    loaded.clear()
+    assert not loaded.exists
+    assert IngestionManifest(path).files == {}
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from embedding_store import save_store
+from local_vector_search import LocalVectorIndex
+
+TOP_K = 10
+
+
+def brute_force(vectors, queries, metric):
+    """Rank every row with plain float64 NumPy, one query at a time"""
+    vectors = np.asarray(vectors, dtype=np.float64)
+    results = []
+    for query in np.asarray(queries, dtype=np.float64):
+        scores = vectors @ query
+        if metric == "cosine":
+            norms = np.linalg.norm(vectors, axis=1)
+            norms[norms == 0] = 1.0
+            scores = scores / norms / (np.linalg.norm(query) or 1.0)
+        results.append(scores)
+    return np.asarray(results)
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    # Unnormalised rows, so cosine and inner product rank differently
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((2000, 32)).astype(np.float32) * rng.uniform(0.5, 2.0, (2000, 1)).astype(np.float32)
+    vectors[7] = 0.0
+    records = [{"id": i, "content": f"chunk {i}"} for i in range(len(vectors))]
+    queries = rng.standard_normal((50, 32)).astype(np.float32)
+    return vectors, records, queries
+
+
+@pytest.mark.parametrize("metric", ["cosine", "inner_product"])
+def test_top_k_matches_brute_force(corpus, metric):
+    vectors, records, queries = corpus
+    index = LocalVectorIndex(vectors, records)
+    expected = brute_force(vectors, queries, metric)
+
+    results = index.search_batch(queries, top_k=TOP_K, metric=metric)
+    for query, result, scores in zip(queries, results, expected):
+        ids = [item["id"] for item in result]
+        assert ids == list(np.argsort(-scores, kind="stable")[:TOP_K])
+        assert np.allclose([item["score"] for item in result], scores[ids], atol=1e-5)
+        # A single query gives the same ranking as the batch
+        assert [item["id"] for item in index.search(query, TOP_K, metric)] == ids
+
+
+def test_cosine_ranking_ignores_vector_length(corpus):
+    vectors, records, queries = corpus
+    scaled = LocalVectorIndex(vectors * np.arange(1, len(vectors) + 1, dtype=np.float32)[:, None], records)
+    plain = LocalVectorIndex(vectors, records)
+    assert [r["id"] for r in scaled.search(queries[0], TOP_K)] == [r["id"] for r in plain.search(queries[0], TOP_K)]
+
+
+def test_top_k_larger_than_the_index_returns_everything_ranked():
+    index = LocalVectorIndex([[1.0, 0.0], [0.6, 0.8], [0.0, 1.0]], [{"id": i} for i in range(3)])
+    assert [r["id"] for r in index.search([1.0, 0.2], top_k=10)] == [0, 1, 2]
+    assert index.search([1.0, 0.0], top_k=0) == []
+
+
+def test_bad_queries_are_refused(corpus):
+    vectors, records, _ = corpus
+    index = LocalVectorIndex(vectors, records)
+    with pytest.raises(ValueError, match="dimensions"):
+        index.search([1.0, 0.0], TOP_K)
+    with pytest.raises(ValueError, match="metric"):
+        index.search(vectors[0], TOP_K, metric="euclidean")
+
+
+def test_loaded_store_searches_like_the_source_vectors(tmp_path, corpus):
+    vectors, records, queries = corpus
+    save_store(str(tmp_path / "store"), [dict(record, embedding=vector) for record, vector in zip(records, vectors)])
+    index = LocalVectorIndex.load(str(tmp_path / "store"), dimensions=vectors.shape[1])
+
+    expected = brute_force(vectors, queries, "cosine")
+    for result, scores in zip(index.search_batch(queries, TOP_K), expected):
+        assert [item["id"] for item in result] == list(np.argsort(-scores, kind="stable")[:TOP_K])
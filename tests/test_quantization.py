@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from quantization import ProductQuantizer, QuantizedIndex, ScalarQuantizer
+
+TOP_K = 10
+
+
+def synthetic_corpus(count=5000, dimensions=64, clusters=50, seed=0):
+    """Unit vectors scattered around random topic centres, like real embedding corpora"""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dimensions)).astype(np.float32)
+    labels = rng.integers(0, clusters, count)
+    vectors = centres[labels] + 1.5 * rng.standard_normal((count, dimensions)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def recall_at_k(approximate, exact):
+    hits = sum(len(set(a) & set(e)) for a, e in zip(approximate, exact))
+    return hits / exact.size
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    vectors = synthetic_corpus()
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), 100, replace=False)]
+    queries = queries + 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+    units = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    exact = np.argsort(-(units @ vectors.T), axis=1)[:, :TOP_K]
+    return vectors, queries, exact
+
+
+@pytest.fixture(scope="module")
+def indexes(corpus):
+    return {method: QuantizedIndex(corpus[0], method) for method in ("int8", "pq")}
+
+
+def search_all(index, queries, rescore_factor):
+    return np.array([index.search(query, TOP_K, rescore_factor)[0] for query in queries])
+
+
+@pytest.mark.parametrize("method, smaller, rescored_recall, raw_recall", [
+    ("int8", 4, 0.99, 0.95),
+    ("pq", 16, 0.95, 0.5),
+])
+def test_memory_and_recall(corpus, indexes, method, smaller, rescored_recall, raw_recall):
+    vectors, queries, exact = corpus
+    index = indexes[method]
+    assert vectors.nbytes / index.nbytes == smaller
+    assert recall_at_k(search_all(index, queries, 10), exact) >= rescored_recall
+    assert recall_at_k(search_all(index, queries, None), exact) >= raw_recall
+
+
+@pytest.mark.parametrize("method", ["int8", "pq"])
+def test_rescored_scores_are_exact(corpus, indexes, method):
+    vectors, queries, _ = corpus
+    query = queries[0] / np.linalg.norm(queries[0])
+    ids, scores = indexes[method].search(queries[0], TOP_K)
+    assert np.allclose(scores, vectors[ids] @ query, atol=1e-5)
+    assert np.all(np.diff(scores) <= 0)
+
+
+def test_scalar_codes_round_trip_within_one_step(corpus):
+    vectors = corpus[0]
+    quantizer = ScalarQuantizer()
+    quantizer.train(vectors)
+    codes = quantizer.encode(vectors)
+    assert codes.dtype == np.int8
+    assert np.all(np.abs(quantizer.decode(codes) - vectors) <= quantizer.scale / 2 + 1e-6)
+
+
+def test_product_codes_are_one_byte_per_subspace(corpus):
+    vectors = corpus[0][:1000]
+    quantizer = ProductQuantizer()
+    quantizer.train(vectors)
+    codes = quantizer.encode(vectors)
+    assert codes.shape == (vectors.shape[1] // 4, len(vectors))
+    assert codes.dtype == np.uint8
+    # Table scores equal inner products with the decoded vectors
+    query = vectors[0]
+    assert np.allclose(quantizer.scores(codes, query), quantizer.decode(codes) @ query, atol=1e-4)
+
+
+def test_search_without_full_vectors_uses_the_codes(corpus):
+    vectors, queries, exact = corpus
+    index = QuantizedIndex(vectors, "int8", keep_full_precision=False)
+    ids, _ = index.search(queries[0], TOP_K)
+    assert len(ids) == TOP_K
+    assert len(set(ids) & set(exact[0])) >= 8
+
+
+def test_top_k_larger_than_the_corpus(corpus):
+    index = QuantizedIndex(corpus[0][:3], "int8")
+    ids, scores = index.search(corpus[1][0], top_k=5)
+    assert sorted(ids.tolist()) == [0, 1, 2]
+    assert len(scores) == 3
+
+
+def test_unknown_method_is_rejected(corpus):
+    with pytest.raises(ValueError):
+        QuantizedIndex(corpus[0][:10], "binary")
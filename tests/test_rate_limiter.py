@@ -0,0 +1,107 @@
+import time
+
+import httpx
+import openai
+import pytest
+
+import ingestion_pipeline
+import rate_limiter
+from ingestion_pipeline import IngestionPipeline
+from rate_limiter import MIN_RATE_SCALE, RateLimiter
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+BATCH = {"positions": [0, 1], "texts": ["Startavgift 8 995 kr", "Support"], "originals": [], "tokens": 30}
+
+
+def rate_limit_error(retry_after=None):
+    headers = {"retry-after": retry_after} if retry_after is not None else {}
+    return openai.RateLimitError("Rate limit reached", response=httpx.Response(429, headers=headers, request=REQUEST),
+                                 body=None)
+
+
+class FakeBatcher:
+    """Raises the queued errors in order, then embeds"""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = []
+
+    def run_batch(self, batch):
+        self.calls.append(time.monotonic())
+        if self.errors:
+            raise self.errors.pop(0)
+        return [[1.0, 0.0] for _ in batch["texts"]]
+
+
+def make_pipeline(errors, max_retries=6):
+    batcher = FakeBatcher(errors)
+    limiter = RateLimiter(rpm=6000, tpm=1000000)
+    return IngestionPipeline(batcher, None, limiter, max_retries=max_retries), batcher, limiter
+
+
+def test_429_pauses_for_retry_after_and_halves_the_rate():
+    pipeline, batcher, limiter = make_pipeline([rate_limit_error("0.2")])
+
+    assert pipeline.embed_with_retry(BATCH) == [[1.0, 0.0], [1.0, 0.0]]
+    assert len(batcher.calls) == 2
+    assert batcher.calls[1] - batcher.calls[0] >= 0.2
+    assert limiter.rate_limited == 1
+    # Halved by the 429, then nudged back up by the successful retry
+    assert limiter.scale == pytest.approx(0.5 * rate_limiter.RATE_INCREASE)
+    assert limiter.requests.per_second == pytest.approx(6000 * limiter.scale / 60)
+    assert limiter.tokens.per_second == pytest.approx(1000000 * limiter.scale / 60)
+
+
+def test_backoff_without_retry_after_grows_exponentially(monkeypatch):
+    monkeypatch.setattr(rate_limiter.random, "random", lambda: 1.0)
+    limiter = RateLimiter(rpm=6000, tpm=1000000)
+
+    pauses = [limiter.on_rate_limited(attempt) for attempt in range(8)]
+    assert pauses == [1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 60.0, 60.0]
+    # Every caller waits out the longest pause
+    assert limiter.paused_until - time.monotonic() == pytest.approx(60.0, abs=1.0)
+    assert limiter.scale == MIN_RATE_SCALE
+
+
+def test_rate_recovers_gradually_up_to_the_configured_limit():
+    limiter = RateLimiter(rpm=6000, tpm=1000000)
+    limiter.on_rate_limited(0, retry_after=0)
+    limiter.on_rate_limited(1, retry_after=0)
+    assert limiter.scale == 0.25
+
+    successes = 0
+    while limiter.scale < 1.0:
+        limiter.on_success()
+        successes += 1
+    assert successes > 20
+    limiter.on_success()
+    assert limiter.scale == 1.0
+    assert limiter.requests.per_second == pytest.approx(100.0)
+
+
+def test_batch_is_given_up_after_max_retries():
+    pipeline, batcher, limiter = make_pipeline([rate_limit_error("0")] * 5, max_retries=2)
+
+    assert pipeline.embed_with_retry(BATCH) is None
+    assert len(batcher.calls) == 3
+    assert limiter.rate_limited == 2
+
+
+def test_transient_errors_are_retried_without_slowing_down(monkeypatch):
+    monkeypatch.setattr(ingestion_pipeline, "backoff_delay", lambda attempt: 0)
+    server_error = openai.InternalServerError("Server error", response=httpx.Response(500, request=REQUEST),
+                                              body=None)
+    pipeline, batcher, limiter = make_pipeline([openai.APIConnectionError(request=REQUEST), server_error])
+
+    assert pipeline.embed_with_retry(BATCH) == [[1.0, 0.0], [1.0, 0.0]]
+    assert len(batcher.calls) == 3
+    assert limiter.rate_limited == 0
+    assert limiter.scale == 1.0
+
+
+def test_client_errors_are_not_retried():
+    bad_request = openai.BadRequestError("Invalid input", response=httpx.Response(400, request=REQUEST), body=None)
+    pipeline, batcher, _ = make_pipeline([bad_request])
+
+    assert pipeline.embed_with_retry(BATCH) is None
+    assert len(batcher.calls) == 1
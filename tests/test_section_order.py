@@ -0,0 +1,41 @@
+import glob
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TXT_GLOB = os.path.join(ROOT, "Embedded_Rag_Vectorstore_Supabase", "Txt File", "*.txt")
+
+# Sections of every knowledge base file, computed without building the clients' processor
+SECTIONS_SCRIPT = f"""
+import glob, json
+from improved_chunk_processor import ComprehensiveChunkProcessor
+processor = ComprehensiveChunkProcessor.__new__(ComprehensiveChunkProcessor)
+paths = sorted(glob.glob({TXT_GLOB!r}))
+print(json.dumps([processor.split_into_sections(open(p, encoding="utf-8").read()) for p in paths]))
+"""
+
+
+def sections_with_hash_seed(seed: str):
+    env = dict(os.environ, PYTHONHASHSEED=seed)
+    output = subprocess.run([sys.executable, "-c", SECTIONS_SCRIPT], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+
+def test_section_order_does_not_depend_on_the_hash_seed():
+    assert glob.glob(TXT_GLOB)
+    first = sections_with_hash_seed("1")
+    assert any(len(sections) > 1 for sections in first)
+    assert sections_with_hash_seed("2") == first
+    assert sections_with_hash_seed("3") == first
+
+
+def test_duplicate_sections_keep_their_first_position():
+    from improved_chunk_processor import ComprehensiveChunkProcessor
+    processor = ComprehensiveChunkProcessor.__new__(ComprehensiveChunkProcessor)
+    text = "1. Paket\n- Hemsida med bokning och betalning\n- Hemsida med bokning och betalning\n- Support via e-post varje dag"
+    sections = processor.split_into_sections(text)
+    assert sections[0] == text
+    assert sections[1:] == ["Hemsida med bokning och betalning", "Support via e-post varje dag"]
@@ -0,0 +1,86 @@
+import types
+
+from supabase_writer import SupabaseBulkWriter
+
+
+class RejectingTable:
+    """Records every request and rejects any batch containing a row marked bad"""
+
+    def __init__(self, requests, stored):
+        self.requests = requests
+        self.stored = stored
+        self.rows = None
+
+    def upsert(self, rows, on_conflict=None):
+        self.rows = rows
+        return self
+
+    def insert(self, rows):
+        self.rows = rows
+        return self
+
+    def execute(self):
+        self.requests.append([row["id"] for row in self.rows])
+        if any(row.get("bad") for row in self.rows):
+            raise RuntimeError("invalid input syntax for type vector")
+        self.stored.extend(row["id"] for row in self.rows)
+        return types.SimpleNamespace(data=self.rows, error=None)
+
+
+class RejectingClient:
+    def __init__(self):
+        self.requests = []
+        self.stored = []
+
+    def table(self, name):
+        return RejectingTable(self.requests, self.stored)
+
+
+def make_rows(count, bad=()):
+    return [{"id": f"row-{i}", "content": str(i), "bad": i in bad} for i in range(count)]
+
+
+def test_rows_are_sent_in_batches():
+    client = RejectingClient()
+    stats = SupabaseBulkWriter(client, batch_size=4).write(make_rows(10))
+    assert [len(batch) for batch in client.requests] == [4, 4, 2]
+    assert stats["successful_uploads"] == 10
+    assert stats["failed_uploads"] == 0
+    assert stats["requests"] == 3
+
+
+def test_rejected_batch_is_bisected_down_to_the_bad_row():
+    client = RejectingClient()
+    writer = SupabaseBulkWriter(client, batch_size=8)
+    stats = writer.write(make_rows(8, bad={5}))
+
+    assert stats["successful_uploads"] == 7
+    assert stats["failed_uploads"] == 1
+    assert [row["id"] for row in writer.failed_rows] == ["row-5"]
+    assert sorted(client.stored) == sorted(f"row-{i}" for i in range(8) if i != 5)
+    # 8 -> 4 + 4 -> 2 + 2 -> 1 + 1: one extra request per halving on the bad row's side
+    assert client.requests == [
+        [f"row-{i}" for i in range(8)],
+        [f"row-{i}" for i in range(4)],
+        [f"row-{i}" for i in range(4, 8)],
+        ["row-4", "row-5"],
+        ["row-4"],
+        ["row-5"],
+        ["row-6", "row-7"],
+    ]
+    assert [ok for _, _, ok in writer.batch_latencies] == [False, True, False, False, True, False, True]
+
+
+def test_several_bad_rows_are_all_isolated():
+    client = RejectingClient()
+    writer = SupabaseBulkWriter(client, batch_size=16)
+    stats = writer.write(make_rows(16, bad={0, 9, 15}))
+    assert stats["successful_uploads"] == 13
+    assert sorted(row["id"] for row in writer.failed_rows) == ["row-0", "row-15", "row-9"]
+
+
+def test_upsert_sends_each_id_once():
+    client = RejectingClient()
+    rows = [{"id": "a", "content": "old"}, {"id": "b", "content": "b"}, {"id": "a", "content": "new"}]
+    SupabaseBulkWriter(client).write(rows)
+    assert client.requests == [["a", "b"]]
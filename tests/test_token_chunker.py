@@ -0,0 +1,113 @@
+import random
+
+import pytest
+
+import token_chunker
+from embedding_batcher import MAX_INPUT_TOKENS
+from file_chunker import FileChunker
+from token_chunker import TokenChunker
+
+
+class CharacterEncoder:
+    """One token per character, so chunk sizes can be checked by length"""
+
+    def encode(self, text, disallowed_special=()):
+        return [ord(c) for c in text]
+
+    def decode(self, tokens):
+        return "".join(chr(t) for t in tokens)
+
+
+@pytest.fixture(autouse=True)
+def character_encoder(monkeypatch):
+    monkeypatch.setattr(token_chunker, "get_encoder", lambda model=None: CharacterEncoder())
+
+
+def make_text(words=600, seed=0):
+    """Paragraphs of sentences made of distinct words, so every overlap is unambiguous"""
+    rng = random.Random(seed)
+    text = ""
+    for i in range(words):
+        text += f"w{i}"
+        roll = rng.random()
+        text += "\n\n" if roll < 0.03 else "\n" if roll < 0.06 else ". " if roll < 0.2 else " "
+    return text
+
+
+def overlaps(chunks):
+    """Number of leading words each chunk repeats from the end of the previous one"""
+    result = []
+    for previous, chunk in zip(chunks, chunks[1:]):
+        previous_words, words = previous.split(), chunk.split()
+        shared = next(k for k in range(min(len(previous_words), len(words)), -1, -1)
+                      if previous_words[len(previous_words) - k:] == words[:k])
+        result.append(shared)
+    return result
+
+
+@pytest.mark.parametrize("chunk_tokens,overlap_tokens", [(64, 16), (100, 0), (256, 32)])
+def test_chunks_stay_under_the_ceiling_and_overlap_by_whole_pieces(chunk_tokens, overlap_tokens):
+    chunker = TokenChunker(chunk_tokens, overlap_tokens)
+    text = make_text()
+    chunks = chunker.split(text)
+
+    assert len(chunks) > 3
+    assert all(0 < chunker.count(chunk) <= chunk_tokens for chunk in chunks)
+
+    shared = overlaps(chunks)
+    for previous, chunk, k in zip(chunks, chunks[1:], shared):
+        # The repeated words fit in the overlap budget
+        assert len(" ".join(chunk.split()[:k])) <= overlap_tokens
+        if overlap_tokens and not k:
+            # Only a chunk with no room left for even one more word starts fresh
+            assert len(previous.split()[-1]) + 1 + len(chunk) > chunk_tokens
+    if overlap_tokens:
+        assert sum(map(bool, shared)) > len(shared) / 2
+    else:
+        assert not any(shared)
+
+    # Dropping the repeated words gives back the text, word for word
+    words = chunks[0].split()
+    for chunk, k in zip(chunks[1:], shared):
+        words.extend(chunk.split()[k:])
+    assert words == text.split()
+
+
+def test_text_without_separators_is_cut_into_token_windows():
+    chunker = TokenChunker(50, 10)
+    chunks = chunker.split("x" * 175)
+
+    # Overlap never starts inside a word, so the windows do not repeat each other
+    assert [len(chunk) for chunk in chunks] == [50, 50, 50, 25]
+
+
+def test_grouped_sentences_do_not_overlap():
+    chunker = TokenChunker(80, 16)
+    sentences = [f"Mening nummer {i} om tjänsten" for i in range(40)]
+    groups = chunker.group(sentences, joiner=". ")
+
+    assert all(chunker.count(group) <= 80 for group in groups)
+    assert ". ".join(groups).split(". ") == sentences
+
+
+def test_fit_keeps_text_whole_up_to_the_model_limit():
+    chunker = TokenChunker()
+    text = make_text(words=1200)
+    assert len(text) <= MAX_INPUT_TOKENS
+    assert chunker.fit(text) == [text]
+
+    long_text = make_text(words=5000)
+    parts = chunker.fit(long_text)
+    assert len(parts) > 1
+    assert all(chunker.count(part) <= MAX_INPUT_TOKENS for part in parts)
+    assert " ".join(parts).split() == long_text.split()
+
+
+def test_file_chunker_sentence_groups_use_the_token_ceiling():
+    chunker = FileChunker.__new__(FileChunker)
+    chunker.chunker = TokenChunker(120, 20)
+    text = ". ".join(f"Paketet innehåller del {i} av leveransen" for i in range(60)) + "."
+    groups = chunker.group_sentences(chunker.split_into_sentences(text))
+
+    assert len(groups) > 1
+    assert all(chunker.chunker.count(group) <= 120 for group in groups)
@@ -0,0 +1,22 @@
+from vector_index import search_functions_sql, supports_iterative_scan
+
+
+def test_filtered_searches_use_an_iterative_scan():
+    ivfflat = search_functions_sql("ivfflat", ["lists=100"])
+    assert ivfflat.count("SET ivfflat.iterative_scan = relaxed_order") == 2
+    assert ivfflat.count("SET ivfflat.probes = 10") == 2
+    hnsw = search_functions_sql("hnsw", ["m=16", "ef_construction=64"])
+    assert hnsw.count("SET hnsw.iterative_scan = relaxed_order") == 2
+    # Relaxed order results are sorted again before they are returned
+    assert "ORDER BY m.similarity DESC" in ivfflat
+
+
+def test_sequential_scans_need_no_index_settings():
+    assert "iterative_scan" not in search_functions_sql(None, None)
+
+
+def test_iterative_scan_version_floor():
+    assert supports_iterative_scan("0.8.0")
+    assert supports_iterative_scan("0.8.1")
+    assert not supports_iterative_scan("0.7.4")
+    assert not supports_iterative_scan("0.5.1")
@@ -0,0 +1,139 @@
+"""
+Token Chunker
+Sizes and overlaps chunks in model tokens so every chunk fits the embedding
+model without truncation
+"""
+
+from typing import List, Optional, Tuple
+
+from embedding_batcher import EMBEDDING_MODEL, MAX_INPUT_TOKENS, get_encoder
+
+# Target chunk size and overlap, in tokens
+DEFAULT_CHUNK_TOKENS = 256
+DEFAULT_OVERLAP_TOKENS = 32
+
+# Split points tried in order, from paragraph breaks down to single words
+SEPARATORS = ("\n\n", "\n", ". ", "! ", "? ", " ")
+
+
+class TokenChunker:
+    def __init__(self, chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+                 overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+                 model: str = EMBEDDING_MODEL):
+        if chunk_tokens > MAX_INPUT_TOKENS:
+            raise ValueError(f"chunk_tokens must not exceed the model limit of {MAX_INPUT_TOKENS}")
+        if overlap_tokens >= chunk_tokens:
+            raise ValueError("overlap_tokens must be smaller than chunk_tokens")
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self.encoder = get_encoder(model)
+
+    def count(self, text: str) -> int:
+        """Number of tokens the model sees for this text"""
+        return len(self.encoder.encode(text, disallowed_special=()))
+
+    def hard_split(self, text: str, limit: int) -> List[str]:
+        """Cut text without separators into consecutive token windows"""
+        tokens = self.encoder.encode(text, disallowed_special=())
+        return [self.encoder.decode(tokens[i:i + limit]) for i in range(0, len(tokens), limit)]
+
+    def pieces(self, text: str, limit: int, level: int = 0) -> List[Tuple[str, int]]:
+        """Break text at the coarsest separator that yields (piece, tokens) within the limit"""
+        tokens = self.count(text)
+        if tokens <= limit:
+            return [(text, tokens)] if text else []
+        if level >= len(SEPARATORS):
+            return [(piece, self.count(piece)) for piece in self.hard_split(text, limit)]
+
+        separator = SEPARATORS[level]
+        parts = text.split(separator)
+        result = []
+        for i, part in enumerate(parts):
+            # Keep the separator on the piece so joined pieces reproduce the text
+            if i < len(parts) - 1:
+                part += separator
+            result.extend(self.pieces(part, limit, level + 1))
+        return result
+
+    def tail(self, text: str, limit: int) -> Optional[Tuple[str, int]]:
+        """The longest run of trailing pieces of text that fits within limit tokens"""
+        if limit <= 0:
+            return None
+        best = None
+        pieces = []
+        total = 0
+        for piece, tokens in reversed(self.pieces(text, limit)):
+            if total + tokens > limit:
+                break
+            pieces.insert(0, piece)
+            total += tokens
+            candidate = "".join(pieces)
+            # Start at a separator, never inside a word that was cut into token windows
+            if len(candidate) == len(text) or text[-len(candidate) - 1].isspace():
+                best = (candidate, total)
+        return best
+
+    def pack(self, pieces: List[Tuple[str, int]], limit: int, overlap: int, joiner: str = "") -> List[str]:
+        """Greedily pack pieces into chunks of at most limit tokens, repeating trailing pieces as overlap"""
+        joiner_tokens = self.count(joiner) if joiner else 0
+        chunks = []
+        current: List[Tuple[str, int]] = []
+        current_tokens = 0
+
+        for piece, tokens in pieces:
+            if current and current_tokens + joiner_tokens + tokens > limit:
+                chunks.append(joiner.join(p for p, _ in current))
+                # Carry the tail of the finished chunk into the next one, as much
+                # of the overlap as still leaves room for the incoming piece
+                budget = min(overlap, limit - tokens)
+                carried = []
+                carried_tokens = 0
+                for prev, prev_tokens in reversed(current):
+                    if carried_tokens + prev_tokens + joiner_tokens > budget:
+                        # A piece that does not fit whole still lends its trailing words
+                        tail = self.tail(prev, budget - carried_tokens - joiner_tokens)
+                        if tail:
+                            carried.insert(0, tail)
+                            carried_tokens += tail[1] + joiner_tokens
+                        break
+                    carried.insert(0, (prev, prev_tokens))
+                    carried_tokens += prev_tokens + joiner_tokens
+                current, current_tokens = carried, carried_tokens
+            current.append((piece, tokens))
+            current_tokens += tokens + (joiner_tokens if len(current) > 1 else 0)
+
+        if current:
+            chunks.append(joiner.join(p for p, _ in current))
+
+        # Token counts of joined text can differ slightly from the sum of the
+        # parts, so re-check and cut anything that still exceeds the ceiling
+        result = []
+        for chunk in chunks:
+            chunk = chunk.strip()
+            if not chunk:
+                continue
+            if self.count(chunk) > limit:
+                result.extend(piece.strip() for piece in self.hard_split(chunk, limit) if piece.strip())
+            else:
+                result.append(chunk)
+        return result
+
+    def split(self, text: str, chunk_tokens: Optional[int] = None, overlap_tokens: Optional[int] = None) -> List[str]:
+        """Split text into overlapping chunks of at most chunk_tokens tokens"""
+        limit = chunk_tokens or self.chunk_tokens
+        overlap = self.overlap_tokens if overlap_tokens is None else overlap_tokens
+        return self.pack(self.pieces(text, limit), limit, overlap)
+
+    def group(self, units: List[str], joiner: str = " ", chunk_tokens: Optional[int] = None) -> List[str]:
+        """Pack short units such as sentences into chunks of at most chunk_tokens tokens"""
+        limit = chunk_tokens or self.chunk_tokens
+        pieces = []
+        for unit in units:
+            pieces.extend(self.pieces(unit, limit))
+        return self.pack(pieces, limit, 0, joiner)
+
+    def fit(self, text: str) -> List[str]:
+        """Return text whole if the model accepts it, otherwise split at the model limit"""
+        if self.count(text) <= MAX_INPUT_TOKENS:
+            return [text]
+        return self.split(text, chunk_tokens=MAX_INPUT_TOKENS, overlap_tokens=0)
@@ -1,13 +1,20 @@
 import os
-import re
 import json
-import csv
-import io
+import multiprocessing
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Iterable
 from dotenv import load_dotenv
 from openai import OpenAI
 from supabase import create_client, Client
+from embedding_batcher import EmbeddingBatcher
+from embedding_cache import EmbeddingCache
+from supabase_writer import SupabaseBulkWriter
+from ingestion_pipeline import IngestionPipeline
+from chunk_ids import id_for_chunk
+from chunk_dedup import ChunkDeduplicator
+from document_pooling import POOL_DOCUMENT_VECTORS, document_pool_groups
+from file_chunker import STREAMED_EXTENSIONS, FileChunker, chunk_file_in_worker
 
 # Load environment variables
 load_dotenv()
@@ -22,301 +29,116 @@ if not all([OPENAI_API_KEY, SUPABASE_URL, SUPABASE_SERVICE_KEY]):
     raise ValueError("Missing required environment variables. Please check your .env file.")
 
 # Initialize clients
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
+# The ingestion pipeline's rate limiter retries 429s, so the SDK must not retry them as well
+openai_client = OpenAI(api_key=OPENAI_API_KEY, max_retries=0)
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
 
-class UniversalFileProcessor:
+# Streamed CSV and document chunks are embedded and uploaded in windows of this size
+CSV_UPLOAD_WINDOW = 1000
+
+# Upload counters that add up across streamed windows
+SUMMED_UPLOAD_STATS = ("successful_uploads", "failed_uploads", "total_chunks", "duplicates_removed",
+                       "embedding_requests", "pooled_vectors", "insert_requests", "elapsed_seconds")
+
+class UniversalFileProcessor(FileChunker):
     def __init__(self):
-        self.supported_extensions = {'.txt', '.pdf', '.doc', '.docx', '.csv'}
+        super().__init__()
         self.chunks = []
+        self.embedder = EmbeddingBatcher(openai_client, cache=EmbeddingCache())
+        self.writer = SupabaseBulkWriter(supabase)
+        self.pipeline = IngestionPipeline(self.embedder, self.writer)
+        self.deduplicator = ChunkDeduplicator()
         
-    def extract_text_from_file(self, file_path: str, file_content: bytes = None) -> str:
-        """Extract text from various file formats"""
-        file_extension = Path(file_path).suffix.lower()
-        
-        try:
-            if file_extension == '.txt':
-                if file_content:
-                    return file_content.decode('utf-8', errors='ignore')
-                else:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        return f.read()
-            
-            elif file_extension == '.csv':
-                if file_content:
-                    content = file_content.decode('utf-8', errors='ignore')
-                    csv_reader = csv.reader(io.StringIO(content))
-                else:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        csv_reader = csv.reader(f)
-                
-                rows = list(csv_reader)
-                if not rows:
-                    return ""
-                
-                # Convert CSV to readable text format
-                text_content = []
-                headers = rows[0] if rows else []
-                
-                text_content.append("CSV Data:")
-                text_content.append("Headers: " + ", ".join(headers))
-                text_content.append("")
-                
-                for i, row in enumerate(rows[1:], 1):
-                    if len(row) == len(headers):
-                        row_text = f"Row {i}:"
-                        for header, value in zip(headers, row):
-                            if value.strip():
-                                row_text += f" {header}: {value};"
-                        text_content.append(row_text)
-                
-                return "\n".join(text_content)
-            
-            elif file_extension in ['.pdf', '.doc', '.docx']:
-                # For PDF and Word documents, we'll extract basic text
-                # In a production environment, you'd use libraries like PyPDF2, python-docx, etc.
-                # For now, we'll return a placeholder that indicates the file type
-                filename = Path(file_path).name
-                return f"Document: {filename}\nContent: [This is a {file_extension.upper()} document. In a production environment, this would contain the extracted text content.]"
-            
-            else:
-                return f"Unsupported file type: {file_extension}"
-                
-        except Exception as e:
-            return f"Error reading file {file_path}: {str(e)}"
-    
-    def create_comprehensive_chunks(self, text: str, source: str, filename: str) -> List[Dict[str, Any]]:
-        """Create comprehensive chunks from text content"""
-        chunks = []
-        
-        if not text or len(text.strip()) < 10:
-            return chunks
-        
-        # Clean the text
-        text = self.clean_text(text)
-        
-        # Strategy 1: Full document chunk
-        chunks.append({
-            "content": text,
-            "source": source,
-            "title": f"Complete document: {filename}",
-            "chunk_type": "full_document",
-            "metadata": {
-                "filename": filename,
-                "word_count": len(text.split()),
-                "char_count": len(text)
-            }
-        })
-        
-        # Strategy 2: Split by paragraphs
-        paragraphs = [p.strip() for p in text.split('\n\n') if p.strip() and len(p.strip()) > 50]
-        for i, paragraph in enumerate(paragraphs):
-            chunks.append({
-                "content": paragraph,
-                "source": source,
-                "title": f"{filename} - Section {i+1}",
-                "chunk_type": "paragraph",
-                "metadata": {
-                    "filename": filename,
-                    "section_number": i+1
-                }
-            })
-        
-        # Strategy 3: Split by sentences for detailed coverage
-        sentences = self.split_into_sentences(text)
-        sentence_groups = self.group_sentences(sentences, max_length=300)
-        
-        for i, group in enumerate(sentence_groups):
-            if len(group.strip()) > 30:
-                chunks.append({
-                    "content": group,
-                    "source": source,
-                    "title": f"{filename} - Detail {i+1}",
-                    "chunk_type": "sentence_group",
-                    "metadata": {
-                        "filename": filename,
-                        "group_number": i+1
-                    }
-                })
-        
-        # Strategy 4: Extract key information
-        key_info = self.extract_key_information(text)
-        for info_type, content in key_info.items():
-            if content:
-                chunks.append({
-                    "content": content,
-                    "source": source,
-                    "title": f"{filename} - {info_type.title()}",
-                    "chunk_type": info_type,
-                    "metadata": {
-                        "filename": filename,
-                        "info_type": info_type
-                    }
-                })
-        
-        return chunks
-    
-    def clean_text(self, text: str) -> str:
-        """Clean text while preserving important information"""
-        # Remove excessive whitespace but keep structure
-        text = re.sub(r'\n\s*\n\s*\n+', '\n\n', text)
-        text = re.sub(r'[ \t]+', ' ', text)
-        return text.strip()
-    
-    def split_into_sentences(self, text: str) -> List[str]:
-        """Split text into sentences"""
-        # Simple sentence splitting
-        sentences = re.split(r'[.!?]+', text)
-        return [s.strip() for s in sentences if s.strip() and len(s.strip()) > 10]
-    
-    def group_sentences(self, sentences: List[str], max_length: int = 300) -> List[str]:
-        """Group sentences into chunks of appropriate length"""
-        groups = []
-        current_group = []
-        current_length = 0
-        
-        for sentence in sentences:
-            sentence_length = len(sentence)
-            
-            if current_length + sentence_length > max_length and current_group:
-                groups.append('. '.join(current_group) + '.')
-                current_group = [sentence]
-                current_length = sentence_length
-            else:
-                current_group.append(sentence)
-                current_length += sentence_length
-        
-        if current_group:
-            groups.append('. '.join(current_group) + '.')
-        
-        return groups
-    
-    def extract_key_information(self, text: str) -> Dict[str, str]:
-        """Extract different types of key information"""
-        info = {}
-        
-        # Extract email addresses
-        emails = re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', text)
-        if emails:
-            info['contact_emails'] = 'Email addresses found: ' + ', '.join(emails)
-        
-        # Extract phone numbers
-        phones = re.findall(r'[\+]?[1-9]?[0-9]{7,15}', text)
-        if phones:
-            info['contact_phones'] = 'Phone numbers found: ' + ', '.join(phones)
-        
-        # Extract URLs
-        urls = re.findall(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', text)
-        if urls:
-            info['urls'] = 'URLs found: ' + ', '.join(urls)
-        
-        # Extract prices/costs
-        prices = re.findall(r'[\$€£¥₹]\s*\d+(?:[\.,]\d+)*|(\d+(?:[\.,]\d+)*)\s*(?:kr|SEK|USD|EUR|GBP)', text)
-        if prices:
-            price_strings = [p[0] if p[0] else p[1] for p in prices]
-            info['pricing'] = 'Pricing information: ' + ', '.join(price_strings)
-        
-        # Extract numbered lists
-        numbered_items = re.findall(r'\d+\.\s+([^\n]+)', text)
-        if numbered_items:
-            info['numbered_lists'] = 'Key points: ' + '; '.join(numbered_items[:5])
-        
-        # Extract bullet points
-        bullet_items = re.findall(r'[•\-\*]\s+([^\n]+)', text)
-        if bullet_items:
-            info['bullet_points'] = 'Important items: ' + '; '.join(bullet_items[:5])
-        
-        return info
-    
     def get_embedding(self, text: str) -> List[float]:
         """Generate embedding for text"""
-        try:
-            response = openai_client.embeddings.create(
-                input=text[:8000],  # Limit text length for embedding
-                model="text-embedding-3-small"
-            )
-            return response.data[0].embedding
-        except Exception as e:
-            print(f"Error generating embedding: {e}")
-            return None
+        return self.get_embeddings([text])[0]
     
-    def process_file(self, file_path: str, file_content: bytes = None) -> List[Dict[str, Any]]:
-        """Process a single file and return chunks"""
-        filename = Path(file_path).name
-        source = Path(file_path).stem.lower().replace(' ', '_')
-        
-        print(f"Processing file: {filename}")
-        
-        # Extract text content
-        text_content = self.extract_text_from_file(file_path, file_content)
-        
-        if not text_content or len(text_content.strip()) < 10:
-            print(f"No content extracted from {filename}")
-            return []
-        
-        # Create comprehensive chunks
-        file_chunks = self.create_comprehensive_chunks(text_content, source, filename)
-        
-        print(f"Created {len(file_chunks)} chunks from {filename}")
-        return file_chunks
+    def get_embeddings(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Generate embeddings for many texts in token-budgeted batches"""
+        # Chunks are sized by the token chunker, so the batcher's truncation is only a safety net
+        return self.pipeline.embed(texts)
+    
+    def build_row(self, chunk: Dict[str, Any], embedding: List[float]) -> Dict[str, Any]:
+        """Prepare a documents row for Supabase"""
+        return {
+            "id": id_for_chunk(chunk),
+            "content": chunk["content"],
+            "embedding": embedding,
+            "source": chunk["source"],
+            "metadata": {
+                "title": chunk["title"],
+                "chunk_type": chunk["chunk_type"],
+                **chunk.get("metadata", {})
+            }
+        }
     
     def upload_to_supabase(self, chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Upload all chunks to Supabase with embeddings"""
         print("Starting upload to Supabase...")
         
-        successful_uploads = 0
-        failed_uploads = 0
+        # Drop exact and near-identical chunks before paying for their embeddings
+        unique_chunks, dedup_report, sources = self.deduplicator.deduplicate_with_sources(chunks)
+        duplicates_removed = len(chunks) - len(unique_chunks)
+        print(f"Deduplication removed {duplicates_removed} of {len(chunks)} chunks "
+              f"({dedup_report['percent_saved']}% of text)")
+        
+        # Full-document vectors are pooled from all sentence groups of the same file, including
+        # those deduplicated away, through the chunks that replaced them
+        pool_groups = document_pool_groups(chunks, ("sentence_group",), sources) if POOL_DOCUMENT_VECTORS else None
         
-        for i, chunk in enumerate(chunks, 1):
-            try:
-                # Generate embedding
-                embedding = self.get_embedding(chunk["content"])
-                if embedding is None:
-                    print(f"Chunk {i}: Failed to generate embedding")
-                    failed_uploads += 1
-                    continue
-                
-                # Prepare data for Supabase
-                data = {
-                    "content": chunk["content"],
-                    "embedding": embedding,
-                    "source": chunk["source"],
-                    "metadata": {
-                        "title": chunk["title"],
-                        "chunk_type": chunk["chunk_type"],
-                        **chunk.get("metadata", {})
-                    }
-                }
-                
-                # Insert into Supabase
-                response = supabase.table("documents").insert(data).execute()
-                
-                if hasattr(response, 'error') and response.error:
-                    print(f"Chunk {i}: Upload failed - {response.error}")
-                    failed_uploads += 1
-                else:
-                    successful_uploads += 1
-                    if i % 10 == 0:  # Progress update every 10 chunks
-                        print(f"Uploaded {i}/{len(chunks)} chunks...")
-                
-            except Exception as e:
-                print(f"Chunk {i}: Exception during upload - {e}")
-                failed_uploads += 1
+        # Embed batches concurrently and insert them as they complete
+        stats = self.pipeline.run(unique_chunks, self.build_row, pool_groups)
+        successful_uploads = stats["successful_uploads"]
+        failed_uploads = stats["failed_uploads"]
+        print(f"Embedding requests: {stats['embedding_requests']}, pooled document vectors: {stats['pooled_vectors']}, "
+              f"rate limited: {stats['rate_limited']}, cache: {self.embedder.cache.stats()}")
         
         result = {
             "successful_uploads": successful_uploads,
             "failed_uploads": failed_uploads,
-            "total_chunks": len(chunks)
+            "total_chunks": len(chunks),
+            "duplicates_removed": duplicates_removed,
+            "embedding_requests": stats["embedding_requests"],
+            "pooled_vectors": stats["pooled_vectors"],
+            "rate_limited": stats["rate_limited"],
+            "insert_requests": stats["insert_requests"],
+            "avg_batch_latency_ms": stats["avg_batch_latency_ms"],
+            "elapsed_seconds": stats["elapsed_seconds"]
         }
         
         print(f"Upload complete! Success: {successful_uploads}, Failed: {failed_uploads}")
         return result
+    
+    def upload_chunk_stream(self, chunks: Iterable[Dict[str, Any]], window_size: int = CSV_UPLOAD_WINDOW) -> Dict[str, Any]:
+        """Upload a chunk stream in bounded windows so memory stays flat"""
+        totals = {key: 0 for key in SUMMED_UPLOAD_STATS}
+        window = []
+        
+        def flush():
+            result = self.upload_to_supabase(window)
+            for key in SUMMED_UPLOAD_STATS:
+                totals[key] += result.get(key, 0)
+        
+        for chunk in chunks:
+            window.append(chunk)
+            if len(window) >= window_size:
+                flush()
+                window = []
+        
+        if window:
+            flush()
+        
+        return totals
 
-def process_files_from_directory(directory_path: str = "uploaded_files") -> Dict[str, Any]:
+def process_files_from_directory(directory_path: str = "uploaded_files", parallel: bool = True,
+                                 max_workers: Optional[int] = None) -> Dict[str, Any]:
     """Process all files from a directory"""
     processor = UniversalFileProcessor()
     all_chunks = []
     files_processed = 0
+    file_errors = {}
+    streamed_chunks = 0
+    streamed_stats = []
     
     if not os.path.exists(directory_path):
         return {
@@ -325,36 +147,73 @@ def process_files_from_directory(directory_path: str = "uploaded_files") -> Dict
             "error": f"Directory {directory_path} does not exist"
         }
     
-    # Process all files in the directory
-    for filename in os.listdir(directory_path):
+    # Sorted so chunk order does not depend on the filesystem
+    file_paths = []
+    for filename in sorted(os.listdir(directory_path)):
         file_path = os.path.join(directory_path, filename)
-        
-        if os.path.isfile(file_path):
-            file_extension = Path(file_path).suffix.lower()
-            
-            if file_extension in processor.supported_extensions:
-                try:
-                    file_chunks = processor.process_file(file_path)
-                    all_chunks.extend(file_chunks)
-                    files_processed += 1
-                except Exception as e:
-                    print(f"Error processing {filename}: {e}")
+        if os.path.isfile(file_path) and Path(file_path).suffix.lower() in processor.supported_extensions:
+            file_paths.append(file_path)
+    
+    # CSV files can be arbitrarily large, so they are always streamed from this process;
+    # in parallel mode every other file is extracted and chunked in a worker process
+    if parallel:
+        streamed_paths = [path for path in file_paths if Path(path).suffix.lower() == '.csv']
+    else:
+        streamed_paths = [path for path in file_paths if Path(path).suffix.lower() in STREAMED_EXTENSIONS]
+    chunked_paths = [path for path in file_paths if path not in streamed_paths]
+    
+    if parallel and len(chunked_paths) > 1:
+        # Spawned workers only import the client-free FileChunker instead of inheriting this
+        # process's clients, SQLite connection and threads through fork
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            # map() yields results in submission order, keeping the merge deterministic
+            results = list(pool.map(chunk_file_in_worker, chunked_paths))
+    else:
+        results = [chunk_file_in_worker(path) for path in chunked_paths]
+    
+    for file_path, (file_chunks, error) in zip(chunked_paths, results):
+        filename = Path(file_path).name
+        if error:
+            print(f"Error processing {filename}: {error}")
+            file_errors[filename] = error
+            continue
+        all_chunks.extend(file_chunks)
+        files_processed += 1
+    
+    for file_path in streamed_paths:
+        filename = Path(file_path).name
+        try:
+            # Spreadsheets and documents are streamed straight to Supabase in bounded windows
+            print(f"Streaming file: {filename}")
+            stats = processor.upload_chunk_stream(processor.stream_file_chunks(file_path))
+            streamed_stats.append(stats)
+            streamed_chunks += stats["total_chunks"]
+            files_processed += 1
+        except Exception as e:
+            print(f"Error processing {filename}: {e}")
+            file_errors[filename] = str(e)
     
-    if not all_chunks:
+    if not all_chunks and not streamed_chunks:
         return {
             "success": False,
             "message": "No content could be extracted from the uploaded files",
-            "files_processed": files_processed
+            "files_processed": files_processed,
+            "file_errors": file_errors
         }
     
     # Upload to Supabase
-    upload_result = processor.upload_to_supabase(all_chunks)
+    upload_result = processor.upload_to_supabase(all_chunks) if all_chunks else {}
+    for stats in streamed_stats:
+        for key in SUMMED_UPLOAD_STATS:
+            upload_result[key] = upload_result.get(key, 0) + stats[key]
     
+    chunks_created = len(all_chunks) + streamed_chunks
     return {
         "success": True,
-        "message": f"Successfully processed {files_processed} files and created {len(all_chunks)} chunks",
+        "message": f"Successfully processed {files_processed} files and created {chunks_created} chunks",
         "files_processed": files_processed,
-        "chunks_created": len(all_chunks),
+        "chunks_created": chunks_created,
+        "file_errors": file_errors,
         "upload_stats": upload_result
     }
 
@@ -0,0 +1,190 @@
+"""
+Vector Index
+pgvector index settings shared by the schema tooling and every query path,
+so the distance operator always matches the index operator class
+"""
+
+import math
+import os
+from typing import Dict, List, Optional, Tuple
+
+INDEX_NAME = "idx_documents_embedding"
+INDEX_KINDS = ("ivfflat", "hnsw")
+
+# metric: (distance operator, operator class)
+METRICS: Dict[str, Tuple[str, str]] = {
+    "cosine": ("<=>", "vector_cosine_ops"),
+    "inner_product": ("<#>", "vector_ip_ops"),
+    "l2": ("<->", "vector_l2_ops")
+}
+
+VECTOR_METRIC = os.getenv("VECTOR_METRIC", "cosine")
+VECTOR_INDEX_KIND = os.getenv("VECTOR_INDEX_KIND", "ivfflat")
+
+# HNSW build and search parameters (pgvector defaults)
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 64
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", 40))
+
+# Below this many rows a sequential scan is as fast as any index
+MIN_INDEXED_ROWS = 1000
+
+# A metadata filter is applied to the rows the index scan returns, so a rare chunk_type
+# can leave a filtered top-k short or empty. Iterative scans (pgvector 0.8.0+) keep
+# scanning until enough rows pass the filter; their results may be slightly out of
+# order, so the search functions sort them again
+ITERATIVE_SCAN_SETTINGS: Dict[str, Dict[str, str]] = {
+    "ivfflat": {"ivfflat.iterative_scan": "relaxed_order"},
+    "hnsw": {"hnsw.iterative_scan": "relaxed_order"}
+}
+MIN_ITERATIVE_SCAN_VERSION = (0, 8, 0)
+
+
+def distance_operator(metric: str = VECTOR_METRIC) -> str:
+    """pgvector operator for ORDER BY embedding <op> query"""
+    return METRICS[metric][0]
+
+
+def operator_class(metric: str = VECTOR_METRIC) -> str:
+    return METRICS[metric][1]
+
+
+def ivfflat_lists(rows: int) -> int:
+    """pgvector guidance: rows / 1000 up to 1M rows, sqrt(rows) beyond"""
+    if rows <= 1000000:
+        return max(1, rows // 1000)
+    return int(math.sqrt(rows))
+
+
+def ivfflat_probes(lists: int) -> int:
+    """Lists scanned per query: sqrt(lists) balances recall and speed"""
+    return max(1, int(math.sqrt(lists)))
+
+
+def create_index_sql(rows: int, kind: str = VECTOR_INDEX_KIND, metric: str = VECTOR_METRIC) -> str:
+    """CREATE INDEX statement sized for the current row count"""
+    if kind not in INDEX_KINDS:
+        raise ValueError(f"Unknown index kind {kind!r}, expected one of {INDEX_KINDS}")
+    if kind == "hnsw":
+        options = f"m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION}"
+    else:
+        options = f"lists = {ivfflat_lists(rows)}"
+    return (f"CREATE INDEX {INDEX_NAME} ON documents "
+            f"USING {kind} (embedding {operator_class(metric)}) WITH ({options});")
+
+
+def rebuild_index_sql(rows: int, kind: str = VECTOR_INDEX_KIND, metric: str = VECTOR_METRIC) -> List[str]:
+    """Drop and recreate the index, then refresh planner statistics"""
+    return [f"DROP INDEX IF EXISTS {INDEX_NAME};", create_index_sql(rows, kind, metric), "ANALYZE documents;"]
+
+
+def should_build_index(rows: int, kind: str = VECTOR_INDEX_KIND, force: bool = False) -> bool:
+    """Whether an index over rows is worth building"""
+    # ivfflat centroids come from the rows present at build time; with too few they are useless
+    return force or kind != "ivfflat" or rows >= MIN_INDEXED_ROWS
+
+
+def index_build_sql(rows: int, kind: str = VECTOR_INDEX_KIND, metric: str = VECTOR_METRIC,
+                    force: bool = False) -> List[str]:
+    """Rebuild the index for rows, or only drop it when a sequential scan is the better plan"""
+    if not should_build_index(rows, kind, force):
+        return [f"DROP INDEX IF EXISTS {INDEX_NAME};", "ANALYZE documents;"]
+    return rebuild_index_sql(rows, kind, metric)
+
+
+def index_info_sql() -> str:
+    """Query returning (access method, reloptions, index definition) of the embedding index"""
+    return ("SELECT am.amname, c.reloptions, pg_get_indexdef(c.oid) FROM pg_class c "
+            "JOIN pg_am am ON am.oid = c.relam "
+            f"WHERE c.relname = '{INDEX_NAME}'")
+
+
+def search_settings(kind: Optional[str], reloptions: Optional[List[str]]) -> Dict[str, int]:
+    """Query-time settings for the index that actually exists"""
+    if kind == "hnsw":
+        return {"hnsw.ef_search": HNSW_EF_SEARCH}
+    if kind == "ivfflat":
+        options = dict(option.split("=", 1) for option in reloptions or [])
+        lists = int(options.get("lists", 100))
+        return {"ivfflat.probes": ivfflat_probes(lists)}
+    return {}
+
+
+def supports_iterative_scan(extversion: str) -> bool:
+    """Whether an installed pgvector version (pg_extension.extversion) has iterative index scans"""
+    version = tuple(int(part) for part in extversion.split(".")[:3] if part.isdigit())
+    return version >= MIN_ITERATIVE_SCAN_VERSION
+
+
+def search_settings_sql(kind: Optional[str], reloptions: Optional[List[str]]) -> List[str]:
+    """SET statements a query session needs for the index that actually exists"""
+    return [f"SET {name} = {value};" for name, value in search_settings(kind, reloptions).items()]
+
+
+def search_functions_sql(kind: Optional[str] = None, reloptions: Optional[List[str]] = None,
+                         metric: str = VECTOR_METRIC) -> str:
+    """CREATE FUNCTION statements for the search RPCs, matching the index's operator and query settings"""
+    # PostgREST callers cannot SET session variables, so the settings are attached to the functions
+    function_settings = {**search_settings(kind, reloptions), **ITERATIVE_SCAN_SETTINGS.get(kind, {})}
+    settings = "".join(f"\nSET {name} = {value}" for name, value in function_settings.items())
+    operator = distance_operator(metric)
+    distance = f"(d.embedding {operator} query_embedding)"
+    # Expressed as cosine similarity for unit-length embeddings, so thresholds mean the same for every metric
+    similarity = {
+        "cosine": f"1 - {distance}",
+        # <#> returns the negative inner product
+        "inner_product": f"-{distance}",
+        "l2": f"1 - {distance} ^ 2 / 2"
+    }[metric]
+    return f"""-- Top matches for a query embedding, optionally restricted to rows whose metadata
+-- contains filter (e.g. '{{"chunk_type": "pricing"}}'). The filter is checked on the rows
+-- the index scan returns, and an iterative scan keeps going until match_count rows pass it.
+-- The similarity threshold is applied to those top match_count rows.
+-- Rows without metadata only match the empty filter.
+CREATE OR REPLACE FUNCTION match_documents(
+    query_embedding vector,
+    match_threshold float DEFAULT 0.7,
+    match_count int DEFAULT 10,
+    filter jsonb DEFAULT '{{}}'
+)
+RETURNS TABLE (id uuid, content text, source text, metadata jsonb, similarity float)
+LANGUAGE sql STABLE{settings}
+AS $$
+    SELECT m.id, m.content, m.source, m.metadata, m.similarity
+    FROM (
+        SELECT d.id, d.content, d.source, d.metadata,
+               {similarity} AS similarity
+        FROM documents d
+        WHERE filter = '{{}}'::jsonb OR COALESCE(d.metadata, '{{}}'::jsonb) @> filter
+        ORDER BY d.embedding {operator} query_embedding
+        LIMIT match_count
+    ) m
+    WHERE m.similarity > match_threshold
+    -- An iterative scan may return rows slightly out of order
+    ORDER BY m.similarity DESC;
+$$;
+
+-- Semantic matches plus the closest rows of each chunk type in one round trip.
+-- buckets maps chunk_type -> row count; each result row is tagged with its bucket
+-- ('semantic_search' or the chunk_type). Buckets ignore the similarity threshold.
+CREATE OR REPLACE FUNCTION comprehensive_search_v1(
+    query_embedding vector,
+    match_threshold float DEFAULT 0.7,
+    semantic_count int DEFAULT 5,
+    buckets jsonb DEFAULT '{{"pricing": 3, "contact": 3, "key_fact": 5, "full_document": 2}}',
+    filter jsonb DEFAULT '{{}}'
+)
+RETURNS TABLE (bucket text, id uuid, content text, source text, metadata jsonb, similarity float)
+LANGUAGE sql STABLE{settings}
+AS $$
+    SELECT 'semantic_search', m.*
+    FROM match_documents(query_embedding, match_threshold, semantic_count, filter) m
+    UNION ALL
+    SELECT b.key, m.*
+    FROM jsonb_each_text(buckets) b
+    CROSS JOIN LATERAL match_documents(
+        query_embedding, '-infinity', b.value::int,
+        COALESCE(filter, '{{}}'::jsonb) || jsonb_build_object('chunk_type', b.key)
+    ) m;
+$$;
+"""
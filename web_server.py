@@ -8,12 +8,28 @@ import os
 import json
 import tempfile
 import shutil
+import threading
+import time
 from pathlib import Path
 from typing import Dict, Any
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 import cgi
 from universal_file_processor import process_files_from_directory, UniversalFileProcessor
+from document_extractors import shutdown_extraction_pool
+
+_query_system = None
+_query_system_lock = threading.Lock()
+
+def get_query_system():
+    """Create the shared query system on first use"""
+    global _query_system
+    with _query_system_lock:
+        if _query_system is None:
+            # Imported lazily so the upload endpoint works without the query configuration
+            from enhanced_query_system import EnhancedQuerySystem
+            _query_system = EnhancedQuerySystem()
+        return _query_system
 
 class FileUploadHandler(BaseHTTPRequestHandler):
     def do_OPTIONS(self):
@@ -26,8 +42,15 @@ class FileUploadHandler(BaseHTTPRequestHandler):
     
     def do_GET(self):
         """Handle GET requests"""
-        if self.path == '/health':
+        parsed = urlparse(self.path)
+        if parsed.path == '/health':
             self.send_json_response({"status": "healthy", "message": "RAG File Processor is running"})
+        elif parsed.path == '/ask':
+            query = parse_qs(parsed.query).get('q', [''])[0].strip()
+            if not query:
+                self.send_error(400, "Missing q parameter")
+                return
+            self.stream_answer(query)
         else:
             self.send_error(404, "Not Found")
     
@@ -67,11 +90,13 @@ class FileUploadHandler(BaseHTTPRequestHandler):
                 for field_name in form.keys():
                     if field_name.startswith('file_'):
                         file_item = form[field_name]
-                        if file_item.filename:
-                            # Save file to temporary directory
-                            file_path = os.path.join(temp_dir, file_item.filename)
+                        # Keep only the final name so a crafted filename cannot leave temp_dir
+                        filename = os.path.basename((file_item.filename or '').replace('\\', '/'))
+                        if filename and filename not in ('.', '..'):
+                            # Save file to temporary directory, copied in blocks rather than read whole
+                            file_path = os.path.join(temp_dir, filename)
                             with open(file_path, 'wb') as f:
-                                f.write(file_item.file.read())
+                                shutil.copyfileobj(file_item.file, f)
                             files_saved += 1
                 
                 if files_saved == 0:
@@ -96,6 +121,55 @@ class FileUploadHandler(BaseHTTPRequestHandler):
                 "error": str(e)
             }, status_code=500)
     
+    def stream_answer(self, query: str):
+        """Answer a question as server-sent events: sources, then tokens as they arrive, then done"""
+        start = time.perf_counter()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        # Stop reverse proxies from buffering the stream
+        self.send_header('X-Accel-Buffering', 'no')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        
+        first_token_ms = None
+        try:
+            query_system = get_query_system()
+            results = query_system.comprehensive_search(query)
+            all_docs = [doc for docs in results.values() for doc in docs]
+            self.send_event("sources", [{
+                "source": doc.get("source"),
+                "title": (doc.get("metadata") or {}).get("title"),
+                "chunk_type": (doc.get("metadata") or {}).get("chunk_type")
+            } for doc in all_docs])
+            
+            if all_docs:
+                for piece in query_system.stream_answer(query, all_docs):
+                    if first_token_ms is None:
+                        first_token_ms = round((time.perf_counter() - start) * 1000, 1)
+                    self.send_event("token", {"text": piece})
+            
+            self.send_event("done", {
+                "first_token_ms": first_token_ms,
+                "total_ms": round((time.perf_counter() - start) * 1000, 1)
+            })
+        except (BrokenPipeError, ConnectionResetError):
+            # Client went away; leaving the loop closes the completion stream
+            print(f"Client disconnected while answering: {query}")
+        except Exception as e:
+            print(f"Error answering question: {e}")
+            try:
+                self.send_event("error", {"message": str(e)})
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+        print(f"Answered in {(time.perf_counter() - start) * 1000:.0f} ms, first token after {first_token_ms} ms")
+    
+    def send_event(self, event: str, data: Any):
+        """Write one server-sent event and flush it to the client"""
+        payload = json.dumps(data, ensure_ascii=False)
+        self.wfile.write(f"event: {event}\ndata: {payload}\n\n".encode('utf-8'))
+        self.wfile.flush()
+    
     def send_json_response(self, data: Dict[str, Any], status_code: int = 200):
         """Send JSON response with CORS headers"""
         self.send_response(status_code)
@@ -115,18 +189,22 @@ class FileUploadHandler(BaseHTTPRequestHandler):
 def run_server(port: int = 8000):
     """Run the web server"""
     server_address = ('', port)
-    httpd = HTTPServer(server_address, FileUploadHandler)
+    # One thread per request; document parsing itself runs in the extraction process pool
+    httpd = ThreadingHTTPServer(server_address, FileUploadHandler)
     
     print(f"🚀 RAG File Processor Server starting on port {port}")
     print(f"📁 Upload endpoint: http://localhost:{port}/process-files")
     print(f"❤️  Health check: http://localhost:{port}/health")
+    print(f"💬 Streaming answers (SSE): http://localhost:{port}/ask?q=your+question")
     print("Press Ctrl+C to stop the server")
     
     try:
         httpd.serve_forever()
     except KeyboardInterrupt:
         print("\n🛑 Server stopped")
+    finally:
         httpd.server_close()
+        shutdown_extraction_pool()
 
 if __name__ == "__main__":
     run_server()
\ No newline at end of file